@@ -0,0 +1,58 @@
+"""added feed sources table 171020261315
+
+Revision ID: 5c2e8b71d4fa
+Revises: a3f19c0d7e21
+Create Date: 2026-10-17 13:15:08.118934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8b71d4fa'
+down_revision: Union[str, Sequence[str], None] = 'a3f19c0d7e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    feed_sources = op.create_table('feed_sources',
+    sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v4()'), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('city', sa.String(length=50), nullable=True),
+    sa.Column('active', sa.BOOLEAN(), nullable=True),
+    sa.Column('poll_interval_secs', sa.Integer(), nullable=True, comment='Current adaptive polling interval'),
+    sa.Column('min_poll_interval_secs', sa.Integer(), nullable=True),
+    sa.Column('max_poll_interval_secs', sa.Integer(), nullable=True),
+    sa.Column('new_items_per_hour', sa.Float(), nullable=True, comment='EWMA of the observed new-item rate'),
+    sa.Column('last_polled_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.Column('created_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('url')
+    )
+    op.create_index(op.f('ix_feed_sources_id'), 'feed_sources', ['id'], unique=False)
+    op.create_index(op.f('ix_feed_sources_city'), 'feed_sources', ['city'], unique=False)
+
+    # seed with the sources that used to be hard-coded in src/stories/utils.py
+    defaults = {"category": "general", "city": "NAGPUR", "active": True, "poll_interval_secs": 300, "min_poll_interval_secs": 120, "max_poll_interval_secs": 3600, "new_items_per_hour": 0}
+    op.bulk_insert(feed_sources, [
+        {"name": "Live Hindustan - Nagpur", "url": "https://api.livehindustan.com/feeds/rss/maharashtra/nagpur/rssfeed.xml", **defaults},
+        {"name": "Times of India - Nagpur", "url": "https://timesofindia.indiatimes.com/rssfeeds/442002.cms", **defaults},
+        {"name": "NagpurVocals Local News", "url": "https://www.nagpurvocals.com/rss/local", **defaults},
+        {"name": "Indian Express - Nagpur", "url": "https://indianexpress.com/section/cities/nagpur/feed/", **defaults},
+        {"name": "Lokmat Times - Nagpur", "url": "https://lokmat.news18.com/commonfeeds/v1/lok/rss/maharashtra/nagpur.xml", **defaults},
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_feed_sources_city'), table_name='feed_sources')
+    op.drop_index(op.f('ix_feed_sources_id'), table_name='feed_sources')
+    op.drop_table('feed_sources')
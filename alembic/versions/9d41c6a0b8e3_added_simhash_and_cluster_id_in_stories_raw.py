@@ -0,0 +1,33 @@
+"""added simhash and cluster_id in stories raw 171020261420
+
+Revision ID: 9d41c6a0b8e3
+Revises: 5c2e8b71d4fa
+Create Date: 2026-10-17 14:20:41.502318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41c6a0b8e3'
+down_revision: Union[str, Sequence[str], None] = '5c2e8b71d4fa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows keep NULLs and are never collapsed in the feed
+    op.add_column('stories_raw', sa.Column('simhash', sa.BigInteger(), nullable=True, comment='64-bit SimHash of the normalized title + snippet, stored signed'))
+    op.add_column('stories_raw', sa.Column('cluster_id', sa.UUID(), nullable=True, comment='Stories with near-identical text share a cluster'))
+    op.create_index(op.f('ix_stories_raw_cluster_id'), 'stories_raw', ['cluster_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stories_raw_cluster_id'), table_name='stories_raw')
+    op.drop_column('stories_raw', 'cluster_id')
+    op.drop_column('stories_raw', 'simhash')
@@ -0,0 +1,69 @@
+"""added link hash column in stories raw table 171020261120
+
+Revision ID: a3f19c0d7e21
+Revises: 23c37c706819
+Create Date: 2026-10-17 11:20:41.402217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+from src.utils.links import generate_link_hash
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f19c0d7e21'
+down_revision: Union[str, Sequence[str], None] = '23c37c706819'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Step 1: Add the new column as nullable
+    op.add_column('stories_raw', sa.Column('link_hash', sa.String(length=64), nullable=True, comment='sha256 of the normalized link, used to skip already ingested articles'))
+
+    conn = op.get_bind()
+
+    # Step 2: Backfill link_hash, oldest row of each location wins. Later duplicates keep
+    # a NULL hash so the unique index can be created without deleting any rows.
+    # Keyset batches keep memory flat, rows without a timestamp sort last (not 'infinity',
+    # psycopg2 cannot read it back into a datetime).
+    seen = set()
+    last_key = None
+    while True:
+        query = "SELECT id, link, location_id, COALESCE(published_timestamp, TIMESTAMP '9999-12-31') AS sort_timestamp FROM stories_raw WHERE link IS NOT NULL"
+        params = {"limit": BACKFILL_BATCH_SIZE}
+        if last_key is not None:
+            query += " AND (COALESCE(published_timestamp, TIMESTAMP '9999-12-31'), id) > (:last_timestamp, :last_id)"
+            params.update(last_timestamp=last_key[0], last_id=last_key[1])
+        rows = conn.execute(text(query + " ORDER BY COALESCE(published_timestamp, TIMESTAMP '9999-12-31'), id LIMIT :limit"), params).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            link_hash = generate_link_hash(row.link)
+            if not link_hash or (row.location_id, link_hash) in seen:
+                continue
+            seen.add((row.location_id, link_hash))
+            updates.append({"hash": link_hash, "id": row.id})
+
+        if updates:
+            conn.execute(text("UPDATE stories_raw SET link_hash = :hash WHERE id = :id"), updates)
+        last_key = (rows[-1].sort_timestamp, rows[-1].id)
+
+    # Step 3: Unique index used by ON CONFLICT (location_id, link_hash) DO NOTHING,
+    # the same article stays in every location feed it was fetched for
+    op.create_index('ix_stories_raw_location_id_link_hash', 'stories_raw', ['location_id', 'link_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stories_raw_location_id_link_hash', table_name='stories_raw')
+    op.drop_column('stories_raw', 'link_hash')
@@ -0,0 +1,37 @@
+"""added llm response cache 181020261650
+
+Revision ID: a6c3e9f1d027
+Revises: f2b8d4e6a913
+Create Date: 2026-10-18 16:50:08.551920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e9f1d027'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d4e6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_response_cache',
+    sa.Column('key', sa.String(length=200), nullable=False, comment='llm:<namespace>:<model>:v<template version>:<sha256 of the normalized inputs>'),
+    sa.Column('response', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(), nullable=False),
+    sa.Column('expires_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_llm_response_cache_expires_at'), 'llm_response_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_llm_response_cache_expires_at'), table_name='llm_response_cache')
+    op.drop_table('llm_response_cache')
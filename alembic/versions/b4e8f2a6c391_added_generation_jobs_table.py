@@ -0,0 +1,55 @@
+"""added generation jobs table 181020261830
+
+Revision ID: b4e8f2a6c391
+Revises: a6c3e9f1d027
+Create Date: 2026-10-18 18:30:42.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8f2a6c391'
+down_revision: Union[str, Sequence[str], None] = 'a6c3e9f1d027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_jobs',
+    sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v4()'), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False, comment='questions or article'),
+    sa.Column('user_story_id', sa.UUID(), nullable=False),
+    sa.Column('author_id', sa.UUID(), nullable=False),
+    sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='queued, running, succeeded or failed'),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', postgresql.TIMESTAMP(), nullable=False, comment='Not claimed before this time, pushed back between retries'),
+    sa.Column('locked_until', postgresql.TIMESTAMP(), nullable=True, comment='Lease of a running job, reclaimed once it expires'),
+    sa.Column('worker', sa.String(length=100), nullable=True),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('error', sa.TEXT(), nullable=True),
+    sa.Column('created_at', postgresql.TIMESTAMP(), nullable=False),
+    sa.Column('started_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.Column('finished_at', postgresql.TIMESTAMP(), nullable=True),
+    sa.ForeignKeyConstraint(['author_id'], ['authors.id'], ),
+    sa.ForeignKeyConstraint(['user_story_id'], ['user_stories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_generation_jobs_status_run_after', 'generation_jobs', ['status', 'run_after'], unique=False)
+    op.create_index('uq_generation_jobs_active', 'generation_jobs', ['kind', 'user_story_id'], unique=True, postgresql_where=sa.text("status IN ('queued', 'running')"))
+    op.create_index(op.f('ix_generation_jobs_finished_at'), 'generation_jobs', ['finished_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_generation_jobs_finished_at'), table_name='generation_jobs')
+    op.drop_index('uq_generation_jobs_active', table_name='generation_jobs', postgresql_where=sa.text("status IN ('queued', 'running')"))
+    op.drop_index('ix_generation_jobs_status_run_after', table_name='generation_jobs')
+    op.drop_table('generation_jobs')
@@ -0,0 +1,121 @@
+"""partitioned stories raw by day 171020261530
+
+Revision ID: b7e2f5a91c3d
+Revises: 9d41c6a0b8e3
+Create Date: 2026-10-17 15:30:12.774105
+
+"""
+from datetime import date, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from src.config.settings import settings
+from src.stories.partitions import create_partition_sql, partition_days
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f5a91c3d'
+down_revision: Union[str, Sequence[str], None] = '9d41c6a0b8e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STORIES_RAW_COLUMNS = "id, title, snippet, thumbnail, link, link_hash, simhash, cluster_id, published_timestamp, source, location_id"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Step 1: Park the existing rows in a plain copy, so the new table can reuse every name
+    op.execute("CREATE TABLE stories_raw_legacy AS SELECT * FROM stories_raw")
+    op.drop_table('stories_raw')
+
+    # Step 2: Partitioned table. The primary key has to include the partition key.
+    op.execute("""
+        CREATE TABLE stories_raw (
+            id UUID NOT NULL DEFAULT uuid_generate_v4(),
+            title TEXT,
+            snippet TEXT,
+            thumbnail VARCHAR(300),
+            link VARCHAR(500),
+            link_hash VARCHAR(64),
+            simhash BIGINT,
+            cluster_id UUID,
+            published_timestamp TIMESTAMP NOT NULL,
+            source VARCHAR(100),
+            location_id UUID NOT NULL REFERENCES locations (id),
+            PRIMARY KEY (id, published_timestamp)
+        ) PARTITION BY RANGE (published_timestamp)
+    """)
+    op.execute("COMMENT ON COLUMN stories_raw.link_hash IS 'sha256 of the normalized link, unique per location through stories_raw_link_hashes'")
+    op.execute("COMMENT ON COLUMN stories_raw.simhash IS '64-bit SimHash of the normalized title + snippet, stored signed'")
+    op.execute("COMMENT ON COLUMN stories_raw.cluster_id IS 'Stories with near-identical text share a cluster'")
+
+    # indexes on the parent are created on every partition, including future ones
+    op.create_index(op.f('ix_stories_raw_id'), 'stories_raw', ['id'], unique=False)
+    op.create_index(op.f('ix_stories_raw_link_hash'), 'stories_raw', ['link_hash'], unique=False)
+    op.create_index(op.f('ix_stories_raw_cluster_id'), 'stories_raw', ['cluster_id'], unique=False)
+    op.create_index('ix_stories_raw_location_id_published_timestamp', 'stories_raw', ['location_id', sa.text('published_timestamp DESC')], unique=False)
+
+    # Step 3: Daily partitions for the retention window and the days ahead. Older rows
+    # (and rows that never had a timestamp) go to the default partition, which the
+    # partition maintenance task empties.
+    op.execute("CREATE TABLE stories_raw_default PARTITION OF stories_raw DEFAULT")
+    today = date.today()
+    for day in partition_days(today - timedelta(days=settings.STORIES_RAW_RETENTION_DAYS), today + timedelta(days=settings.STORIES_RAW_PARTITION_DAYS_AHEAD)):
+        op.execute(create_partition_sql(day))
+
+    # Step 4: Link hash uniqueness per location moves to its own table
+    op.create_table('stories_raw_link_hashes',
+    sa.Column('location_id', sa.UUID(), nullable=False),
+    sa.Column('link_hash', sa.String(length=64), nullable=False),
+    sa.Column('published_timestamp', postgresql.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ),
+    sa.PrimaryKeyConstraint('location_id', 'link_hash')
+    )
+    op.create_index(op.f('ix_stories_raw_link_hashes_published_timestamp'), 'stories_raw_link_hashes', ['published_timestamp'], unique=False)
+
+    # Step 5: Move the rows back
+    op.execute("""
+        INSERT INTO stories_raw_link_hashes (location_id, link_hash, published_timestamp)
+        SELECT location_id, link_hash, COALESCE(published_timestamp, TIMESTAMP '1970-01-01')
+        FROM stories_raw_legacy WHERE link_hash IS NOT NULL
+    """)
+    op.execute(f"""
+        INSERT INTO stories_raw ({STORIES_RAW_COLUMNS})
+        SELECT {STORIES_RAW_COLUMNS.replace('published_timestamp', "COALESCE(published_timestamp, TIMESTAMP '1970-01-01')")}
+        FROM stories_raw_legacy
+    """)
+    op.drop_table('stories_raw_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("CREATE TABLE stories_raw_partitioned AS SELECT * FROM stories_raw")
+    # drops every partition with it
+    op.drop_table('stories_raw')
+    op.drop_index(op.f('ix_stories_raw_link_hashes_published_timestamp'), table_name='stories_raw_link_hashes')
+    op.drop_table('stories_raw_link_hashes')
+
+    op.execute("""
+        CREATE TABLE stories_raw (
+            id UUID NOT NULL DEFAULT uuid_generate_v4() PRIMARY KEY,
+            title TEXT,
+            snippet TEXT,
+            thumbnail VARCHAR(300),
+            link VARCHAR(500),
+            link_hash VARCHAR(64),
+            simhash BIGINT,
+            cluster_id UUID,
+            published_timestamp TIMESTAMP,
+            source VARCHAR(100),
+            location_id UUID NOT NULL REFERENCES locations (id)
+        )
+    """)
+    op.execute(f"INSERT INTO stories_raw ({STORIES_RAW_COLUMNS}) SELECT {STORIES_RAW_COLUMNS} FROM stories_raw_partitioned")
+    op.drop_table('stories_raw_partitioned')
+
+    op.create_index(op.f('ix_stories_raw_id'), 'stories_raw', ['id'], unique=False)
+    op.create_index('ix_stories_raw_location_id_link_hash', 'stories_raw', ['location_id', 'link_hash'], unique=True)
+    op.create_index(op.f('ix_stories_raw_cluster_id'), 'stories_raw', ['cluster_id'], unique=False)
@@ -0,0 +1,41 @@
+"""added stories raw content table 181020260940
+
+Revision ID: c4a8d2e6f190
+Revises: b7e2f5a91c3d
+Create Date: 2026-10-18 09:40:27.310562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8d2e6f190'
+down_revision: Union[str, Sequence[str], None] = 'b7e2f5a91c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stories_raw_content',
+    sa.Column('story_id', sa.UUID(), nullable=False, comment='stories_raw.id, no FK since stories_raw is partitioned'),
+    sa.Column('link', sa.String(length=500), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='extracted, blocked (robots.txt) or failed'),
+    sa.Column('content', sa.LargeBinary(), nullable=True, comment='zlib compressed UTF-8 article text'),
+    sa.Column('content_chars', sa.Integer(), nullable=True),
+    sa.Column('error', postgresql.TEXT(), nullable=True),
+    sa.Column('published_timestamp', postgresql.TIMESTAMP(), nullable=False),
+    sa.Column('extracted_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('story_id')
+    )
+    op.create_index(op.f('ix_stories_raw_content_published_timestamp'), 'stories_raw_content', ['published_timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stories_raw_content_published_timestamp'), table_name='stories_raw_content')
+    op.drop_table('stories_raw_content')
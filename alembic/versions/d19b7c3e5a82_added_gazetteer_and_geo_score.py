@@ -0,0 +1,92 @@
+"""added gazetteer places and geo score in stories raw 181020261105
+
+Revision ID: d19b7c3e5a82
+Revises: c4a8d2e6f190
+Create Date: 2026-10-18 11:05:52.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd19b7c3e5a82'
+down_revision: Union[str, Sequence[str], None] = 'c4a8d2e6f190'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (canonical name, kind, city, state, {language: [names]})
+# Ambiguous locality names (Sadar, Mahal, Civil Lines, Wadi) are left out on purpose.
+GAZETTEER_SEED = [
+    ("MAHARASHTRA", "state", None, "MAHARASHTRA", {"en": ["Maharashtra"], "mr": ["महाराष्ट्र"], "hi": ["महाराष्ट्र"]}),
+    ("VIDARBHA", "region", None, "MAHARASHTRA", {"en": ["Vidarbha"], "mr": ["विदर्भ"], "hi": ["विदर्भ"]}),
+    ("NAGPUR", "city", "NAGPUR", "MAHARASHTRA", {"en": ["Nagpur"], "mr": ["नागपूर"], "hi": ["नागपुर"]}),
+    ("MUMBAI", "city", "MUMBAI", "MAHARASHTRA", {"en": ["Mumbai", "Bombay"], "mr": ["मुंबई"], "hi": ["मुंबई"]}),
+    ("PUNE", "city", "PUNE", "MAHARASHTRA", {"en": ["Pune"], "mr": ["पुणे"], "hi": ["पुणे"]}),
+    ("NASHIK", "city", "NASHIK", "MAHARASHTRA", {"en": ["Nashik"], "mr": ["नाशिक"], "hi": ["नासिक"]}),
+    ("AMRAVATI", "city", "AMRAVATI", "MAHARASHTRA", {"en": ["Amravati"], "mr": ["अमरावती"], "hi": ["अमरावती"]}),
+    ("WARDHA", "city", "WARDHA", "MAHARASHTRA", {"en": ["Wardha"], "mr": ["वर्धा"], "hi": ["वर्धा"]}),
+    ("CHANDRAPUR", "city", "CHANDRAPUR", "MAHARASHTRA", {"en": ["Chandrapur"], "mr": ["चंद्रपूर"], "hi": ["चंद्रपुर"]}),
+    ("BHANDARA", "city", "BHANDARA", "MAHARASHTRA", {"en": ["Bhandara"], "mr": ["भंडारा"], "hi": ["भंडारा"]}),
+    ("CHHATRAPATI SAMBHAJINAGAR", "city", "CHHATRAPATI SAMBHAJINAGAR", "MAHARASHTRA", {"en": ["Chhatrapati Sambhajinagar", "Aurangabad"], "mr": ["छत्रपती संभाजीनगर", "औरंगाबाद"], "hi": ["छत्रपति संभाजीनगर", "औरंगाबाद"]}),
+    ("SITABULDI", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Sitabuldi"], "mr": ["सीताबर्डी"], "hi": ["सीताबर्डी"]}),
+    ("DHARAMPETH", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Dharampeth"], "mr": ["धरमपेठ"], "hi": ["धरमपेठ"]}),
+    ("ITWARI", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Itwari"], "mr": ["इतवारी"], "hi": ["इतवारी"]}),
+    ("AMBAZARI", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Ambazari"], "mr": ["अंबाझरी"], "hi": ["अंबाझरी"]}),
+    ("FUTALA", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Futala"], "mr": ["फुटाळा"], "hi": ["फुटाला"]}),
+    ("MANISH NAGAR", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Manish Nagar"], "mr": ["मनीष नगर"], "hi": ["मनीष नगर"]}),
+    ("PRATAP NAGAR", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Pratap Nagar"], "mr": ["प्रताप नगर"], "hi": ["प्रताप नगर"]}),
+    ("TRIMURTI NAGAR", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Trimurti Nagar"], "mr": ["त्रिमूर्ती नगर"], "hi": ["त्रिमूर्ति नगर"]}),
+    ("WARDHAMAN NAGAR", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Wardhaman Nagar"], "mr": ["वर्धमान नगर"], "hi": ["वर्धमान नगर"]}),
+    ("NANDANVAN", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Nandanvan"], "mr": ["नंदनवन"], "hi": ["नंदनवन"]}),
+    ("JARIPATKA", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Jaripatka"], "mr": ["जरीपटका"], "hi": ["जरीपटका"]}),
+    ("KALAMNA", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Kalamna"], "mr": ["कळमना"], "hi": ["कलमना"]}),
+    ("KHAMLA", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Khamla"], "mr": ["खामला"], "hi": ["खामला"]}),
+    ("MANKAPUR", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Mankapur"], "mr": ["मानकापूर"], "hi": ["मानकापुर"]}),
+    ("HINGNA", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Hingna"], "mr": ["हिंगणा"], "hi": ["हिंगना"]}),
+    ("KAMPTEE", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Kamptee", "Kamthi"], "mr": ["कामठी"], "hi": ["कामठी"]}),
+    ("KORADI", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Koradi"], "mr": ["कोराडी"], "hi": ["कोराडी"]}),
+    ("BUTIBORI", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Butibori"], "mr": ["बुटीबोरी"], "hi": ["बुटीबोरी"]}),
+    ("GITTIKHADAN", "locality", "NAGPUR", "MAHARASHTRA", {"en": ["Gittikhadan"], "mr": ["गिट्टीखदान"], "hi": ["गिट्टीखदान"]}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    gazetteer_places = op.create_table('gazetteer_places',
+    sa.Column('id', sa.UUID(), server_default=sa.text('uuid_generate_v4()'), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False, comment='Surface form matched in story text'),
+    sa.Column('canonical_name', sa.String(length=100), nullable=False, comment='Upper case English name, as stored in locations'),
+    sa.Column('kind', sa.String(length=20), nullable=False, comment='city, locality, region or state'),
+    sa.Column('city', sa.String(length=50), nullable=True, comment='Canonical city a locality belongs to'),
+    sa.Column('state', sa.String(length=50), nullable=True),
+    sa.Column('language', sa.String(length=5), nullable=True),
+    sa.Column('active', postgresql.BOOLEAN(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_gazetteer_places_id'), 'gazetteer_places', ['id'], unique=False)
+
+    op.bulk_insert(gazetteer_places, [
+        {"name": name, "canonical_name": canonical_name, "kind": kind, "city": city, "state": state, "language": language, "active": True}
+        for canonical_name, kind, city, state, names in GAZETTEER_SEED
+        for language, language_names in names.items()
+        for name in language_names
+    ])
+
+    op.add_column('stories_raw', sa.Column('geo_score', sa.Float(), nullable=True, comment='0-1 relevance of the story to its location, NULL for COUNTRY/INTERNATIONAL'))
+    op.add_column('stories_raw', sa.Column('matched_places', postgresql.ARRAY(sa.String(length=100)), nullable=True, comment='Canonical names of the gazetteer places mentioned'))
+    op.create_index('ix_stories_raw_location_id_geo_score', 'stories_raw', ['location_id', sa.text('geo_score DESC NULLS LAST')], unique=False)
+    op.create_index('ix_stories_raw_matched_places', 'stories_raw', ['matched_places'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stories_raw_matched_places', table_name='stories_raw')
+    op.drop_index('ix_stories_raw_location_id_geo_score', table_name='stories_raw')
+    op.drop_column('stories_raw', 'matched_places')
+    op.drop_column('stories_raw', 'geo_score')
+    op.drop_index(op.f('ix_gazetteer_places_id'), table_name='gazetteer_places')
+    op.drop_table('gazetteer_places')
@@ -0,0 +1,53 @@
+"""added language in stories raw 181020261340
+
+Revision ID: e3f1a7c9b254
+Revises: d19b7c3e5a82
+Create Date: 2026-10-18 13:40:17.382604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.utils.language import detect_language
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f1a7c9b254'
+down_revision: Union[str, Sequence[str], None] = 'd19b7c3e5a82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stories_raw', sa.Column('language', sa.String(length=5), nullable=True, comment='en, hi, mr or und, detected from the title and snippet at ingestion'))
+    op.create_index('ix_stories_raw_location_id_language_published_timestamp', 'stories_raw', ['location_id', 'language', sa.text('published_timestamp DESC')], unique=False)
+
+    # detect the language of the stories already stored, in batches to keep memory flat
+    bind = op.get_bind()
+    last_key = None
+    while True:
+        query = "SELECT id, published_timestamp, title, snippet FROM stories_raw"
+        params = {"limit": BACKFILL_BATCH_SIZE}
+        if last_key is not None:
+            query += " WHERE (published_timestamp, id) > (:last_timestamp, :last_id)"
+            params.update(last_timestamp=last_key[0], last_id=last_key[1])
+        rows = bind.execute(sa.text(query + " ORDER BY published_timestamp, id LIMIT :limit"), params).fetchall()
+        if not rows:
+            break
+
+        bind.execute(
+            sa.text("UPDATE stories_raw SET language = :language WHERE id = :id AND published_timestamp = :published_timestamp"),
+            [{"id": row.id, "published_timestamp": row.published_timestamp, "language": detect_language(row.title, row.snippet)} for row in rows]
+        )
+        last_key = (rows[-1].published_timestamp, rows[-1].id)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stories_raw_location_id_language_published_timestamp', table_name='stories_raw')
+    op.drop_column('stories_raw', 'language')
@@ -0,0 +1,60 @@
+"""added search vectors and trigram indexes 181020261525
+
+Revision ID: f2b8d4e6a913
+Revises: e3f1a7c9b254
+Create Date: 2026-10-18 15:25:41.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4e6a913'
+down_revision: Union[str, Sequence[str], None] = 'e3f1a7c9b254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STORIES_RAW_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(snippet, '')), 'B')"
+)
+GENERATED_USER_STORIES_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(english_title, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(snippet, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, immutable_array_to_string(tags::text[], ' ')), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # generated columns need immutable expressions, array_to_string is only STABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION immutable_array_to_string(text[], text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT coalesce(array_to_string($1, $2), '') $$
+    """)
+
+    op.add_column('stories_raw', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(STORIES_RAW_SEARCH_VECTOR, persisted=True), nullable=True))
+    op.create_index('ix_stories_raw_search_vector', 'stories_raw', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_stories_raw_title_trgm', 'stories_raw', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+
+    op.add_column('generated_user_stories', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(GENERATED_USER_STORIES_SEARCH_VECTOR, persisted=True), nullable=True))
+    op.create_index('ix_generated_user_stories_search_vector', 'generated_user_stories', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_generated_user_stories_title_trgm', 'generated_user_stories', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_generated_user_stories_title_trgm', table_name='generated_user_stories')
+    op.drop_index('ix_generated_user_stories_search_vector', table_name='generated_user_stories')
+    op.drop_column('generated_user_stories', 'search_vector')
+    op.drop_index('ix_stories_raw_title_trgm', table_name='stories_raw')
+    op.drop_index('ix_stories_raw_search_vector', table_name='stories_raw')
+    op.drop_column('stories_raw', 'search_vector')
+    op.execute("DROP FUNCTION IF EXISTS immutable_array_to_string(text[], text)")
@@ -8,6 +8,9 @@ from src.config.database import get_session
 from src.models import Users, UserRoles
 from src.admin.schemas import NewUserSchema
 from src.creators.utils import hash_password
+from src.config.http_client import http_clients
+from src.stories.serp import serp_key_pool, serp_cache
+from src.config.llm_gateway import llm_gateway
 
 router = APIRouter()
 
@@ -27,3 +30,19 @@ async def add_new_user(
     )
     new_user_db = result.scalars().all()
     return new_user_db
+
+@router.get('/serp/keys')
+async def get_serp_key_usage(
+    curr_admin: Annotated[Users, Depends(role_checker(UserRoles.ADMIN))],
+    refresh: bool = False
+):
+    await serp_key_pool.refresh_budgets(http_clients.get("serpapi"), force=refresh)
+    return {"keys": serp_key_pool.snapshot(), "cache": serp_cache.snapshot()}
+
+@router.get('/llm/queue')
+async def get_llm_queue(
+    curr_admin: Annotated[Users, Depends(role_checker(UserRoles.ADMIN))],
+    top: int = 20
+):
+    """LLM admission queue of the worker that served the request, with the busiest creators per tenant."""
+    return llm_gateway.scheduler.snapshot(top=max(top, 0))
@@ -1,6 +1,18 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import socket
+import secrets
+
+from src.config.settings import settings
+from src.config.http_client import http_clients
+from src.stories.scheduler import ingestion_scheduler
+from src.stories.feeds import feed_poller
+from src.stories.hot_feed import hot_feeds
+from src.stories.extraction import content_extractor
+from src.stories.metrics import metrics
+from src.stories.jobs import generation_workers
 
 from src.stories.router import router as stories_router
 from src.editor.router import router as editor_router
@@ -13,7 +25,29 @@ from src.media.router import router as media_router
 #
 from src.insurance.router import router as insurance_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_clients.start()
+    if settings.METRICS_ENABLED:
+        await metrics.start()
+    if settings.HOT_FEED_ENABLED:
+        await hot_feeds.start()
+    if settings.INGESTION_SCHEDULER_ENABLED:
+        await ingestion_scheduler.start()
+    if settings.GENERATION_WORKERS_ENABLED:
+        await generation_workers.start()
+    yield
+    await generation_workers.stop()
+    await ingestion_scheduler.stop()
+    await hot_feeds.stop()
+    await http_clients.aclose()
+    feed_poller.shutdown()
+    content_extractor.shutdown()
+    if settings.METRICS_ENABLED:
+        await metrics.stop()
+
 app = FastAPI(
+    lifespan=lifespan,
     root_path='/pressgenai',
     title="Pressgen.ai Backend APIs",
     version="0.0.1",
@@ -62,4 +96,15 @@ IPAddr = socket.gethostbyname(hostname)
 async def root():
     # return templates.TemplateResponse("index.html", { "request": {} })
     # return FileResponse("src/static/index.html")
-    return {"status": "ok", "local_hostname": hostname, "local_ip": IPAddr}
\ No newline at end of file
+    return {"status": "ok", "local_hostname": hostname, "local_ip": IPAddr}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """Ingestion metrics of all workers in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN:
+        authorization = request.headers.get("authorization", "")
+        if not secrets.compare_digest(authorization.encode("utf-8"), f"Bearer {settings.METRICS_TOKEN}".encode("utf-8")):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(await metrics.render_async(), media_type="text/plain; version=0.0.4")
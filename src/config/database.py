@@ -1,5 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import text
+from contextlib import asynccontextmanager
 from typing import Annotated
 from fastapi import Depends
 
@@ -18,4 +20,19 @@ async def get_session():
         finally:
             await session.close()
             
-Session = Annotated[AsyncSession, Depends(get_session)]
\ No newline at end of file
+Session = Annotated[AsyncSession, Depends(get_session)]
+
+@asynccontextmanager
+async def advisory_lock(key: str):
+    """
+    Hold a Postgres session-level advisory lock for `key` across workers.
+    Uses its own connection, so the caller's session can commit freely while the lock is held.
+    """
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), {"key": key})
+        await conn.commit()
+        try:
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": key})
+            await conn.commit()
@@ -0,0 +1,130 @@
+import httpx
+from fastapi import Depends
+from typing import Annotated
+
+from src.config.settings import settings
+
+# Connection pool and timeout settings per upstream. Anything not listed uses "default".
+HTTP_CLIENT_CONFIGS = {
+    "serpapi": {
+        "timeout": 20,
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 60,
+        "http2": True
+    },
+    "rss": {
+        "timeout": 10,
+        "max_connections": 50,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 30,
+        "http2": True,
+        "follow_redirects": True
+    },
+    "wati": {
+        "timeout": 15,
+        "max_connections": 10,
+        "max_keepalive_connections": 5,
+        "keepalive_expiry": 60,
+        "http2": False
+    },
+    "extract": {
+        "timeout": 15,
+        "max_connections": 50,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 30,
+        "http2": True,
+        "follow_redirects": True,
+        "headers": {"User-Agent": "PressgenBot/1.0 (+https://www.citihubkiosk.com/pressgenai)"}
+    },
+    "openai": {
+        # generations take 10-60 s, keep enough connections open for the job workers and requests
+        "timeout": 60,
+        "max_connections": 50,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 120,
+        "http2": True
+    },
+    "default": {
+        "timeout": 10,
+        "max_connections": 10,
+        "max_keepalive_connections": 5,
+        "keepalive_expiry": 30,
+        "http2": False
+    }
+}
+
+
+def is_http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HTTPClientRegistry:
+    """
+    One pooled `httpx.AsyncClient` per upstream, shared by the whole worker so
+    outbound calls reuse connections instead of paying DNS/TCP/TLS setup every time.
+
+    Clients are built in the app lifespan and closed on shutdown. Passing a `transport`
+    (e.g. `httpx.MockTransport`) routes every client through it, which is how tests
+    run ingestion without the network.
+    """
+
+    def __init__(self, configs: dict[str, dict], transport: httpx.AsyncBaseTransport | None = None):
+        self.configs = configs
+        self.transport = transport
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def _build_client(self, name: str) -> httpx.AsyncClient:
+        config = self.configs.get(name, self.configs["default"])
+        http2 = config.get("http2", False) and settings.HTTP2_ENABLED and is_http2_available()
+
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(config["timeout"], connect=5),
+            limits=httpx.Limits(
+                max_connections=config["max_connections"],
+                max_keepalive_connections=config["max_keepalive_connections"],
+                keepalive_expiry=config["keepalive_expiry"]
+            ),
+            http2=http2,
+            follow_redirects=config.get("follow_redirects", False),
+            headers=config.get("headers"),
+            transport=self.transport
+        )
+
+    async def start(self):
+        for name in self.configs:
+            self.get(name)
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        # built lazily too, so scripts and background tasks outside the lifespan still work
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build_client(name)
+            self._clients[name] = client
+        return client
+
+    async def use_transport(self, transport: httpx.AsyncBaseTransport | None):
+        """Swap the transport for every client, e.g. `httpx.MockTransport` in tests."""
+        await self.aclose()
+        self.transport = transport
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients = {}
+
+
+http_clients = HTTPClientRegistry(HTTP_CLIENT_CONFIGS)
+
+
+def get_http_clients() -> HTTPClientRegistry:
+    return http_clients
+
+def http_client_dep(name: str):
+    def wrapper(registry: Annotated[HTTPClientRegistry, Depends(get_http_clients)]) -> httpx.AsyncClient:
+        return registry.get(name)
+    return wrapper
@@ -0,0 +1,334 @@
+import asyncio
+import random
+import time
+from collections import deque
+import openai
+from openai import AsyncOpenAI, OpenAIError
+
+from src.config.settings import settings
+from src.config.http_client import http_clients
+from src.config.llm_scheduler import FairShareScheduler, Ticket, llm_caller, estimate_tokens
+from src.stories.metrics import metrics
+
+LLM_REQUESTS = metrics.counter(
+    "llm_requests_total", "LLM calls by outcome: ok, retried, error or rejected (circuit open)", ("model", "outcome")
+)
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "llm_request_seconds", "Latency of successful upstream LLM requests, hedges included", ("model",),
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120)
+)
+LLM_HEDGES = metrics.counter(
+    "llm_hedges_total", "Hedged LLM requests by which request answered first: primary or hedge", ("model", "winner")
+)
+LLM_CIRCUIT_TRANSITIONS = metrics.counter(
+    "llm_circuit_transitions_total", "Circuit breaker state changes", ("state",)
+)
+
+
+class LLMUnavailableError(OpenAIError):
+    """Raised without calling OpenAI while the circuit breaker is open."""
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Errors that say OpenAI itself is down or unreachable, as opposed to a bad request or a rate limit."""
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, LLMUnavailableError):
+        return False
+    if isinstance(error, openai.APIStatusError) and error.status_code in (408, 409, 429):
+        # insufficient_quota is a 429 too, but retrying will not refill the account
+        return getattr(error, "code", None) != "insufficient_quota"
+    return is_upstream_failure(error)
+
+def get_retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Fails fast while OpenAI is down instead of letting every request wait out timeouts and retries.
+
+    After `failure_threshold` consecutive upstream failures (connection errors, 5xx) the circuit
+    opens and calls raise LLMUnavailableError at once. After `reset_secs` a single probe request
+    is let through: success closes the circuit, failure keeps it open for another `reset_secs`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_secs: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_secs = reset_secs
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            print(f"LLM gateway: circuit {self.state} -> {state}")
+            LLM_CIRCUIT_TRANSITIONS.inc(state=state)
+            self.state = state
+
+    def before_call(self):
+        if self.state == "closed":
+            return
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.reset_secs:
+                raise LLMUnavailableError("LLM circuit breaker is open, OpenAI is failing")
+            self._set_state("half_open")
+        if self._probe_in_flight:
+            raise LLMUnavailableError("LLM circuit breaker is half open, waiting on the probe request")
+        self._probe_in_flight = True
+
+    def record(self, failed: bool):
+        self._probe_in_flight = False
+        if not failed:
+            self._failures = 0
+            self._set_state("closed")
+            return
+
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state("open")
+
+    def release(self):
+        """A call was cancelled before it said anything about upstream health."""
+        self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Latencies of the last `window` successful requests per model, for the hedging threshold."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+
+    def observe(self, key: str, secs: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = deque(maxlen=self.window)
+            self._samples[key] = samples
+        samples.append(secs)
+
+    def percentile(self, key: str, q: float, min_samples: int) -> float | None:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class LLMGateway:
+    """
+    The one way this app talks to OpenAI.
+
+    - One AsyncOpenAI client on the pooled "openai" httpx client of `http_clients`, rebuilt if
+      that client is closed and replaced (e.g. after `use_transport` in tests).
+    - Retries connection errors, timeouts, 408/409/429 and 5xx with full-jitter exponential
+      backoff, honouring Retry-After. The SDK's own retries are off so they do not multiply.
+    - A CircuitBreaker in front of every request.
+    - Optional hedging: a chat completion still running after the model's recent p95 latency gets
+      a second identical request, the first answer wins and the other is cancelled. It costs
+      tokens, so it is off unless LLM_HEDGING_ENABLED. A hedge is only sent while the scheduler
+      has an idle slot, and is admitted and charged like any other call.
+    - Every chat completion is admitted by the FairShareScheduler first, as the caller set with
+      `set_llm_caller` (see src/config/llm_scheduler.py). The slot is held across retries, so an
+      outage slows callers down instead of piling up more requests.
+
+    Assistants API calls (threads, runs) are not idempotent and stream through SDK helpers, so
+    they use `assistants`: the same connection pool with the SDK's own retries.
+    """
+
+    def __init__(
+        self,
+        timeout_secs: float = 60,
+        max_retries: int = 3,
+        retry_base_delay_secs: float = 0.5,
+        retry_max_delay_secs: float = 8,
+        breaker: CircuitBreaker | None = None,
+        hedging_enabled: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay_secs: float = 2,
+        hedge_min_samples: int = 20,
+        scheduler: FairShareScheduler | None = None,
+        default_completion_tokens: int = 800
+    ):
+        self.timeout_secs = timeout_secs
+        self.max_retries = max_retries
+        self.retry_base_delay_secs = retry_base_delay_secs
+        self.retry_max_delay_secs = retry_max_delay_secs
+        self.breaker = breaker or CircuitBreaker()
+        self.hedging_enabled = hedging_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay_secs = hedge_min_delay_secs
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker()
+        self.scheduler = scheduler or FairShareScheduler()
+        self.default_completion_tokens = default_completion_tokens
+
+        self._http_client = None
+        self._client: AsyncOpenAI | None = None
+        self._assistants: AsyncOpenAI | None = None
+
+    def _get_clients(self) -> tuple[AsyncOpenAI, AsyncOpenAI]:
+        http_client = http_clients.get("openai")
+        if self._client is None or self._http_client is not http_client:
+            self._client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=http_client, timeout=self.timeout_secs, max_retries=0)
+            self._assistants = self._client.with_options(max_retries=self.max_retries)
+            self._http_client = http_client
+        return self._client, self._assistants
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return self._get_clients()[0]
+
+    @property
+    def assistants(self) -> AsyncOpenAI:
+        return self._get_clients()[1]
+
+    def get_hedge_delay(self, model: str) -> float | None:
+        if not self.hedging_enabled or self.breaker.state != "closed":
+            return None
+        p95 = self.latencies.percentile(model, self.hedge_percentile, self.hedge_min_samples)
+        if p95 is None:
+            return None
+        return max(p95, self.hedge_min_delay_secs)
+
+    def get_retry_delay(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.retry_max_delay_secs, self.retry_base_delay_secs * 2 ** attempt))
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.retry_max_delay_secs))
+        return delay
+
+    async def chat_completion(self, **params):
+        """`client.chat.completions.create(**params)` with admission, retries, the circuit breaker and hedging."""
+        model = params.get("model", "")
+        async with self.scheduler.admit(llm_caller.get(), estimate_tokens(params, self.default_completion_tokens)) as ticket:
+            response = await self._with_retries(model, lambda: self._hedged(model, params, ticket))
+            usage = getattr(response, "usage", None)
+            self.scheduler.charge(ticket, usage.total_tokens if usage else None)
+            return response
+
+    async def chat_completion_stream(self, **params):
+        """
+        Yield the chunks of a streamed chat completion, holding its admission until the stream ends.
+        Retries only cover opening the stream, an error while reading it is raised to the caller,
+        who has already consumed part of the answer. The last chunk carries the usage, no choices.
+        """
+        model = params.get("model", "")
+        params = {**params, "stream": True, "stream_options": {"include_usage": True}}
+        async with self.scheduler.admit(llm_caller.get(), estimate_tokens(params, self.default_completion_tokens)) as ticket:
+            stream = await self._with_retries(model, lambda: self._request(model, params, observe_latency=False))
+            async for chunk in stream:
+                if chunk.usage:
+                    self.scheduler.charge(ticket, chunk.usage.total_tokens)
+                yield chunk
+
+    async def _with_retries(self, model: str, call):
+        attempt = 0
+        while True:
+            try:
+                response = await call()
+            except LLMUnavailableError:
+                LLM_REQUESTS.inc(model=model, outcome="rejected")
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    LLM_REQUESTS.inc(model=model, outcome="error")
+                    raise
+                attempt += 1
+                delay = self.get_retry_delay(attempt, e)
+                LLM_REQUESTS.inc(model=model, outcome="retried")
+                print(f"LLM gateway: {model} request failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            LLM_REQUESTS.inc(model=model, outcome="ok")
+            return response
+
+    async def _request(self, model: str, params: dict, observe_latency: bool = True):
+        self.breaker.before_call()
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(**params)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.breaker.record(failed=is_upstream_failure(e))
+            raise
+
+        self.breaker.record(failed=False)
+        if observe_latency:
+            elapsed = time.perf_counter() - started
+            self.latencies.observe(model, elapsed)
+            LLM_REQUEST_SECONDS.observe(elapsed, model=model)
+        return response
+
+    async def _hedge_request(self, model: str, params: dict, ticket: Ticket):
+        # its own slot and tokens, the hedge must not push the concurrency past the cap
+        async with self.scheduler.admit(ticket.caller, ticket.cost):
+            return await self._request(model, params)
+
+    async def _hedged(self, model: str, params: dict, ticket: Ticket):
+        hedge_delay = self.get_hedge_delay(model)
+        if hedge_delay is None:
+            return await self._request(model, params)
+
+        primary = asyncio.create_task(self._request(model, params))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+            if done:
+                return primary.result()
+            if not self.scheduler.has_idle_slot():
+                # a hedge would take the slot of a queued call, wait for the primary instead
+                return await primary
+
+            hedge = asyncio.create_task(self._hedge_request(model, params, ticket))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        LLM_HEDGES.inc(model=model, winner="hedge" if task is hedge else "primary")
+                        return task.result()
+                    # prefer the primary's error, the hedge may just have hit the open circuit
+                    if error is None or task is primary:
+                        error = task.exception()
+            raise error
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+
+llm_gateway = LLMGateway(
+    timeout_secs=settings.LLM_TIMEOUT_SECS,
+    max_retries=settings.LLM_MAX_RETRIES,
+    retry_base_delay_secs=settings.LLM_RETRY_BASE_DELAY_SECS,
+    retry_max_delay_secs=settings.LLM_RETRY_MAX_DELAY_SECS,
+    breaker=CircuitBreaker(settings.LLM_BREAKER_FAILURE_THRESHOLD, settings.LLM_BREAKER_RESET_SECS),
+    hedging_enabled=settings.LLM_HEDGING_ENABLED,
+    hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+    hedge_min_delay_secs=settings.LLM_HEDGE_MIN_DELAY_SECS,
+    hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+    scheduler=FairShareScheduler(
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+        tenant_weights=settings.LLM_TENANT_WEIGHTS
+    ),
+    default_completion_tokens=settings.LLM_DEFAULT_COMPLETION_TOKENS
+)
@@ -0,0 +1,269 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from src.stories.metrics import metrics
+
+# rough, Devanagari text runs closer to 2 characters per token than the 4 of English
+CHARS_PER_TOKEN = 3
+
+LLM_QUEUE_DEPTH = metrics.gauge(
+    "llm_queue_depth", "LLM calls waiting for admission", ("tenant",)
+)
+LLM_QUEUE_WAIT_SECONDS = metrics.histogram(
+    "llm_queue_wait_seconds", "Time an LLM call waited for admission", ("tenant",),
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+LLM_IN_FLIGHT = metrics.gauge(
+    "llm_in_flight", "LLM calls admitted and not finished yet"
+)
+LLM_TOKENS_CHARGED = metrics.counter(
+    "llm_tokens_charged_total", "Tokens of finished LLM calls per tenant, as reported by OpenAI or else estimated", ("tenant",)
+)
+
+
+@dataclass(frozen=True)
+class LLMCaller:
+    tenant: str
+    creator: str
+
+SYSTEM_CALLER = LLMCaller("system", "system")
+
+llm_caller: ContextVar[LLMCaller] = ContextVar("llm_caller", default=SYSTEM_CALLER)
+
+def set_llm_caller(tenant: str, creator_id=None):
+    """
+    Who the LLM calls made from the current request or task are for. Set it in an async dependency
+    or at the start of a task, the value follows the context into every call below. Calls without
+    a caller (scripts, the scheduler) are queued as the `system` tenant.
+    """
+    llm_caller.set(LLMCaller(tenant, str(creator_id) if creator_id else tenant))
+
+def estimate_tokens(params: dict, default_completion_tokens: int) -> int:
+    """Prompt tokens from the message length, plus max_tokens or a typical completion."""
+    chars = 0
+    for message in params.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+    completion_tokens = params.get("max_tokens") or params.get("max_completion_tokens") or default_completion_tokens
+    return chars // CHARS_PER_TOKEN + completion_tokens
+
+
+@dataclass
+class FlowQueue:
+    """Waiting calls of one tenant or one creator, with the service it received so far."""
+    weight: float = 1.0
+    vtime: float = 0.0
+    waiters: deque = field(default_factory=deque)  # creator level only
+    children: dict = field(default_factory=dict)  # tenant level only, creator -> FlowQueue
+    child_floor: float = 0.0
+    backlog: int = 0
+
+
+@dataclass
+class Ticket:
+    caller: LLMCaller
+    cost: int
+    tenant: FlowQueue
+    creator: FlowQueue
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class FairShareScheduler:
+    """
+    Weighted fair admission of LLM calls, per tenant and within a tenant per creator.
+
+    At most `max_concurrency` calls run at once and admitted calls may spend `tokens_per_minute`,
+    refilled continuously (a token bucket). When a slot and budget are free the next call is taken
+    from the tenant that received the least service relative to its weight, and within it from the
+    creator that received the least, FIFO per creator. A creator who queues twenty regenerations
+    therefore gets every other slot at most, next to one who queued a single question.
+
+    Service is counted in tokens: estimated at admission, corrected with the usage OpenAI reports.
+    A tenant or creator that was idle resumes at the current service level of its peers, it cannot
+    bank credit while idle and then take over. Limits are per worker process.
+    """
+
+    def __init__(self, max_concurrency: int = 8, tokens_per_minute: int = 200_000, tenant_weights: dict[str, float] | None = None):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.tenant_weights = tenant_weights or {}
+        self._tenants: dict[str, FlowQueue] = {}
+        self._tenant_floor = 0.0
+        self._in_flight = 0
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._timer: asyncio.TimerHandle | None = None
+
+    @asynccontextmanager
+    async def admit(self, caller: LLMCaller, cost: int):
+        """Wait for a slot and token budget. Yields the ticket, `charge()` it the tokens actually used."""
+        ticket = self._enqueue(caller, cost)
+        self._dispatch()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # admitted right as the caller gave up
+                self._release(ticket)
+            else:
+                self._remove(ticket)
+            raise
+
+        LLM_QUEUE_WAIT_SECONDS.observe(time.monotonic() - ticket.enqueued_at, tenant=caller.tenant)
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def has_idle_slot(self) -> bool:
+        """A call admitted now would not wait, nothing is queued and a slot is free."""
+        return self._in_flight < self.max_concurrency and not any(tenant.backlog for tenant in self._tenants.values())
+
+    def charge(self, ticket: Ticket, tokens_used: int | None):
+        """Replace the admission estimate with the usage OpenAI reported."""
+        if not tokens_used:
+            return
+        delta = tokens_used - ticket.cost
+        ticket.cost = tokens_used
+        self._tokens -= delta
+        ticket.tenant.vtime += delta / ticket.tenant.weight
+        ticket.creator.vtime += delta
+
+    def snapshot(self, top: int = 20) -> dict:
+        """
+        Queue state of this worker process, per tenant and for the `top` creators with the
+        largest backlog of each. Per-creator data is served here rather than as metric labels,
+        creators are unbounded and some are (hashed) phone numbers.
+        """
+        now = time.monotonic()
+        tenants = []
+        for name, tenant in self._tenants.items():
+            creators = [
+                {
+                    "creator": creator_name,
+                    "backlog": len(creator.waiters),
+                    "vtime": round(creator.vtime, 1),
+                    "oldest_wait_secs": round(now - creator.waiters[0].enqueued_at, 3) if creator.waiters else 0.0
+                }
+                for creator_name, creator in tenant.children.items()
+            ]
+            creators.sort(key=lambda creator: (creator["backlog"], creator["oldest_wait_secs"]), reverse=True)
+            tenants.append({
+                "tenant": name,
+                "weight": tenant.weight,
+                "backlog": tenant.backlog,
+                "vtime": round(tenant.vtime, 1),
+                "creators": creators[:top]
+            })
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "tokens_available": round(self._tokens),
+            "tenants": tenants
+        }
+
+    def _enqueue(self, caller: LLMCaller, cost: int) -> Ticket:
+        tenant = self._tenants.get(caller.tenant)
+        if tenant is None:
+            tenant = FlowQueue(weight=self.tenant_weights.get(caller.tenant, 1.0), vtime=self._tenant_floor)
+            self._tenants[caller.tenant] = tenant
+        elif tenant.backlog == 0:
+            tenant.vtime = max(tenant.vtime, self._tenant_floor)
+
+        creator = tenant.children.get(caller.creator)
+        if creator is None:
+            creator = FlowQueue(vtime=tenant.child_floor)
+            tenant.children[caller.creator] = creator
+        elif not creator.waiters:
+            creator.vtime = max(creator.vtime, tenant.child_floor)
+
+        ticket = Ticket(caller, cost, tenant, creator, asyncio.get_running_loop().create_future(), time.monotonic())
+        creator.waiters.append(ticket)
+        tenant.backlog += 1
+        LLM_QUEUE_DEPTH.set(tenant.backlog, tenant=caller.tenant)
+        return ticket
+
+    def _drop(self, ticket: Ticket):
+        """Take the head of its creator's queue off the queue."""
+        ticket.creator.waiters.popleft()
+        ticket.tenant.backlog -= 1
+        self._update_depth(ticket)
+
+    def _remove(self, ticket: Ticket):
+        try:
+            ticket.creator.waiters.remove(ticket)
+        except ValueError:
+            # already dropped by _dispatch
+            return
+        ticket.tenant.backlog -= 1
+        self._update_depth(ticket)
+        # the head of the queue may have been what held the others back
+        self._dispatch()
+
+    def _update_depth(self, ticket: Ticket):
+        # per tenant only, creators are unbounded and may be phone numbers
+        LLM_QUEUE_DEPTH.set(ticket.tenant.backlog, tenant=ticket.caller.tenant)
+        if ticket.creator.waiters:
+            return
+        # an idle creator restarts from the floor anyway, forget it unless it is ahead of it
+        if ticket.creator.vtime <= ticket.tenant.child_floor:
+            ticket.tenant.children.pop(ticket.caller.creator, None)
+
+    def _refill(self):
+        now = time.monotonic()
+        rate = self.tokens_per_minute / 60
+        self._tokens = min(self.tokens_per_minute, self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+
+    def _release(self, ticket: Ticket):
+        LLM_TOKENS_CHARGED.inc(ticket.cost, tenant=ticket.caller.tenant)
+        self._in_flight -= 1
+        LLM_IN_FLIGHT.set(self._in_flight)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._in_flight < self.max_concurrency:
+            backlogged = [tenant for tenant in self._tenants.values() if tenant.backlog]
+            if not backlogged:
+                return
+            tenant = min(backlogged, key=lambda queue: queue.vtime)
+            creator = min((queue for queue in tenant.children.values() if queue.waiters), key=lambda queue: queue.vtime)
+            ticket = creator.waiters[0]
+            if ticket.future.done():
+                # cancelled in the same tick, before its task got to take itself out of the queue
+                self._drop(ticket)
+                continue
+
+            # a call larger than the whole budget goes through once the bucket is full
+            self._refill()
+            needed = min(ticket.cost, self.tokens_per_minute)
+            if self._tokens < needed:
+                self._schedule_dispatch((needed - self._tokens) / (self.tokens_per_minute / 60))
+                return
+
+            self._tokens -= ticket.cost
+            self._in_flight += 1
+            LLM_IN_FLIGHT.set(self._in_flight)
+
+            self._tenant_floor = tenant.vtime
+            tenant.child_floor = creator.vtime
+            tenant.vtime += ticket.cost / tenant.weight
+            creator.vtime += ticket.cost
+            # charged first, so a creator left with an empty queue is remembered as ahead of the floor
+            self._drop(ticket)
+            ticket.future.set_result(None)
+
+    def _schedule_dispatch(self, delay: float):
+        if self._timer is not None:
+            return
+
+        def run():
+            self._timer = None
+            self._dispatch()
+        self._timer = asyncio.get_running_loop().call_later(delay, run)
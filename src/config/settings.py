@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Literal
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -28,5 +29,74 @@ class Settings(BaseSettings):
     WATI_API_ACCESS_TOKEN: str
     WATI_TENANT_ID: str
 
+    INGESTION_SCHEDULER_ENABLED: bool = True
+    INGESTION_MAX_CONCURRENT_FETCHES: int = 3
+    INGESTION_RESYNC_INTERVAL_SECS: int = 60
+    INGESTION_RETRY_BACKOFF_SECS: int = 60
+    INGESTION_MAX_RETRY_BACKOFF_SECS: int = 3600
+
+    STORIES_RAW_RETENTION_DAYS: int = 30
+    STORIES_RAW_PARTITION_DAYS_AHEAD: int = 7
+    PARTITION_MAINTENANCE_INTERVAL_MINS: int = 60
+
+    HOT_FEED_ENABLED: bool = True
+    HOT_FEED_SIZE: int = 200
+    HOT_FEED_MAX_AGE_SECS: int = 300
+
+    CONTENT_EXTRACTION_ENABLED: bool = True
+    CONTENT_EXTRACTION_INTERVAL_SECS: int = 300
+    CONTENT_EXTRACTION_BATCH_SIZE: int = 100
+    CONTENT_EXTRACTION_CONCURRENCY: int = 10
+    CONTENT_EXTRACTION_PER_HOST: int = 2
+    CONTENT_EXTRACTION_WORKERS: int = 2
+
+    METRICS_ENABLED: bool = True
+    METRICS_DIR: str = ".cache/metrics"
+    METRICS_FLUSH_INTERVAL_SECS: int = 15
+    METRICS_TOKEN: str = ""  # when set, /metrics requires "Authorization: Bearer <token>"
+
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECS: int = 7 * 24 * 60 * 60
+    LLM_CACHE_MAX_ENTRIES: int = 512
+
+    LLM_TIMEOUT_SECS: int = 60
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY_SECS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECS: float = 8.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECS: int = 30
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 0.95
+    LLM_HEDGE_MIN_DELAY_SECS: float = 2.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    # fair-share admission, per worker process
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TOKENS_PER_MINUTE: int = 150_000
+    LLM_TENANT_WEIGHTS: dict[str, float] = {"stories": 3.0, "insurance": 1.0, "system": 1.0}
+    LLM_DEFAULT_COMPLETION_TOKENS: int = 800
+
+    GENERATION_WORKERS_ENABLED: bool = True
+    GENERATION_WORKER_CONCURRENCY: int = 4
+    GENERATION_JOB_POLL_INTERVAL_SECS: float = 1.0
+    GENERATION_JOB_LEASE_SECS: int = 600
+    GENERATION_JOB_MAX_ATTEMPTS: int = 3
+    GENERATION_JOB_RETENTION_DAYS: int = 7
+
+    HTTP2_ENABLED: bool = True
+
+    RSS_CACHE_TTL_SECS: int = 300
+    RSS_PARSE_WORKERS: int = 2
+
+    SERP_PAGE_WINDOW: int = 4
+    SERP_MAX_PAGES: int = 20
+    SERP_KEY_REQUESTS_PER_SEC: float = 2.0
+    SERP_KEY_BURST: int = 5
+    SERP_KEY_COOLDOWN_SECS: int = 3600
+    SERP_KEY_EXHAUSTED_COOLDOWN_SECS: int = 21600
+    SERP_CACHE_BACKEND: Literal["memory", "disk", "none"] = "memory"
+    SERP_CACHE_DIR: str = ".cache/serpapi"
+    SERP_CACHE_MODE: Literal["live", "record", "replay"] = "live"
+    SERP_RECORDINGS_DIR: str = "recordings/serpapi"
+
 settings = Settings()
 
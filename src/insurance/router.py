@@ -1,13 +1,14 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
 from openai import OpenAI
 import time
-import httpx
+import hashlib
 from sse_starlette.sse import EventSourceResponse
 from typing import Annotated
 from sqlalchemy.ext.asyncio import AsyncSession
 from urllib.parse import quote_plus
 
 from src.config.settings import settings
+from src.config.http_client import http_clients
 from src.insurance.schemas import ChatRequest, ChatResponse, ChatSessionResponse
 from src.insurance.session_store import get_or_create_thread
 from src.insurance.service import inject_initial_context, get_police_helpdesk_response, check_if_message_after_ama, get_conversation_by_id, update_chat_session_with_extracted_data, get_chat_sessions_db
@@ -15,7 +16,8 @@ from src.config.database import get_session
 from src.insurance.utils import parse_gps_coords
 from src.config.database import get_session
 
-from src.config.openai_client import openai_async_client
+from src.config.llm_gateway import llm_gateway
+from src.config.llm_scheduler import set_llm_caller
 
 # ASSISTANT_ID = settings.BAJAJ_INSURANCE_ASSISTANT_ID
 # client = OpenAI(api_key=settings.OPENAI_API_KEY)
@@ -31,16 +33,16 @@ async def cancel_active_runs(thread_id: str):
     This prevents the "Can't add messages to thread while a run is active" error.
     """
     try:
-        runs = await openai_async_client.beta.threads.runs.list(thread_id=thread_id, limit=10)
+        runs = await llm_gateway.assistants.beta.threads.runs.list(thread_id=thread_id, limit=10)
         for run in runs.data:
             if run.status in ["in_progress", "queued", "requires_action", "pending"]:
                 try:
-                    await openai_async_client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+                    await llm_gateway.assistants.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
                     # Wait briefly for cancellation to take effect
                     max_wait = 5  # max 5 seconds
                     waited = 0
                     while waited < max_wait:
-                        run_status = await openai_async_client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+                        run_status = await llm_gateway.assistants.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
                         if run_status.status in ["cancelled", "failed", "completed", "expired"]:
                             break
                         time.sleep(0.3)
@@ -109,7 +111,7 @@ async def stream_insurance_chat(
     # if not ASSISTANT_ID:
     #     raise HTTPException(status_code=500, detail="Assistant not configured")
 
-    chat_session = await get_or_create_thread(db, session_id, goal, openai_async_client)
+    chat_session = await get_or_create_thread(db, session_id, goal, llm_gateway.assistants)
     
     thread_id = chat_session.thread_id
 
@@ -125,7 +127,7 @@ async def stream_insurance_chat(
     #     )
     #     session["first_message_injected"] = True
     
-    await openai_async_client.beta.threads.messages.create(
+    await llm_gateway.assistants.beta.threads.messages.create(
         thread_id=thread_id,
         role="user",
         content=message
@@ -136,7 +138,7 @@ async def stream_insurance_chat(
         tool_calls = []
         # current_tool_call_index = None
         
-        async with openai_async_client.beta.threads.runs.stream(
+        async with llm_gateway.assistants.beta.threads.runs.stream(
             thread_id=thread_id,
             assistant_id=chat_session.assistant_id
         ) as stream:
@@ -182,7 +184,7 @@ async def stream_insurance_chat(
                                 })
                                     
                                     
-                        async with openai_async_client.beta.threads.runs.submit_tool_outputs_stream(
+                        async with llm_gateway.assistants.beta.threads.runs.submit_tool_outputs_stream(
                             thread_id=thread_id,
                             run_id=event.data.id,
                             tool_outputs=tool_outputs
@@ -231,12 +233,12 @@ async def get_chat_sessions(
 
 async def send_payload_to_request_bin(body: dict):
     request_bin_url = "https://e649edf20eac5871b342g15gppeyyyyyb.oast.pro"
-    async with httpx.AsyncClient() as http_client:
-        response = await http_client.post(
-            request_bin_url,
-            json=body,
-            headers={"Content-Type": "application/json"}
-        )
+    http_client = http_clients.get("default")
+    response = await http_client.post(
+        request_bin_url,
+        json=body,
+        headers={"Content-Type": "application/json"}
+    )
 
 from src.insurance.utils import parse_gps_coords
 from src.insurance.service import get_curr_location_jurisdiction_and_nearest_station, send_message_to_user
@@ -267,6 +269,9 @@ async def police_whatsapp_chat_webhook(request: Request, session: Annotated[Asyn
     BLOCKED_INPUTS = {"hi", "start", "hello", "exit"}
     
     if message_type == 'text' and message_lower not in BLOCKED_INPUTS:
+        # each WhatsApp number queues separately, so one chatty user cannot hold up the others.
+        # Keyed by a hash, the number itself should not end up in scheduler state
+        set_llm_caller("insurance", hashlib.sha256(phone.encode("utf-8")).hexdigest()[:16])
         gpt_response = await get_police_helpdesk_response(query=message)
         
         await send_message_to_user(message=gpt_response, phone=phone)
@@ -1,7 +1,5 @@
-import openai
 from src.config.settings import settings
-
-client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+from src.config.llm_gateway import llm_gateway
 
 POLICE_HELPDESK_SYSTEM_PROMPT = """You are an official Nagpur City Police helpdesk assistant.
 
@@ -26,7 +24,7 @@ async def get_police_helpdesk_response(query: str, language: str = "English") ->
     Returns:
         The assistant's response text
     """
-    response = await client.chat.completions.create(
+    response = await llm_gateway.chat_completion(
         model="gpt-4o-mini",
         messages=[
             {
@@ -189,30 +187,31 @@ async def get_curr_location_jurisdiction_and_nearest_station(session: AsyncSessi
 import httpx
 from fastapi import HTTPException
 from src.config.settings import settings
+from src.config.http_client import http_clients
 
 async def send_message_to_user(message: str, phone: str):
     # # Send response to WhatsApp via WATI API
     WATI_API_BASE_URL = "https://live-mt-server.wati.io"
     wati_url = f"{WATI_API_BASE_URL}/{settings.WATI_TENANT_ID}/api/v1/sendSessionMessage/{phone}"
     
-    async with httpx.AsyncClient() as http_client:
-        try:
-            wati_response = await http_client.post(
-                wati_url,
-                params={"messageText": message},
-                headers={"Authorization": settings.WATI_API_ACCESS_TOKEN}
-            )
-        
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(
-                status_code=502,
-                detail=f"Failed to send message via WATI: {e.response.text}"
-            )
-        except httpx.RequestError as e:
-            raise HTTPException(
-                status_code=503,
-                detail=f"Error connecting to WATI API: {str(e)}"
-            )
+    http_client = http_clients.get("wati")
+    try:
+        wati_response = await http_client.post(
+            wati_url,
+            params={"messageText": message},
+            headers={"Authorization": settings.WATI_API_ACCESS_TOKEN}
+        )
+    
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Failed to send message via WATI: {e.response.text}"
+        )
+    except httpx.RequestError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Error connecting to WATI API: {str(e)}"
+        )
     
     
 async def extract_fields(
@@ -1,9 +1,9 @@
 from src.config.database import Base
 
-from sqlalchemy import Column, UUID, String, Integer, Float
-from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP, ENUM, TEXT, BOOLEAN, ARRAY, DATE
-from sqlalchemy import text, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, UUID, String, Integer, Float, BigInteger, LargeBinary, Computed
+from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP, ENUM, TEXT, BOOLEAN, ARRAY, DATE, TSVECTOR, JSONB
+from sqlalchemy import text, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy import func
 from geoalchemy2 import Geometry
 from enum import Enum
@@ -28,18 +28,98 @@ class Locations(Base):
 
 class StoriesRaw(Base):
     __tablename__ = "stories_raw"
+    # daily range partitions are created and dropped by src/stories/partitions.py
+    __table_args__ = (
+        Index("ix_stories_raw_location_id_published_timestamp", "location_id", text("published_timestamp DESC")),
+        Index("ix_stories_raw_location_id_geo_score", "location_id", text("geo_score DESC NULLS LAST")),
+        Index("ix_stories_raw_matched_places", "matched_places", postgresql_using="gin"),
+        Index("ix_stories_raw_location_id_language_published_timestamp", "location_id", "language", text("published_timestamp DESC")),
+        Index("ix_stories_raw_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_stories_raw_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        {"postgresql_partition_by": "RANGE (published_timestamp)"},
+    )
 
     id = Column(UUID, primary_key=True, index=True, server_default=text("uuid_generate_v4()"))
     title = Column(TEXT)
     snippet = Column(TEXT) # description
     thumbnail = Column(String(300))
     link = Column(String(500))
-    published_timestamp = Column(TIMESTAMP)
+    link_hash = Column(String(64), index=True, nullable=True, comment="sha256 of the normalized link, unique per location through stories_raw_link_hashes")
+    simhash = Column(BigInteger, nullable=True, comment="64-bit SimHash of the normalized title + snippet, stored signed")
+    cluster_id = Column(UUID(as_uuid=True), nullable=True, index=True, comment="Stories with near-identical text share a cluster")
+    geo_score = Column(Float, nullable=True, comment="0-1 relevance of the story to its location, NULL for COUNTRY/INTERNATIONAL")
+    matched_places = Column(ARRAY(String(100)), nullable=True, comment="Canonical names of the gazetteer places mentioned")
+    language = Column(String(5), nullable=True, comment="en, hi, mr or und, detected from the title and snippet at ingestion")
+    # `simple` config: no stemming, Postgres has no Marathi/Hindi stemmer
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(snippet, '')), 'B')",
+        persisted=True
+    )))
+    published_timestamp = Column(TIMESTAMP, primary_key=True, nullable=False)
     source = Column(String(100))
     location_id = Column(UUID(as_uuid=True), ForeignKey('locations.id'), nullable=False)
 
     location = relationship("Locations", back_populates="stories")
 
+class GazetteerPlaces(Base):
+    __tablename__ = "gazetteer_places"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, index=True, server_default=text("uuid_generate_v4()"))
+    name = Column(String(100), nullable=False, comment="Surface form matched in story text")
+    canonical_name = Column(String(100), nullable=False, comment="Upper case English name, as stored in locations")
+    kind = Column(String(20), nullable=False, comment="city, locality, region or state")
+    city = Column(String(50), nullable=True, comment="Canonical city a locality belongs to")
+    state = Column(String(50), nullable=True)
+    language = Column(String(5), default="en")
+    active = Column(BOOLEAN, default=True)
+
+class LLMResponseCacheEntries(Base):
+    __tablename__ = "llm_response_cache"
+
+    key = Column(String(200), primary_key=True, comment="llm:<namespace>:<model>:v<template version>:<sha256 of the normalized inputs>")
+    response = Column(JSONB, nullable=False)
+    created_at = Column(TIMESTAMP, nullable=False)
+    expires_at = Column(TIMESTAMP, nullable=True, index=True)
+
+class StoriesRawContent(Base):
+    __tablename__ = "stories_raw_content"
+
+    story_id = Column(UUID(as_uuid=True), primary_key=True, comment="stories_raw.id, no FK since stories_raw is partitioned")
+    link = Column(String(500))
+    status = Column(String(20), nullable=False, comment="extracted, blocked (robots.txt) or failed")
+    content = Column(LargeBinary, nullable=True, comment="zlib compressed UTF-8 article text")
+    content_chars = Column(Integer, default=0)
+    error = Column(TEXT, nullable=True)
+    published_timestamp = Column(TIMESTAMP, nullable=False, index=True)
+    extracted_at = Column(TIMESTAMP, server_default=func.now())
+
+# A unique index on a partitioned table must include the partition key,
+# so link_hash uniqueness across all of stories_raw is enforced here instead.
+# Per location: the same article fetched for a city and for its state belongs in both feeds.
+class StoriesRawLinkHashes(Base):
+    __tablename__ = "stories_raw_link_hashes"
+
+    location_id = Column(UUID(as_uuid=True), ForeignKey("locations.id"), primary_key=True)
+    link_hash = Column(String(64), primary_key=True)
+    published_timestamp = Column(TIMESTAMP, nullable=False, index=True)
+
+class FeedSources(Base):
+    __tablename__ = "feed_sources"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, index=True, server_default=text("uuid_generate_v4()"))
+    name = Column(String(200), nullable=False)
+    url = Column(String(500), unique=True, nullable=False)
+    category = Column(String(50), default="general")
+    city = Column(String(50), nullable=True, index=True)
+    active = Column(BOOLEAN, default=True)
+    poll_interval_secs = Column(Integer, default=300, comment="Current adaptive polling interval")
+    min_poll_interval_secs = Column(Integer, default=120)
+    max_poll_interval_secs = Column(Integer, default=3600)
+    new_items_per_hour = Column(Float, default=0, comment="EWMA of the observed new-item rate")
+    last_polled_at = Column(TIMESTAMP, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
 # class GeneratedStories(Base):
 #     __tablename__ = "generated_stories"
 
@@ -166,15 +246,61 @@ class GeneratedUserStories(Base):
     published_at = Column(TIMESTAMP)
     updated_at = Column(TIMESTAMP, onupdate=func.now()+time_diff_interval)
     editor_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=True)
+    # array_to_string is only STABLE, immutable_array_to_string is created by the migration
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(english_title, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(snippet, '')), 'B') || "
+        "setweight(to_tsvector('simple'::regconfig, immutable_array_to_string(tags::text[], ' ')), 'C')",
+        persisted=True
+    )))
 
     __table_args__ = (
         UniqueConstraint('author_id', 'title_hash', name='uq_author_titlehash'),
+        Index("ix_generated_user_stories_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_generated_user_stories_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
     )
 
     user_story = relationship("UserStories", back_populates="generated_stories", lazy='selectin')
     author = relationship("Authors", back_populates="generated_user_stories", lazy='selectin')
     editor = relationship("Users", foreign_keys=[editor_id], lazy='selectin')
 
+class GenerationJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class GenerationJobs(Base):
+    """Question and article generations run by the worker pool in src/stories/jobs.py."""
+    __tablename__ = "generation_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("uuid_generate_v4()"))
+    kind = Column(String(20), nullable=False, comment="questions or article")
+    user_story_id = Column(UUID(as_uuid=True), ForeignKey('user_stories.id', ondelete="CASCADE"), nullable=False)
+    author_id = Column(UUID(as_uuid=True), ForeignKey('authors.id'), nullable=False)
+    params = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    status = Column(String(20), nullable=False, default=GenerationJobStatus.QUEUED.value, comment="queued, running, succeeded or failed")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(TIMESTAMP, nullable=False, comment="Not claimed before this time, pushed back between retries")
+    locked_until = Column(TIMESTAMP, nullable=True, comment="Lease of a running job, reclaimed once it expires")
+    worker = Column(String(100), nullable=True)
+    result = Column(JSONB, nullable=True)
+    error = Column(TEXT, nullable=True)
+    created_at = Column(TIMESTAMP, nullable=False)
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True, index=True)
+
+    __table_args__ = (
+        Index("ix_generation_jobs_status_run_after", "status", "run_after"),
+        # one pending job per story and kind, a double submit returns the job already queued
+        Index(
+            "uq_generation_jobs_active", "kind", "user_story_id", unique=True,
+            postgresql_where=text("status IN ('queued', 'running')")
+        ),
+    )
+
 class UserRoles(str, Enum):
     ADMIN = "admin"
     CREATOR = "creator"
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
-from typing import Annotated
+from typing import Annotated, Literal
+from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import aliased, joinedload, selectinload
 from sqlalchemy import select, func, case, literal
@@ -12,6 +13,7 @@ from src.news.schemas import CreatorProfileResponse, ArticleResponse
 from src.aws.utils import get_bucket_base_url, get_full_s3_object_url
 from src.utils.query import get_article_images_json_query, get_profile_image_expression
 from src.news.utils import get_category_name
+from src.news.search import search_articles, search_stories
 
 router = APIRouter()
 
@@ -116,6 +118,29 @@ async def get_all_categories(lang: str | None = 'mr'):
     return [{"category_value": cat.value, "category_name": get_category_name(cat.value, lang=lang)} for cat in NewsCategory]
 
 
+@router.get('/search')
+async def search(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    q: Annotated[str, Query(min_length=2, max_length=200)],
+    scope: Literal['articles', 'stories'] = 'articles',
+    limit: Annotated[int, Query(gt=0, le=50)] = 10,
+    cursor: str | None = None,
+    location_id: UUID | None = None,
+    language: Literal['en', 'hi', 'mr'] | None = None
+):
+    """
+    Ranked full-text search over published articles or, with `scope=stories`, the raw stories
+    still in the feed window. Pass the returned `next_cursor` back as `cursor` for the next page.
+    `location_id` and `language` only apply to stories.
+    """
+    try:
+        if scope == 'stories':
+            return await search_stories(session, q, limit, cursor, location_id, language)
+        return await search_articles(session, q, limit, cursor)
+    except ValueError as ve:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
+
 @router.get('/{article_slug}', response_model=ArticleResponse)
 async def get_article_by_id(
     session: Annotated[AsyncSession, Depends(get_session)],
@@ -0,0 +1,131 @@
+import base64
+import json
+from uuid import UUID
+from sqlalchemy import select, func, or_, literal, literal_column, tuple_, Float, cast
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import GeneratedUserStories, UserStories, UserStoryPublishStatus, StoriesRaw
+from src.utils.language import get_script_counts
+
+# Postgres has no Marathi or Hindi stemmer, every language is indexed with the `simple` config.
+# Rendered as a literal, a bound parameter would be cast to VARCHAR and not resolve to regconfig.
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+
+def encode_search_cursor(rank: float, result_id) -> str:
+    payload = json.dumps([rank, str(result_id)])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_search_cursor(cursor: str) -> tuple[float, UUID]:
+    try:
+        rank, result_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(rank), UUID(result_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def build_search_match(search_vector, title, q: str) -> tuple:
+    """
+    (filter, rank) for `q` against a generated tsvector column. Devanagari queries also match
+    titles by trigram word similarity: without a stemmer, नागपूर would otherwise never find
+    the inflected नागपुरात.
+    """
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    match = search_vector.op("@@")(tsquery)
+    rank = func.ts_rank_cd(search_vector, tsquery)
+
+    devanagari, _ = get_script_counts(q)
+    if devanagari:
+        match = or_(match, literal(q).op("<%")(title))
+        rank = rank + func.word_similarity(q, title)
+    return match, cast(rank, Float)
+
+def paginate_search(stmt, rank, id_column, after: tuple[float, UUID] | None, limit: int):
+    # ordered by (rank, id) DESC so the order is total and a page resumes right after the previous one
+    if after is not None:
+        stmt = stmt.where(tuple_(rank, id_column) < tuple_(*after))
+    return stmt.order_by(rank.desc(), id_column.desc()).limit(limit + 1)
+
+def build_search_page(rows, limit: int, to_dict) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(rows[-1].rank, rows[-1].id)
+
+    results = [to_dict(row) for row in rows]
+    return {
+        'results': results,
+        'count': len(results),
+        'next_cursor': next_cursor
+    }
+
+async def search_articles(session: AsyncSession, q: str, limit: int, cursor: str | None = None) -> dict:
+    """Published articles matching `q`, best match first."""
+    after = decode_search_cursor(cursor) if cursor else None
+    match, rank = build_search_match(GeneratedUserStories.search_vector, GeneratedUserStories.title, q)
+    rank = rank.label("rank")
+
+    stmt = (
+        select(
+            GeneratedUserStories.id,
+            GeneratedUserStories.title,
+            GeneratedUserStories.snippet,
+            GeneratedUserStories.slug,
+            GeneratedUserStories.category,
+            GeneratedUserStories.tags,
+            GeneratedUserStories.published_at,
+            rank
+        )
+        .join(UserStories, onclause=UserStories.id == GeneratedUserStories.user_story_id)
+        .where(UserStories.publish_status == UserStoryPublishStatus.PUBLISHED)
+        .where(match)
+    )
+    result = await session.execute(paginate_search(stmt, rank, GeneratedUserStories.id, after, limit))
+
+    return build_search_page(result.all(), limit, lambda row: {
+        "id": str(row.id),
+        "title": row.title,
+        "snippet": row.snippet,
+        "slug": row.slug,
+        "category": row.category,
+        "tags": row.tags,
+        "published_at": str(row.published_at) if row.published_at else None,
+        "rank": row.rank
+    })
+
+async def search_stories(session: AsyncSession, q: str, limit: int, cursor: str | None = None, location_id: UUID | None = None, language: str | None = None) -> dict:
+    """Raw stories still in stories_raw matching `q`, best match first."""
+    after = decode_search_cursor(cursor) if cursor else None
+    match, rank = build_search_match(StoriesRaw.search_vector, StoriesRaw.title, q)
+    rank = rank.label("rank")
+
+    stmt = (
+        select(
+            StoriesRaw.id,
+            StoriesRaw.title,
+            StoriesRaw.snippet,
+            StoriesRaw.link,
+            StoriesRaw.source,
+            StoriesRaw.published_timestamp,
+            StoriesRaw.thumbnail,
+            StoriesRaw.language,
+            rank
+        )
+        .where(match)
+    )
+    if location_id is not None:
+        stmt = stmt.where(StoriesRaw.location_id == location_id)
+    if language is not None:
+        stmt = stmt.where(StoriesRaw.language == language)
+    result = await session.execute(paginate_search(stmt, rank, StoriesRaw.id, after, limit))
+
+    return build_search_page(result.all(), limit, lambda row: {
+        "id": str(row.id),
+        "title": row.title,
+        "snippet": row.snippet,
+        "link": row.link,
+        "source": row.source,
+        "date": str(row.published_timestamp.replace(microsecond=0)),
+        "thumbnail": row.thumbnail,
+        "language": row.language,
+        "rank": row.rank
+    })
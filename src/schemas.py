@@ -40,6 +40,11 @@ class LocationDataSchema(BaseModel):
         
         return self
 
+class MultiScopeFeedSchema(BaseModel):
+    country_code: Optional[str] = None
+    location: Location | None = None
+    scopes: list[Literal['CITY', 'STATE', 'COUNTRY', 'INTERNATIONAL']] = ['CITY', 'STATE', 'COUNTRY', 'INTERNATIONAL']
+
 class StoriesModel(BaseModel):
     """Individual story response model"""
     model_config = ConfigDict(from_attributes=True)
@@ -157,6 +162,21 @@ class QuestionsResponseSchema(BaseModel):
     # question_type: Literal["what", "who", "where", "why", "when", "how", "sources"]
     question_text: str
 
+class GenerationJobSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    kind: Literal["questions", "article"]
+    user_story_id: UUID
+    status: Literal["queued", "running", "succeeded", "failed"]
+    attempts: int
+    # same shape as the synchronous endpoint's response once the job succeeded
+    result: list | dict | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
 class AnswerSchema(BaseModel):
     question_id: str
     answer_text: str = Field(..., min_length=ContentSizeLimits.ANSWER_MIN, max_length=ContentSizeLimits.ANSWER_MAX)
@@ -0,0 +1,253 @@
+"""
+Bulk backfill of historical stories for a location.
+
+    python -m src.stories.backfill --location-id <uuid> --file stories.ndjson
+    python -m src.stories.backfill --location-id <uuid> --benchmark 20000
+
+The file holds one SerpAPI-style news record per line (title, snippet, link, source,
+thumbnail, date) or a single JSON array of them. `date` is an ISO timestamp or a relative
+one like "3d".
+"""
+import argparse
+import asyncio
+import json
+import time
+import traceback
+import uuid
+from collections.abc import AsyncIterable, Iterable
+from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import async_session, engine
+from src.config.settings import settings
+from src.models import Locations
+from src.stories.dedup import assign_story_clusters
+from src.stories.geo import assign_geo_relevance
+from src.stories.hot_feed import hot_feeds
+from src.stories.metrics import STORIES_RECEIVED, STORIES_INSERTED, STORIES_DUPLICATE
+from src.stories.partitions import create_stories_raw_partitions, get_partition_days
+from src.stories.service import COPY_MERGE_THRESHOLD, build_story_rows, copy_merge_stories, add_stories_to_db
+from src.stories.utils import parse_story_date_to_datetime
+from src.utils.links import generate_link_hash
+
+BACKFILL_BATCH_SIZE = 5000
+BENCHMARK_LINK_PREFIX = "https://backfill-benchmark.invalid"
+
+
+@dataclass
+class BackfillStats:
+    received: int = 0
+    inserted: int = 0
+    skipped_old: int = 0
+    batches: int = 0
+    elapsed_secs: float = 0.0
+
+    @property
+    def duplicates(self) -> int:
+        return self.received - self.skipped_old - self.inserted
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.inserted / self.elapsed_secs if self.elapsed_secs else 0.0
+
+
+def parse_record_date(value) -> datetime | None:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        return parse_story_date_to_datetime(value)
+
+
+async def _iterate(records: Iterable[dict] | AsyncIterable[dict]):
+    if isinstance(records, AsyncIterable):
+        async for record in records:
+            yield record
+    else:
+        for record in records:
+            yield record
+
+
+async def _copy_batch(location_id: str, records: list[dict], partitions: dict[date, str]) -> int:
+    stories = build_story_rows(records, location_id)
+    STORIES_RECEIVED.inc(len(records), path="backfill")
+    STORIES_DUPLICATE.inc(len(records) - len(stories), path="backfill", reason="batch")
+    await assign_story_clusters(stories)
+
+    async with async_session() as session:
+        await assign_geo_relevance(session, stories, location_id)
+        # historical days have no partition yet, without one every row would land in the default partition
+        days = sorted({story["published_timestamp"].date() for story in stories} - partitions.keys())
+        for name in await create_stories_raw_partitions(session, days, partitions):
+            partitions[datetime.strptime(name[-8:], "%Y%m%d").date()] = name
+
+        # COPY plus a link hash claim, duplicates of stored stories are dropped in the merge
+        rows = await copy_merge_stories(session, stories)
+        await session.commit()
+
+    STORIES_INSERTED.inc(len(rows), path="backfill")
+    STORIES_DUPLICATE.inc(len(stories) - len(rows), path="backfill", reason="stored")
+    return len(rows)
+
+
+async def backfill_stories(location_id: str, records: Iterable[dict] | AsyncIterable[dict], batch_size: int = BACKFILL_BATCH_SIZE) -> BackfillStats:
+    """
+    Stream `records` into stories_raw in batches of `batch_size`, each one COPYed into a
+    staging table and merged in its own transaction, so memory and lock time stay flat
+    however long the backfill is. Records older than the partition retention are skipped,
+    partition maintenance would drop them right away.
+    """
+    stats = BackfillStats()
+    oldest_kept = datetime.combine(date.today() - timedelta(days=settings.STORIES_RAW_RETENTION_DAYS), datetime.min.time())
+    started = time.perf_counter()
+
+    async with async_session() as session:
+        partitions = await get_partition_days(session)
+
+    batch = []
+    async for record in _iterate(records):
+        stats.received += 1
+        record = {**record, "date": parse_record_date(record.get("date"))}
+        if record["date"] is not None and record["date"] < oldest_kept:
+            stats.skipped_old += 1
+            continue
+
+        batch.append(record)
+        if len(batch) >= batch_size:
+            stats.inserted += await _copy_batch(location_id, batch, partitions)
+            stats.batches += 1
+            batch = []
+
+    if batch:
+        stats.inserted += await _copy_batch(location_id, batch, partitions)
+        stats.batches += 1
+
+    stats.elapsed_secs = time.perf_counter() - started
+
+    if stats.inserted and settings.HOT_FEED_ENABLED:
+        hot_feeds.invalidate(location_id)
+        try:
+            async with async_session() as session:
+                await hot_feeds.notify(session, location_id)
+        except Exception as e:
+            print(f"Error notifying hot feed invalidation for {location_id}: {e}")
+    return stats
+
+
+def read_records(path: str):
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def generate_benchmark_records(count: int, label: str, days: int = 3) -> list[dict]:
+    """Synthetic records with unique links and titles, spread over the last `days` days."""
+    now = datetime.now().replace(microsecond=0)
+    run = uuid.uuid4().hex[:8]
+    return [
+        {
+            "title": f"Benchmark story {label} {run} {i} {uuid.uuid4().hex}",
+            "snippet": f"Synthetic snippet number {i} generated to benchmark the {label} insert path.",
+            "link": f"{BENCHMARK_LINK_PREFIX}/{label}/{run}/{i}",
+            "source": "Backfill Benchmark",
+            "thumbnail": None,
+            "date": now - timedelta(seconds=(i * days * 86400) // max(count, 1)),
+        }
+        for i in range(count)
+    ]
+
+
+async def delete_benchmark_stories(records: list[dict]):
+    link_hashes = [generate_link_hash(record["link"]) for record in records]
+    async with async_session() as session:
+        await session.execute(text("DELETE FROM stories_raw WHERE link_hash = ANY(:hashes)"), {"hashes": link_hashes})
+        await session.execute(text("DELETE FROM stories_raw_link_hashes WHERE link_hash = ANY(:hashes)"), {"hashes": link_hashes})
+        await session.commit()
+
+
+async def run_benchmark(location_id: str, count: int, batch_size: int) -> dict:
+    """
+    Insert `count` synthetic stories through the request path (`add_stories_to_db`, in chunks
+    small enough to stay on its multi-row INSERT) and through `backfill_stories`, then delete them.
+    """
+    results = {}
+
+    records = generate_benchmark_records(count, "insert")
+    chunk_size = COPY_MERGE_THRESHOLD - 1
+    started = time.perf_counter()
+    inserted = 0
+    try:
+        for offset in range(0, count, chunk_size):
+            async with async_session() as session:
+                rows = await add_stories_to_db(session, records[offset:offset + chunk_size], location_id)
+                inserted += len(rows or [])
+        elapsed = time.perf_counter() - started
+        results["insert"] = {"inserted": inserted, "elapsed_secs": round(elapsed, 3), "rows_per_sec": round(inserted / elapsed, 1) if elapsed else 0.0}
+    finally:
+        await delete_benchmark_stories(records)
+
+    records = generate_benchmark_records(count, "copy")
+    try:
+        stats = await backfill_stories(location_id, records, batch_size)
+        results["copy"] = {"inserted": stats.inserted, "elapsed_secs": round(stats.elapsed_secs, 3), "rows_per_sec": round(stats.rows_per_sec, 1)}
+    finally:
+        await delete_benchmark_stories(records)
+
+    if results["insert"]["rows_per_sec"]:
+        results["speedup"] = round(results["copy"]["rows_per_sec"] / results["insert"]["rows_per_sec"], 2)
+    return results
+
+
+async def get_location(session: AsyncSession, location_id: str):
+    result = await session.execute(select(Locations.id).where(Locations.id == location_id))
+    return result.first()
+
+
+async def main(args: argparse.Namespace):
+    try:
+        async with async_session() as session:
+            location = await get_location(session, args.location_id)
+        if location is None:
+            print(f"Location {args.location_id} not found")
+            return 1
+
+        if args.benchmark:
+            print(json.dumps(await run_benchmark(args.location_id, args.benchmark, args.batch_size), indent=2))
+            return 0
+
+        stats = await backfill_stories(args.location_id, read_records(args.file), args.batch_size)
+        print(json.dumps({**asdict(stats), "duplicates": stats.duplicates, "rows_per_sec": round(stats.rows_per_sec, 1)}, indent=2))
+        return 0
+    except Exception as e:
+        print(f"Backfill failed: {e}")
+        traceback.print_exc()
+        return 1
+    finally:
+        await engine.dispose()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m src.stories.backfill", description="Bulk load historical stories for a location.")
+    parser.add_argument("--location-id", required=True, help="locations.id the stories belong to")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="NDJSON file (or JSON array) of news records")
+    source.add_argument("--benchmark", type=int, metavar="N", help="time N synthetic stories through the INSERT and COPY paths, then delete them")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(parse_args())))
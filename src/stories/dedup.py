@@ -0,0 +1,134 @@
+import hashlib
+import re
+import traceback
+import unicodedata
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import select
+
+from src.config.database import async_session
+from src.models import StoriesRaw
+
+SIMHASH_BITS = 64
+# Headlines + snippets are short, so rewordings of the same story land a few bits further apart
+# than long documents would. With 8 bands of 8 bits, two signatures within 7 bits always share a band.
+LSH_BANDS = 8
+LSH_BAND_BITS = SIMHASH_BITS // LSH_BANDS
+MAX_HAMMING_DISTANCE = 7
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_story_text(title: str | None, snippet: str | None) -> list[str]:
+    text = unicodedata.normalize("NFKC", f"{title or ''} {snippet or ''}").lower()
+    return TOKEN_PATTERN.findall(text)
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def compute_simhash(title: str | None, snippet: str | None) -> int | None:
+    """64-bit SimHash over word unigrams and bigrams of the normalized title + snippet."""
+    tokens = normalize_story_text(title, snippet)
+    if not tokens:
+        return None
+
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        h = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def to_signed_64(value: int) -> int:
+    """Postgres BIGINT is signed, SimHash is not."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned_64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class SimHashIndex:
+    """
+    In-memory LSH index of recent story signatures to their cluster ids.
+    Looking up a story only compares it with the few signatures sharing one of its bands,
+    not with every stored story.
+    """
+
+    def __init__(self, window_days: int = 7, rebuild_interval_mins: int = 60):
+        self.window_days = window_days
+        self.rebuild_interval_mins = rebuild_interval_mins
+        self._buckets: dict[tuple[int, int], list[tuple[int, uuid.UUID]]] = {}
+        self._built_at: datetime | None = None
+
+    @staticmethod
+    def _bands(simhash: int):
+        mask = (1 << LSH_BAND_BITS) - 1
+        for band in range(LSH_BANDS):
+            yield band, simhash >> (band * LSH_BAND_BITS) & mask
+
+    def add(self, simhash: int, cluster_id: uuid.UUID):
+        for key in self._bands(simhash):
+            self._buckets.setdefault(key, []).append((simhash, cluster_id))
+
+    def find_cluster(self, simhash: int) -> uuid.UUID | None:
+        best = None
+        for key in self._bands(simhash):
+            for candidate, cluster_id in self._buckets.get(key, ()):
+                distance = hamming_distance(simhash, candidate)
+                if distance <= MAX_HAMMING_DISTANCE and (best is None or distance < best[0]):
+                    best = (distance, cluster_id)
+        return best[1] if best else None
+
+    def assign(self, simhash: int) -> uuid.UUID:
+        cluster_id = self.find_cluster(simhash) or uuid.uuid4()
+        self.add(simhash, cluster_id)
+        return cluster_id
+
+    async def ensure_loaded(self):
+        """(Re)build from the persisted signatures of recent stories, which also drops expired ones."""
+        if self._built_at and datetime.now() - self._built_at < timedelta(minutes=self.rebuild_interval_mins):
+            return
+
+        cutoff = datetime.now() - timedelta(days=self.window_days)
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(StoriesRaw.simhash, StoriesRaw.cluster_id)
+                        .where(StoriesRaw.simhash.is_not(None), StoriesRaw.published_timestamp >= cutoff)
+                )
+                rows = result.all()
+        except Exception as e:
+            print(f"Error loading simhash index: {e}")
+            traceback.print_exc()
+            return
+
+        self._buckets = {}
+        for row in rows:
+            self.add(to_unsigned_64(row.simhash), row.cluster_id)
+        self._built_at = datetime.now()
+
+
+simhash_index = SimHashIndex()
+
+
+async def assign_story_clusters(stories: list[dict]):
+    """Set `simhash` and `cluster_id` on story dicts about to be inserted into stories_raw."""
+    await simhash_index.ensure_loaded()
+    for story in stories:
+        simhash = compute_simhash(story.get("title"), story.get("snippet"))
+        if simhash is None:
+            story["simhash"] = None
+            story["cluster_id"] = uuid.uuid4()
+            continue
+        story["simhash"] = to_signed_64(simhash)
+        story["cluster_id"] = simhash_index.assign(simhash)
@@ -0,0 +1,239 @@
+import asyncio
+import multiprocessing
+import time
+import traceback
+import urllib.parse
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from urllib.robotparser import RobotFileParser
+import httpx
+from sqlalchemy import select, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import async_session
+from src.config.http_client import http_clients, HTTP_CLIENT_CONFIGS
+from src.config.settings import settings
+from src.models import StoriesRaw, StoriesRawContent
+from src.utils.article_extractor import extract_article_text
+from src.utils.singleflight import SingleFlight
+
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+ROBOTS_TTL_SECS = 6 * 60 * 60
+ROBOTS_ERROR_TTL_SECS = 10 * 60
+EXTRACTION_WINDOW_DAYS = 2
+
+
+@dataclass
+class ExtractionResult:
+    story_id: str
+    link: str
+    published_timestamp: datetime
+    status: str
+    text: str | None = None
+    error: str | None = None
+
+
+class ContentExtractor:
+    """
+    Crawls story links and extracts the article text.
+
+    At most `max_concurrency` pages are fetched at once and at most `per_host_concurrency`
+    per host, so a batch dominated by one publisher does not hammer it. robots.txt is
+    cached per host and its Crawl-delay honoured. HTML parsing runs in a process pool.
+    """
+
+    def __init__(self, max_concurrency: int = 10, per_host_concurrency: int = 2, extract_workers: int = 2, user_agent: str = "PressgenBot"):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.extract_workers = extract_workers
+        self.user_agent = user_agent
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._host_last_fetch: dict[str, float] = {}
+        self._robots: dict[str, tuple[float, RobotFileParser]] = {}
+        self._robots_fetches = SingleFlight()
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.extract_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_host_limit(self, host: str) -> asyncio.Semaphore:
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = asyncio.Semaphore(self.per_host_concurrency)
+            self._host_limits[host] = limit
+        return limit
+
+    async def get_robots(self, client: httpx.AsyncClient, origin: str) -> RobotFileParser:
+        """
+        Parsed robots.txt of `origin`. A missing robots.txt (4xx) allows everything,
+        an unreachable one (5xx, network error) blocks the host until it is retried.
+        """
+        cached = self._robots.get(origin)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        # stories of one batch often share a host, fetch its robots.txt once
+        return await self._robots_fetches.do(origin, self._load_robots, client, origin)
+
+    async def _load_robots(self, client: httpx.AsyncClient, origin: str) -> RobotFileParser:
+        robots = RobotFileParser()
+        ttl = ROBOTS_TTL_SECS
+        try:
+            response = await client.get(f"{origin}/robots.txt")
+            if response.status_code >= 500:
+                robots.disallow_all = True
+                ttl = ROBOTS_ERROR_TTL_SECS
+            elif response.status_code >= 400:
+                robots.allow_all = True
+            else:
+                robots.parse(response.text.splitlines())
+        except httpx.HTTPError:
+            robots.disallow_all = True
+            ttl = ROBOTS_ERROR_TTL_SECS
+
+        self._robots[origin] = (time.monotonic() + ttl, robots)
+        return robots
+
+    async def _fetch_html(self, client: httpx.AsyncClient, url: str) -> tuple[bytes, str | None]:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "")
+            if "html" not in content_type:
+                raise ValueError(f"not an HTML page: {content_type}")
+
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_PAGE_BYTES:
+                    break
+            return b"".join(chunks), response.encoding
+
+    async def extract(self, client: httpx.AsyncClient, story) -> ExtractionResult:
+        result = ExtractionResult(story_id=str(story.id), link=story.link, published_timestamp=story.published_timestamp, status="failed")
+        parts = urllib.parse.urlsplit(story.link or "")
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            result.error = "invalid link"
+            return result
+
+        host = parts.netloc.lower()
+        try:
+            robots = await self.get_robots(client, f"{parts.scheme}://{host}")
+            if not robots.can_fetch(self.user_agent, story.link):
+                result.status = "blocked"
+                return result
+
+            async with self._get_host_limit(host):
+                crawl_delay = robots.crawl_delay(self.user_agent)
+                if crawl_delay:
+                    wait = self._host_last_fetch.get(host, 0) + float(crawl_delay) - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                self._host_last_fetch[host] = time.monotonic()
+                content, encoding = await self._fetch_html(client, story.link)
+
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(self._get_executor(), extract_article_text, content, encoding)
+            if not text:
+                result.error = "no article text found"
+                return result
+
+            result.status = "extracted"
+            result.text = text
+        except Exception as e:
+            result.error = str(e)[:500] or type(e).__name__
+        return result
+
+    async def extract_many(self, stories, client: httpx.AsyncClient | None = None) -> list[ExtractionResult]:
+        client = client or http_clients.get("extract")
+        limit = asyncio.Semaphore(self.max_concurrency)
+
+        async def extract_one(story):
+            async with limit:
+                return await self.extract(client, story)
+
+        return await asyncio.gather(*(extract_one(story) for story in stories))
+
+
+async def get_stories_pending_extraction(session: AsyncSession, limit: int):
+    cutoff = datetime.now() - timedelta(days=EXTRACTION_WINDOW_DAYS)
+    result = await session.execute(
+        select(StoriesRaw.id, StoriesRaw.link, StoriesRaw.published_timestamp)
+            .where(StoriesRaw.published_timestamp >= cutoff, StoriesRaw.link.is_not(None))
+            .where(~exists().where(StoriesRawContent.story_id == StoriesRaw.id))
+            .order_by(StoriesRaw.published_timestamp.desc())
+            .limit(limit)
+    )
+    return result.all()
+
+async def store_extraction_results(session: AsyncSession, results: list[ExtractionResult]):
+    if not results:
+        return
+
+    values = [
+        {
+            "story_id": r.story_id,
+            "link": r.link,
+            "status": r.status,
+            "content": zlib.compress(r.text.encode("utf-8")) if r.text else None,
+            "content_chars": len(r.text) if r.text else 0,
+            "error": r.error,
+            "published_timestamp": r.published_timestamp
+        }
+        for r in results
+    ]
+    stmt = insert(StoriesRawContent).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["story_id"],
+        set_={
+            "status": stmt.excluded.status,
+            "content": stmt.excluded.content,
+            "content_chars": stmt.excluded.content_chars,
+            "error": stmt.excluded.error,
+            "extracted_at": datetime.now()
+        }
+    )
+    await session.execute(stmt)
+    await session.commit()
+
+async def get_story_content(session: AsyncSession, story_id: str) -> str | None:
+    result = await session.execute(
+        select(StoriesRawContent.content).where(StoriesRawContent.story_id == story_id, StoriesRawContent.status == "extracted")
+    )
+    content = result.scalar_one_or_none()
+    return zlib.decompress(content).decode("utf-8") if content else None
+
+
+content_extractor = ContentExtractor(
+    max_concurrency=settings.CONTENT_EXTRACTION_CONCURRENCY,
+    per_host_concurrency=settings.CONTENT_EXTRACTION_PER_HOST,
+    extract_workers=settings.CONTENT_EXTRACTION_WORKERS,
+    user_agent=HTTP_CLIENT_CONFIGS["extract"]["headers"]["User-Agent"].split("/")[0]
+)
+
+async def run_content_extraction(batch_size: int):
+    """Extract the newest stories that have no content yet. Run by the ingestion leader."""
+    try:
+        async with async_session() as session:
+            stories = await get_stories_pending_extraction(session, batch_size)
+        if not stories:
+            return
+
+        results = await content_extractor.extract_many(stories)
+        async with async_session() as session:
+            await store_extraction_results(session, results)
+
+        extracted = sum(1 for r in results if r.status == "extracted")
+        print(f"Content extraction: {extracted}/{len(results)} stories extracted")
+    except Exception as e:
+        print(f"Error extracting story content: {e}")
+        traceback.print_exc()
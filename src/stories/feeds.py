@@ -0,0 +1,242 @@
+import asyncio
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from sqlalchemy import select, update
+
+from src.config.database import async_session
+from src.config.http_client import http_clients
+from src.config.settings import settings
+from src.models import FeedSources
+from src.stories.metrics import FETCH_SECONDS, FETCH_ERRORS, PARSE_SECONDS, ITEMS_FETCHED, ITEMS_NEW
+from src.utils.feed_parser import parse_feed_entries
+from src.utils.singleflight import SingleFlight
+from src.utils.sources import RSS_FEEDS_SOURCES
+
+
+# Weight of the latest poll in the new-item rate EWMA
+NEW_ITEMS_RATE_ALPHA = 0.3
+# Aim for roughly this many new items per poll
+TARGET_NEW_ITEMS_PER_POLL = 1
+
+
+def compute_next_poll_interval(feed_source: dict, new_items: int, elapsed_secs: float) -> tuple[int, float]:
+    """
+    Adapt a source's polling interval to how often it publishes.
+
+    Keeps an EWMA of new items per hour and polls about once per
+    `TARGET_NEW_ITEMS_PER_POLL` expected items, clamped to the source's min/max.
+    A source with no observed new items backs off by 1.5x per poll.
+    Returns (poll_interval_secs, new_items_per_hour).
+    """
+    observed_rate = new_items * 3600 / max(elapsed_secs, 1)
+    rate = NEW_ITEMS_RATE_ALPHA * observed_rate + (1 - NEW_ITEMS_RATE_ALPHA) * (feed_source.get('new_items_per_hour') or 0)
+
+    if rate > 0:
+        interval = TARGET_NEW_ITEMS_PER_POLL * 3600 / rate
+    else:
+        interval = feed_source['ttl_secs'] * 1.5
+
+    min_interval = feed_source.get('min_poll_interval_secs') or 120
+    max_interval = feed_source.get('max_poll_interval_secs') or 3600
+    return int(min(max(interval, min_interval), max_interval)), round(rate, 4)
+
+
+@dataclass
+class FeedState:
+    etag: str | None = None
+    last_modified: str | None = None
+    entries: list[dict] = field(default_factory=list)
+    checked_at: datetime | None = None
+    feed_ttl_mins: int | None = None
+
+    def is_fresh(self, ttl: timedelta) -> bool:
+        return self.checked_at is not None and datetime.now() - self.checked_at < ttl
+
+
+class FeedPoller:
+    """
+    Serves RSS feeds from an in-memory cache of the last parsed entries.
+
+    A source is re-polled only once its TTL has passed, and then with a conditional GET
+    (If-None-Match / If-Modified-Since), so unchanged feeds cost a 304 and no parsing.
+    Parsing runs in a process pool to keep CPU-bound feedparser work off the event loop.
+    """
+
+    def __init__(self, parse_workers: int = 2, default_ttl_secs: int = 300, on_polled: Callable[[dict, int], Awaitable[None]] | None = None):
+        self.parse_workers = parse_workers
+        self.default_ttl_secs = default_ttl_secs
+        self.on_polled = on_polled
+        self._states: dict[str, FeedState] = {}
+        self._polls = SingleFlight()
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_ttl(self, feed_source: dict, feed_ttl_mins: int | None = None) -> timedelta:
+        ttl_secs = feed_source.get('ttl_secs', self.default_ttl_secs)
+        # never poll faster than the publisher asks for in <ttl>
+        if feed_ttl_mins:
+            ttl_secs = max(ttl_secs, feed_ttl_mins * 60)
+        return timedelta(seconds=ttl_secs)
+
+    async def get_feed(self, feed_source: dict) -> dict:
+        state = self._states.get(feed_source['url'])
+        if state is None or not state.is_fresh(self.get_ttl(feed_source, state.feed_ttl_mins)):
+            state = await self._polls.do(feed_source['url'], self._poll, feed_source)
+
+        return {
+            "feed": state.entries,
+            "source": feed_source['name'],
+            "category": feed_source['category']
+        }
+
+    async def _poll(self, feed_source: dict) -> FeedState:
+        url = feed_source['url']
+        state = self._states.get(url) or FeedState()
+        previous_check = state.checked_at
+
+        headers = {}
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+
+        labels = {"source": "rss", "feed": feed_source['name']}
+        try:
+            started = time.perf_counter()
+            response = await http_clients.get("rss").get(url, headers=headers)
+            FETCH_SECONDS.observe(time.perf_counter() - started, **labels)
+            if response.status_code == 304:
+                state.checked_at = datetime.now()
+                self._states[url] = state
+                await self._report_poll(feed_source, 0, previous_check)
+                return state
+
+            response.raise_for_status()
+
+            loop = asyncio.get_running_loop()
+            with PARSE_SECONDS.time(**labels):
+                parsed = await loop.run_in_executor(self._get_executor(), parse_feed_entries, response.content)
+        except Exception as e:
+            FETCH_ERRORS.inc(**labels)
+            # serve the last good entries (possibly none) and retry on the next TTL
+            print(f"Error polling feed {url}: {e}")
+            traceback.print_exc()
+            state.checked_at = datetime.now()
+            self._states[url] = state
+            return state
+
+        seen_links = {entry['link'] for entry in state.entries}
+        new_items = sum(1 for entry in parsed['entries'] if entry['link'] not in seen_links)
+        ITEMS_FETCHED.inc(len(parsed['entries']), **labels)
+        ITEMS_NEW.inc(new_items, **labels)
+
+        self._states[url] = FeedState(
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            entries=parsed['entries'],
+            checked_at=datetime.now(),
+            feed_ttl_mins=parsed['ttl_mins']
+        )
+        await self._report_poll(feed_source, new_items, previous_check)
+        return self._states[url]
+
+    async def _report_poll(self, feed_source: dict, new_items: int, previous_check: datetime | None):
+        # the first poll after startup has nothing to compare against
+        if self.on_polled is None or previous_check is None:
+            return
+        try:
+            await self.on_polled(feed_source, new_items)
+        except Exception as e:
+            print(f"Error recording poll for feed {feed_source['url']}: {e}")
+
+
+class FeedSourceRegistry:
+    """
+    Active RSS sources from the feed_sources table, cached in memory and reloaded every
+    `reload_interval_secs`. Falls back to the static RSS_FEEDS_SOURCES if the table is empty
+    or unreachable. Each source's `ttl_secs` is its adaptive polling interval.
+    """
+
+    def __init__(self, reload_interval_secs: int = 300):
+        self.reload_interval_secs = reload_interval_secs
+        self._sources: list[dict] = []
+        self._loaded_at: datetime | None = None
+        self._reloads = SingleFlight()
+
+    async def get_sources(self, city: str | None = None, category: str | None = None) -> list[dict]:
+        if self._loaded_at is None or datetime.now() - self._loaded_at > timedelta(seconds=self.reload_interval_secs):
+            await self._reloads.do("reload", self._reload)
+
+        return [
+            source for source in self._sources
+            if (city is None or source.get('city') == city.upper()) and (category is None or source.get('category') == category)
+        ]
+
+    async def _reload(self):
+        try:
+            async with async_session() as session:
+                result = await session.execute(select(FeedSources).where(FeedSources.active == True))
+                rows = result.scalars().all()
+        except Exception as e:
+            print(f"Error loading feed sources, using static list: {e}")
+            rows = []
+
+        if rows:
+            self._sources = [{
+                "id": row.id,
+                "name": row.name,
+                "url": row.url,
+                "category": row.category,
+                "city": row.city,
+                "ttl_secs": row.poll_interval_secs or settings.RSS_CACHE_TTL_SECS,
+                "min_poll_interval_secs": row.min_poll_interval_secs,
+                "max_poll_interval_secs": row.max_poll_interval_secs,
+                "new_items_per_hour": row.new_items_per_hour,
+                "last_polled_at": row.last_polled_at
+            } for row in rows]
+        elif not self._sources:
+            self._sources = [dict(source) for source in RSS_FEEDS_SOURCES]
+        self._loaded_at = datetime.now()
+
+    async def record_poll(self, feed_source: dict, new_items: int):
+        """Adapt and persist the polling interval of a DB-backed source after a poll."""
+        if 'id' not in feed_source:
+            return
+
+        now = datetime.now()
+        last_polled_at = feed_source.get('last_polled_at')
+        elapsed_secs = (now - last_polled_at).total_seconds() if last_polled_at else feed_source['ttl_secs']
+        poll_interval_secs, new_items_per_hour = compute_next_poll_interval(feed_source, new_items, elapsed_secs)
+
+        # the cached dict is what the poller reads its TTL from, so this applies immediately
+        feed_source.update(ttl_secs=poll_interval_secs, new_items_per_hour=new_items_per_hour, last_polled_at=now)
+
+        async with async_session() as session:
+            await session.execute(
+                update(FeedSources)
+                    .where(FeedSources.id == feed_source['id'])
+                    .values(poll_interval_secs=poll_interval_secs, new_items_per_hour=new_items_per_hour, last_polled_at=now)
+            )
+            await session.commit()
+
+
+feed_source_registry = FeedSourceRegistry()
+feed_poller = FeedPoller(
+    parse_workers=settings.RSS_PARSE_WORKERS,
+    default_ttl_secs=settings.RSS_CACHE_TTL_SECS,
+    on_polled=feed_source_registry.record_poll
+)
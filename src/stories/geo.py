@@ -0,0 +1,140 @@
+import traceback
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import async_session
+from src.models import GazetteerPlaces, Locations
+from src.utils.aho_corasick import AhoCorasick
+
+# (in title, in snippet) score of a mention, by how the place relates to the location
+CITY_SCORES = {
+    "target_city": (1.0, 0.8),
+    "target_locality": (0.9, 0.7),
+    "target_region": (0.4, 0.3),
+    "target_state": (0.3, 0.2),
+}
+STATE_SCORES = {
+    "target_state": (1.0, 0.8),
+    "in_state": (0.8, 0.6),
+}
+
+
+@dataclass(frozen=True)
+class Place:
+    canonical_name: str
+    kind: str
+    city: str | None
+    state: str | None
+
+
+def normalize_text(text: str | None) -> str:
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or unicodedata.category(char).startswith("M")
+
+
+class Gazetteer:
+    """
+    City, locality, region and state names in every language we ingest, compiled into one
+    Aho-Corasick automaton so a story is scanned once no matter how many names there are.
+    Rebuilt from gazetteer_places every `reload_interval_mins`.
+    """
+
+    def __init__(self, reload_interval_mins: int = 60):
+        self.reload_interval_mins = reload_interval_mins
+        self._automaton: AhoCorasick | None = None
+        self._loaded_at: datetime | None = None
+
+    async def ensure_loaded(self):
+        if self._loaded_at and datetime.now() - self._loaded_at < timedelta(minutes=self.reload_interval_mins):
+            return
+
+        try:
+            async with async_session() as session:
+                result = await session.execute(select(GazetteerPlaces).where(GazetteerPlaces.active.is_(True)))
+                places = result.scalars().all()
+        except Exception as e:
+            print(f"Error loading gazetteer: {e}")
+            traceback.print_exc()
+            return
+
+        automaton = AhoCorasick()
+        for place in places:
+            automaton.add(normalize_text(place.name), Place(place.canonical_name, place.kind, place.city, place.state))
+        automaton.build()
+        self._automaton = automaton
+        self._loaded_at = datetime.now()
+
+    def find_places(self, text: str | None) -> list[Place]:
+        if self._automaton is None or not text:
+            return []
+
+        text = normalize_text(text)
+        places = []
+        for start, end, place in self._automaton.search(text):
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            # Latin names must end on a word boundary. Marathi/Hindi names take case
+            # suffixes (नागपुरात, नागपुर में), so only their start is checked.
+            if end < len(text) and text[end - 1].isascii() and _is_word_char(text[end]):
+                continue
+            places.append(place)
+        return places
+
+
+def get_place_relation(place: Place, level: str, city: str | None, state: str | None) -> str | None:
+    if level == "CITY":
+        if place.kind == "city" and place.canonical_name == city:
+            return "target_city"
+        if place.kind == "locality" and place.city == city:
+            return "target_locality"
+        if place.kind == "region" and place.state == state:
+            return "target_region"
+        if place.kind == "state" and place.canonical_name == state:
+            return "target_state"
+    elif level == "STATE":
+        if place.kind == "state" and place.canonical_name == state:
+            return "target_state"
+        if place.state == state:
+            return "in_state"
+    return None
+
+
+def score_story(title: str | None, snippet: str | None, level: str, city: str | None, state: str | None) -> tuple[float | None, list[str]]:
+    """Relevance of a story to a CITY or STATE location and the places it mentions."""
+    title_places = gazetteer.find_places(title)
+    snippet_places = gazetteer.find_places(snippet)
+    matched = sorted({place.canonical_name for place in title_places + snippet_places})
+
+    scores = {"CITY": CITY_SCORES, "STATE": STATE_SCORES}.get(level)
+    if scores is None:
+        return None, matched
+
+    score = 0.0
+    for places, position in ((title_places, 0), (snippet_places, 1)):
+        for place in places:
+            relation = get_place_relation(place, level, city, state)
+            if relation:
+                score = max(score, scores[relation][position])
+    return score, matched
+
+
+gazetteer = Gazetteer()
+
+
+async def assign_geo_relevance(session: AsyncSession, stories: list[dict], location_id: str):
+    """Set `geo_score` and `matched_places` on story dicts about to be inserted into stories_raw."""
+    await gazetteer.ensure_loaded()
+    result = await session.execute(select(Locations.level, Locations.city, Locations.state).where(Locations.id == location_id))
+    location = result.first()
+
+    for story in stories:
+        if location is None:
+            story["geo_score"], story["matched_places"] = None, []
+            continue
+        story["geo_score"], story["matched_places"] = score_story(story.get("title"), story.get("snippet"), location.level, location.city, location.state)
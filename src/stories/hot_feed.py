@@ -0,0 +1,172 @@
+import asyncio
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import engine
+from src.config.settings import settings
+
+HOT_FEED_CHANNEL = "hot_feed_invalidate"
+
+
+@dataclass
+class HotFeedEntry:
+    published_timestamp: datetime
+    id: uuid.UUID
+    cluster_id: uuid.UUID | None
+    encoded: bytes  # the story's feed JSON, encoded once when it enters the buffer
+
+    @property
+    def sort_key(self) -> tuple:
+        return (self.published_timestamp, str(self.id))
+
+
+def get_window_cutoff(max_days_back: int | None) -> datetime:
+    """Oldest published_timestamp in a location's feed window."""
+    return datetime.now() - timedelta(days=max_days_back+1 if max_days_back is not None else 2)
+
+
+@dataclass
+class HotFeedBuffer:
+    """
+    Latest stories of one location, newest first, at most `size` of them.
+    `complete` means the buffer holds the location's whole feed window.
+    """
+    size: int
+    max_days_back: int | None
+    entries: list[HotFeedEntry] = field(default_factory=list)
+    complete: bool = False
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def get_cutoff(self) -> datetime:
+        return get_window_cutoff(self.max_days_back)
+
+    def get_entries(self) -> list[HotFeedEntry]:
+        cutoff = self.get_cutoff()
+        # newest first, so stories that aged out of the window are all at the end
+        while self.entries and self.entries[-1].published_timestamp < cutoff:
+            self.entries.pop()
+        return self.entries
+
+    def add(self, new_entries: list[HotFeedEntry]):
+        """Merge freshly ingested stories, keeping only the newest story of each cluster."""
+        by_cluster = {}
+        merged = []
+        for entry in sorted(self.entries + new_entries, key=lambda e: e.sort_key, reverse=True):
+            if entry.cluster_id is not None:
+                if entry.cluster_id in by_cluster:
+                    continue
+                by_cluster[entry.cluster_id] = entry
+            merged.append(entry)
+
+        if len(merged) > self.size:
+            merged = merged[:self.size]
+            self.complete = False
+        self.entries = merged
+
+
+class HotFeedCache:
+    """
+    Per-worker ring buffers of the hottest location feeds, so repeated reads skip Postgres
+    and JSON encoding. Writers NOTIFY `hot_feed_invalidate` after inserting stories and every
+    other worker drops its copy. Buffers are only served while the LISTEN connection is up,
+    a worker that might have missed notifications never serves stale stories.
+    """
+
+    def __init__(self, size: int = 200, max_age_secs: int = 300, max_locations: int = 1000):
+        self.size = size
+        self.max_age_secs = max_age_secs
+        self.max_locations = max_locations
+        self.token = uuid.uuid4().hex  # tells our own notifications apart
+        self._buffers: dict[str, HotFeedBuffer] = {}
+        self._generations: dict[str, int] = {}
+        self._listening = False
+        self._task: asyncio.Task | None = None
+
+    def get(self, location_id) -> HotFeedBuffer | None:
+        if not self._listening:
+            return None
+
+        buffer = self._buffers.get(str(location_id))
+        if buffer is None:
+            return None
+        # safety net in case a notification was lost
+        if time.monotonic() - buffer.loaded_at > self.max_age_secs:
+            self._buffers.pop(str(location_id), None)
+            return None
+        return buffer
+
+    def get_generation(self, location_id) -> int:
+        """Take this before loading a buffer from the DB and hand it to `set`."""
+        return self._generations.get(str(location_id), 0)
+
+    def set(self, location_id, entries: list[HotFeedEntry], max_days_back: int | None, complete: bool, generation: int) -> HotFeedBuffer:
+        buffer = HotFeedBuffer(size=self.size, max_days_back=max_days_back, entries=entries[:self.size], complete=complete and len(entries) <= self.size)
+        # an invalidation that arrived while the rows were loading means they may already be stale
+        if self._listening and generation == self.get_generation(location_id):
+            if len(self._buffers) >= self.max_locations:
+                # evict the oldest load, dicts keep insertion order
+                self._buffers.pop(next(iter(self._buffers)))
+            self._buffers[str(location_id)] = buffer
+        return buffer
+
+    def add(self, location_id, entries: list[HotFeedEntry]):
+        buffer = self._buffers.get(str(location_id))
+        if buffer is not None and entries:
+            buffer.add(entries)
+
+    def invalidate(self, location_id):
+        self._buffers.pop(str(location_id), None)
+        self._generations[str(location_id)] = self.get_generation(location_id) + 1
+
+    def clear(self):
+        self._buffers = {}
+
+    async def notify(self, session: AsyncSession, location_id):
+        await session.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": HOT_FEED_CHANNEL, "payload": f"{location_id}:{self.token}"})
+        await session.commit()
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        location_id, _, token = payload.rpartition(":")
+        if token != self.token:
+            self.invalidate(location_id)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _listen(self):
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    raw_connection = await conn.get_raw_connection()
+                    driver_connection = raw_connection.driver_connection
+                    await driver_connection.add_listener(HOT_FEED_CHANNEL, self._on_notify)
+                    self._listening = True
+                    try:
+                        while not driver_connection.is_closed():
+                            await asyncio.sleep(10)
+                    finally:
+                        self._listening = False
+                        self.clear()
+                        if not driver_connection.is_closed():
+                            await driver_connection.remove_listener(HOT_FEED_CHANNEL, self._on_notify)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Hot feed listener error: {e}")
+                traceback.print_exc()
+            await asyncio.sleep(5)
+
+
+hot_feeds = HotFeedCache(size=settings.HOT_FEED_SIZE, max_age_secs=settings.HOT_FEED_MAX_AGE_SECS)
@@ -0,0 +1,312 @@
+import asyncio
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import select, update, delete, or_, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import async_session
+from src.config.settings import settings
+from src.config.llm_scheduler import set_llm_caller
+from src.models import GenerationJobs, GenerationJobStatus, UserStories
+from src.schemas import QuestionsResponseSchema, GeneratedStoryResponseSchema
+from src.stories.metrics import metrics
+from src.stories.service import generate_and_store_story_questions, get_generated_user_story
+
+ACTIVE_STATUSES = (GenerationJobStatus.QUEUED.value, GenerationJobStatus.RUNNING.value)
+RETRY_BACKOFF_SECS = 10
+MAX_RETRY_BACKOFF_SECS = 300
+
+GENERATION_JOBS = metrics.counter(
+    "generation_jobs_total", "Finished generation job attempts by outcome: succeeded, failed or retried", ("kind", "outcome")
+)
+GENERATION_JOB_WAIT_SECONDS = metrics.histogram(
+    "generation_job_wait_seconds", "Time from enqueue (or retry) until a worker claimed the job", ("kind",),
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+GENERATION_JOB_RUN_SECONDS = metrics.histogram(
+    "generation_job_run_seconds", "Time a worker spent running a job attempt", ("kind",),
+    buckets=(1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 300)
+)
+
+
+async def run_questions_job(session: AsyncSession, user_story: UserStories, params: dict):
+    questions = await generate_and_store_story_questions(session, user_story, params.get("force_regenerate", False))
+    # a DB error is returned rather than raised there
+    if isinstance(questions, HTTPException):
+        raise questions
+    if questions is None:
+        raise HTTPException(status_code=500, detail="DB error: could not insert questions")
+    return [QuestionsResponseSchema.model_validate(question).model_dump(mode="json") for question in questions]
+
+async def run_article_job(session: AsyncSession, user_story: UserStories, params: dict):
+    article = await get_generated_user_story(session, user_story, params.get("force_regenerate", False))
+    return GeneratedStoryResponseSchema.model_validate(article).model_dump(mode="json")
+
+JOB_HANDLERS = {
+    "questions": run_questions_job,
+    "article": run_article_job,
+}
+
+
+async def enqueue_generation_job(session: AsyncSession, kind: str, user_story: UserStories, params: dict | None = None) -> GenerationJobs:
+    """
+    Queue a generation for `user_story`. While a job of the same kind is queued or running for
+    the story, that job is returned instead of a second one.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown generation job kind {kind}")
+
+    now = datetime.now()
+    insert_stmt = (
+        insert(GenerationJobs)
+        .values(
+            kind=kind,
+            user_story_id=user_story.id,
+            author_id=user_story.author_id,
+            params=params or {},
+            status=GenerationJobStatus.QUEUED.value,
+            attempts=0,
+            max_attempts=settings.GENERATION_JOB_MAX_ATTEMPTS,
+            run_after=now,
+            created_at=now
+        )
+        .on_conflict_do_nothing(
+            index_elements=["kind", "user_story_id"],
+            index_where=GenerationJobs.status.in_(ACTIVE_STATUSES)
+        )
+        .returning(GenerationJobs)
+    )
+    active_job = select(GenerationJobs).where(
+        GenerationJobs.kind == kind,
+        GenerationJobs.user_story_id == user_story.id,
+        GenerationJobs.status.in_(ACTIVE_STATUSES)
+    )
+    while True:
+        result = await session.execute(insert_stmt)
+        job = result.scalars().first()
+        if job is not None:
+            break
+        result = await session.execute(active_job)
+        job = result.scalars().first()
+        if job is not None:
+            break
+        # the job we conflicted with finished before we could read it, queue ours after all
+    await session.commit()
+
+    generation_workers.wakeup()
+    return job
+
+async def get_generation_job(session: AsyncSession, job_id, author_id) -> GenerationJobs | None:
+    result = await session.execute(
+        select(GenerationJobs).where(GenerationJobs.id == job_id, GenerationJobs.author_id == author_id)
+    )
+    return result.scalars().first()
+
+def get_retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BACKOFF_SECS * 2 ** (attempts - 1), MAX_RETRY_BACKOFF_SECS))
+
+def is_retryable(error: Exception) -> bool:
+    # 4xx (story in the wrong mode, QnA missing, duplicate title) will fail the same way again
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500
+    return True
+
+
+class GenerationWorkerPool:
+    """
+    Runs queued generation jobs, at most `concurrency` at a time in this process.
+
+    Every gunicorn worker runs a pool. Jobs are claimed with FOR UPDATE SKIP LOCKED, so pools
+    never claim the same job and never wait on each other's row locks. A claimed job holds a
+    lease of `lease_secs`; if its worker dies the job is claimed again once the lease expires,
+    and the attempt counter fences off the old worker's late result. Failed attempts are
+    retried with exponential backoff up to the job's max_attempts.
+    """
+
+    def __init__(self, concurrency: int = 4, poll_interval_secs: float = 1.0, lease_secs: int = 600):
+        self.concurrency = concurrency
+        self.poll_interval_secs = poll_interval_secs
+        self.lease_secs = lease_secs
+        self.worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._task: asyncio.Task | None = None
+        self._job_tasks: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+
+    def wakeup(self):
+        """Claim right away instead of at the next poll, after a job was queued or finished here."""
+        self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self.worker_name = f"{socket.gethostname()}:{os.getpid()}"
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        # cancelled jobs hand themselves back to the queue
+        for task in list(self._job_tasks):
+            task.cancel()
+        await asyncio.gather(*self._job_tasks, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            try:
+                # cleared before claiming, a job queued meanwhile still cuts the sleep short
+                self._wakeup.clear()
+                free_slots = self.concurrency - len(self._job_tasks)
+                claimed = await self._claim(free_slots) if free_slots > 0 else []
+                for job in claimed:
+                    task = asyncio.create_task(self._run_job(job))
+                    self._job_tasks.add(task)
+                    task.add_done_callback(self._on_job_done)
+
+                # a full batch means more may be waiting, claim again right away
+                if claimed and len(claimed) == free_slots:
+                    continue
+                await self._sleep()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Generation workers error: {e}")
+                traceback.print_exc()
+                await asyncio.sleep(self.poll_interval_secs)
+
+    def _on_job_done(self, task: asyncio.Task):
+        self._job_tasks.discard(task)
+        self.wakeup()
+
+    async def _sleep(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_secs)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _claim(self, limit: int) -> list:
+        now = datetime.now()
+        claimable = (
+            select(GenerationJobs.id)
+            .where(or_(
+                and_(GenerationJobs.status == GenerationJobStatus.QUEUED.value, GenerationJobs.run_after <= now),
+                # the worker running it died
+                and_(GenerationJobs.status == GenerationJobStatus.RUNNING.value, GenerationJobs.locked_until < now)
+            ))
+            .order_by(GenerationJobs.run_after)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(GenerationJobs)
+            .where(GenerationJobs.id.in_(claimable.scalar_subquery()))
+            .values(
+                status=GenerationJobStatus.RUNNING.value,
+                attempts=GenerationJobs.attempts + 1,
+                started_at=now,
+                locked_until=now + timedelta(seconds=self.lease_secs),
+                worker=self.worker_name
+            )
+            .returning(
+                GenerationJobs.id,
+                GenerationJobs.kind,
+                GenerationJobs.user_story_id,
+                GenerationJobs.author_id,
+                GenerationJobs.params,
+                GenerationJobs.attempts,
+                GenerationJobs.max_attempts,
+                GenerationJobs.run_after
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with async_session() as session:
+            result = await session.execute(stmt)
+            jobs = result.all()
+            await session.commit()
+
+        for job in jobs:
+            GENERATION_JOB_WAIT_SECONDS.observe(max((now - job.run_after).total_seconds(), 0), kind=job.kind)
+        return jobs
+
+    async def _finish(self, job, **values):
+        # matching on attempts ignores a worker whose lease expired and whose job was claimed again
+        async with async_session() as session:
+            await session.execute(
+                update(GenerationJobs)
+                .where(GenerationJobs.id == job.id, GenerationJobs.attempts == job.attempts)
+                .values(locked_until=None, **values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+    async def _run_job(self, job):
+        if job.attempts > job.max_attempts:
+            # only happens to jobs reclaimed after their worker died on the last attempt
+            GENERATION_JOBS.inc(kind=job.kind, outcome="failed")
+            await self._finish(job, status=GenerationJobStatus.FAILED.value, error="worker stopped while running the job", finished_at=datetime.now())
+            return
+
+        # each job runs in its own task, so this only applies to its LLM calls
+        set_llm_caller("stories", job.author_id)
+        try:
+            with GENERATION_JOB_RUN_SECONDS.time(kind=job.kind):
+                async with async_session() as session:
+                    user_story = await session.get(UserStories, job.user_story_id)
+                    if user_story is None:
+                        raise HTTPException(status_code=404, detail="story not found")
+                    result = await JOB_HANDLERS[job.kind](session, user_story, job.params or {})
+        except asyncio.CancelledError:
+            # shutting down, let another worker run it
+            await asyncio.shield(self._release(job))
+            raise
+        except Exception as e:
+            detail = str(e.detail) if isinstance(e, HTTPException) else str(e)
+            print(f"Generation job {job.id} ({job.kind}) failed on attempt {job.attempts}: {detail}")
+            if not isinstance(e, HTTPException):
+                traceback.print_exc()
+
+            if is_retryable(e) and job.attempts < job.max_attempts:
+                GENERATION_JOBS.inc(kind=job.kind, outcome="retried")
+                await self._finish(job, status=GenerationJobStatus.QUEUED.value, error=detail, run_after=datetime.now() + get_retry_delay(job.attempts))
+            else:
+                GENERATION_JOBS.inc(kind=job.kind, outcome="failed")
+                await self._finish(job, status=GenerationJobStatus.FAILED.value, error=detail, finished_at=datetime.now())
+            return
+
+        GENERATION_JOBS.inc(kind=job.kind, outcome="succeeded")
+        await self._finish(job, status=GenerationJobStatus.SUCCEEDED.value, result=result, error=None, finished_at=datetime.now())
+
+    async def _release(self, job):
+        try:
+            await self._finish(job, status=GenerationJobStatus.QUEUED.value, attempts=job.attempts - 1, run_after=datetime.now())
+        except Exception as e:
+            print(f"Error releasing generation job {job.id}: {e}")
+
+
+generation_workers = GenerationWorkerPool(
+    concurrency=settings.GENERATION_WORKER_CONCURRENCY,
+    poll_interval_secs=settings.GENERATION_JOB_POLL_INTERVAL_SECS,
+    lease_secs=settings.GENERATION_JOB_LEASE_SECS
+)
+
+
+async def purge_finished_generation_jobs(retention_days: int):
+    """Delete jobs that finished more than `retention_days` ago. Run by the ingestion leader with maintenance."""
+    try:
+        async with async_session() as session:
+            result = await session.execute(
+                delete(GenerationJobs).where(GenerationJobs.finished_at < datetime.now() - timedelta(days=retention_days))
+            )
+            await session.commit()
+        if result.rowcount:
+            print(f"Generation jobs: purged {result.rowcount} finished jobs")
+    except Exception as e:
+        print(f"Error purging generation jobs: {e}")
+        traceback.print_exc()
@@ -0,0 +1,138 @@
+import re
+import traceback
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from sqlalchemy import select, delete, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from src.config.database import async_session
+from src.config.settings import settings
+from src.models import LLMResponseCacheEntries
+from src.stories.metrics import metrics
+from src.utils.cache import CacheBackend, LRUCache, make_cache_key
+from src.utils.singleflight import SingleFlight
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+LLM_CACHE_REQUESTS = metrics.counter(
+    "llm_cache_requests_total", "LLM generations by where the response came from: memory, database, miss or bypass", ("namespace", "result")
+)
+
+
+def normalize_inputs(value):
+    """Prompt inputs with insignificant differences (unicode form, runs of whitespace) removed."""
+    if isinstance(value, str):
+        return WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", value)).strip()
+    if isinstance(value, dict):
+        return {str(key): normalize_inputs(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(item) for item in value]
+    return value
+
+
+class DatabaseCache(CacheBackend):
+    """
+    Cache entries in the llm_response_cache table, shared by every worker and kept across deploys.
+    A database error is logged and treated as a miss, the cache never fails a generation.
+    """
+
+    async def get(self, key: str):
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(LLMResponseCacheEntries.response).where(
+                        LLMResponseCacheEntries.key == key,
+                        or_(LLMResponseCacheEntries.expires_at.is_(None), LLMResponseCacheEntries.expires_at > datetime.now())
+                    )
+                )
+                return result.scalar_one_or_none()
+        except Exception as e:
+            print(f"Error reading LLM cache entry {key}: {e}")
+            return None
+
+    async def set(self, key: str, value, ttl_secs: int | None = None):
+        now = datetime.now()
+        expires_at = now + timedelta(seconds=ttl_secs) if ttl_secs is not None else None
+        try:
+            async with async_session() as session:
+                stmt = insert(LLMResponseCacheEntries).values(key=key, response=value, created_at=now, expires_at=expires_at)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["key"],
+                    set_={"response": stmt.excluded.response, "created_at": now, "expires_at": expires_at}
+                )
+                await session.execute(stmt)
+                await session.commit()
+        except Exception as e:
+            print(f"Error writing LLM cache entry {key}: {e}")
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of parsed LLM responses, keyed by (namespace, model, prompt template
+    version, hash of the normalized inputs). Bump a template's version whenever its prompt changes,
+    old entries then simply stop matching and expire.
+
+    Lookups go through a per-worker LRU, then the database. Only truthy results are cached, so
+    failed or empty generations are retried. `bypass=True` skips the lookup but stores the fresh
+    response, which is what force_regenerate wants.
+    """
+
+    def __init__(self, memory: CacheBackend, database: CacheBackend, ttl_secs: int | None = None, enabled: bool = True):
+        self.memory = memory
+        self.database = database
+        self.ttl_secs = ttl_secs
+        self.enabled = enabled
+        self._generations = SingleFlight()
+
+    def make_key(self, namespace: str, model: str, template_version: int, inputs: dict) -> str:
+        return make_cache_key(f"llm:{namespace}:{model}:v{template_version}", normalize_inputs(inputs))
+
+    async def get_or_generate(self, namespace: str, model: str, template_version: int, inputs: dict, generate: Callable[[], Awaitable], bypass: bool = False):
+        if not self.enabled:
+            return await generate()
+
+        key = self.make_key(namespace, model, template_version, inputs)
+        if not bypass:
+            value = await self.memory.get(key)
+            if value is not None:
+                LLM_CACHE_REQUESTS.inc(namespace=namespace, result="memory")
+                return value
+
+            value = await self.database.get(key)
+            if value is not None:
+                LLM_CACHE_REQUESTS.inc(namespace=namespace, result="database")
+                await self.memory.set(key, value, self.ttl_secs)
+                return value
+
+        LLM_CACHE_REQUESTS.inc(namespace=namespace, result="bypass" if bypass else "miss")
+        # a double submit or a retry racing the original request shares one generation
+        return await self._generations.do(key, self._generate, key, generate)
+
+    async def _generate(self, key: str, generate: Callable[[], Awaitable]):
+        value = await generate()
+        if value:
+            await self.memory.set(key, value, self.ttl_secs)
+            await self.database.set(key, value, self.ttl_secs)
+        return value
+
+
+llm_cache = LLMResponseCache(
+    memory=LRUCache(settings.LLM_CACHE_MAX_ENTRIES),
+    database=DatabaseCache(),
+    ttl_secs=settings.LLM_CACHE_TTL_SECS,
+    enabled=settings.LLM_CACHE_ENABLED
+)
+
+
+async def purge_expired_llm_responses():
+    """Delete expired cache rows. Run by the ingestion leader with partition maintenance."""
+    try:
+        async with async_session() as session:
+            result = await session.execute(delete(LLMResponseCacheEntries).where(LLMResponseCacheEntries.expires_at < datetime.now()))
+            await session.commit()
+        if result.rowcount:
+            print(f"LLM cache: purged {result.rowcount} expired responses")
+    except Exception as e:
+        print(f"Error purging LLM cache: {e}")
+        traceback.print_exc()
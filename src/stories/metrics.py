@@ -0,0 +1,44 @@
+from src.config.settings import settings
+from src.utils.metrics import MetricsRegistry
+
+metrics = MetricsRegistry(directory=settings.METRICS_DIR or None, flush_interval_secs=settings.METRICS_FLUSH_INTERVAL_SECS)
+
+# `source` is serpapi or rss. `feed` is the location scope for SerpAPI and the feed name for RSS.
+FETCH_SECONDS = metrics.histogram(
+    "ingestion_fetch_seconds", "Latency of one SerpAPI page or RSS feed request", ("source", "feed")
+)
+FETCH_ERRORS = metrics.counter(
+    "ingestion_fetch_errors_total", "Failed SerpAPI page or RSS feed requests", ("source", "feed")
+)
+PARSE_SECONDS = metrics.histogram(
+    "ingestion_parse_seconds", "Time spent turning a fetched page or feed into story records", ("source", "feed"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+ITEMS_FETCHED = metrics.counter(
+    "ingestion_items_fetched_total", "Story records returned by a source, before any filtering", ("source", "feed")
+)
+ITEMS_NEW = metrics.counter(
+    "ingestion_items_new_total", "Fetched records not seen in the previous poll (RSS) or newer than the refresh cutoff (SerpAPI)", ("source", "feed")
+)
+REFRESH_SECONDS = metrics.histogram(
+    "ingestion_refresh_seconds", "Duration of a whole SerpAPI refresh of one location", ("scope",),
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+)
+REFRESH_PAGES = metrics.histogram(
+    "ingestion_refresh_pages", "SerpAPI pages consumed by one refresh; 1 means the interval could be longer", ("scope",),
+    buckets=(1, 2, 3, 4, 5, 8, 10, 15, 20)
+)
+
+# dedup ratio = 1 - inserted / received
+STORIES_RECEIVED = metrics.counter(
+    "ingestion_stories_received_total", "Stories handed to add_stories_to_db", ("path",)
+)
+STORIES_INSERTED = metrics.counter(
+    "ingestion_stories_inserted_total", "Stories actually inserted into stories_raw", ("path",)
+)
+STORIES_DUPLICATE = metrics.counter(
+    "ingestion_stories_duplicate_total", "Stories dropped as duplicates, within the batch or of a stored link", ("path", "reason")
+)
+INSERT_SECONDS = metrics.histogram(
+    "ingestion_insert_seconds", "Time add_stories_to_db spends clustering, scoring and writing a batch", ("path",)
+)
@@ -0,0 +1,104 @@
+import re
+import traceback
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config.database import async_session, advisory_lock
+
+# stories_raw is range partitioned by published_timestamp, one partition per day.
+# Rows outside every daily partition (legacy rows, bogus future dates) land in the default partition.
+STORIES_RAW_TABLE = "stories_raw"
+STORIES_RAW_DEFAULT_PARTITION = "stories_raw_default"
+PARTITION_NAME_PATTERN = re.compile(r"^stories_raw_p(\d{8})$")
+
+
+def partition_name(day: date) -> str:
+    return f"{STORIES_RAW_TABLE}_p{day:%Y%m%d}"
+
+
+def create_partition_sql(day: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF {STORIES_RAW_TABLE} "
+        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+    )
+
+
+def partition_days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+async def get_partition_days(session: AsyncSession) -> dict[date, str]:
+    result = await session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {"table": STORIES_RAW_TABLE})
+
+    partitions = {}
+    for (name,) in result.all():
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match:
+            partitions[datetime.strptime(match.group(1), "%Y%m%d").date()] = name
+    return partitions
+
+
+async def create_stories_raw_partitions(session: AsyncSession, days: list[date], existing: dict[date, str] | None = None) -> list[str]:
+    """Create the missing daily partitions among `days`. Does not commit."""
+    if existing is None:
+        existing = await get_partition_days(session)
+
+    created = []
+    for day in days:
+        if day in existing:
+            continue
+        try:
+            async with session.begin_nested():
+                await session.execute(text(create_partition_sql(day)))
+            created.append(partition_name(day))
+        except Exception as e:
+            # e.g. the default partition already holds rows for that day
+            print(f"Error creating partition {partition_name(day)}: {e}")
+    return created
+
+
+async def maintain_stories_raw_partitions(session: AsyncSession, days_ahead: int, retention_days: int) -> dict:
+    """
+    Create the daily partitions for the next `days_ahead` days and drop the ones older than
+    `retention_days`. Dropping a partition is a catalog operation, not a DELETE, so retention
+    costs the same no matter how many rows a day holds.
+    """
+    today = date.today()
+    oldest_kept = today - timedelta(days=retention_days)
+    existing = await get_partition_days(session)
+
+    created = await create_stories_raw_partitions(session, partition_days(today, today + timedelta(days=days_ahead)), existing)
+
+    dropped = []
+    for day, name in sorted(existing.items()):
+        if day < oldest_kept:
+            await session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+
+    cutoff = datetime.combine(oldest_kept, datetime.min.time())
+    # the default partition and the side tables are small, plain deletes are fine there
+    await session.execute(text(f"DELETE FROM {STORIES_RAW_DEFAULT_PARTITION} WHERE published_timestamp < :cutoff"), {"cutoff": cutoff})
+    await session.execute(text("DELETE FROM stories_raw_link_hashes WHERE published_timestamp < :cutoff"), {"cutoff": cutoff})
+    await session.execute(text("DELETE FROM stories_raw_content WHERE published_timestamp < :cutoff"), {"cutoff": cutoff})
+    await session.commit()
+
+    return {"created": created, "dropped": dropped}
+
+
+async def run_partition_maintenance(days_ahead: int, retention_days: int):
+    try:
+        async with advisory_lock("stories_raw:partitions"):
+            async with async_session() as session:
+                result = await maintain_stories_raw_partitions(session, days_ahead, retention_days)
+        if result["created"] or result["dropped"]:
+            print(f"stories_raw partitions created: {result['created']}, dropped: {result['dropped']}")
+    except Exception as e:
+        print(f"Error maintaining stories_raw partitions: {e}")
+        traceback.print_exc()
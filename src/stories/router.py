@@ -1,47 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Request
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from typing import Annotated, Literal
+from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 import traceback
+from sse_starlette.sse import EventSourceResponse
 
 from src.config.database import get_session
-from src.schemas import LocationDataSchema, GenerateOptionsSchema, CreateStorySchema, QuestionsResponseSchema, AnswerSchema, GeneratedStoryResponseSchema, UserStoryFullResponseSchema, UserStoryItem, EditGeneratedArticleSchema, UploadedImageKeys,CreateStoryResponseSchema
-from src.stories.service import add_stories_to_db, get_location_status, fetch_stories_from_db, add_location_record, update_location_timestamp, get_story_by_id, create_user_story_db, get_generated_user_story, upsert_answer, generate_and_store_story_questions, get_user_story_or_404, update_user_story_status, get_user_stories_db, get_complete_story_by_id, edit_generated_article_db
-from src.stories.utils import needs_fetching, fetch_news_articles, rewrite_story, get_all_news, get_story_status_dep
+from src.schemas import LocationDataSchema, MultiScopeFeedSchema, GenerateOptionsSchema, CreateStorySchema, QuestionsResponseSchema, AnswerSchema, GeneratedStoryResponseSchema, UserStoryFullResponseSchema, UserStoryItem, EditGeneratedArticleSchema, UploadedImageKeys,CreateStoryResponseSchema, GenerationJobSchema
+from src.stories.service import stream_generated_user_story, get_location_status, ensure_scope_location, get_multi_scope_feed, fetch_stories_from_db, fetch_stories_page, fetch_stories_json, fetch_stories_page_json, stream_stories_ndjson, decode_feed_cursor, get_story_by_id, create_user_story_db, get_generated_user_story, upsert_answer, generate_and_store_story_questions, get_user_story_or_404, update_user_story_status, get_user_stories_db, get_complete_story_by_id, edit_generated_article_db
+from src.stories.utils import rewrite_story, get_all_news, get_story_status_dep
 from src.models import UserStories, Users, UserRoles, GeneratedUserStories
 from src.auth.dependencies import role_checker
 from src.media.service import check_article_authorization
 from src.stories.dependencies import user_story_mode_checker
+from src.stories.extraction import get_story_content
+from src.stories.jobs import enqueue_generation_job, get_generation_job
+from src.config.llm_scheduler import set_llm_caller
 
 router = APIRouter()
 Session = Annotated[AsyncSession, Depends(get_session)]
 UserStoryDep = Annotated[UserStories, Depends(get_user_story_or_404)]
+BackgroundQuery = Annotated[bool, Query(description="Queue the generation and return 202 with a job to poll at `GET /jobs/{job_id}`")]
 GeneratedArticleDep = Annotated[GeneratedUserStories, Depends(check_article_authorization)]
 
 @router.get("/", include_in_schema=False)
-async def get_feed():
-    feed = await get_all_news()
+async def get_feed(city: str | None = None, category: str | None = None):
+    feed = await get_all_news(city=city, category=category)
     return feed
 
 @router.post('/', include_in_schema=False)
-async def get_news_feed(request: LocationDataSchema, session: Annotated[AsyncSession, Depends(get_session)]):
+async def get_news_feed(
+    request: LocationDataSchema,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    limit: Annotated[int | None, Query(ge=1, le=500)] = None,
+    cursor: str | None = None,
+    stream: bool = False,
+    min_relevance: Annotated[float | None, Query(ge=0, le=1)] = None,
+    sort: Literal['latest', 'relevance'] = 'latest',
+    language: Literal['en', 'hi', 'mr'] | None = None
+):
+    """
+    Without `limit`, `cursor` or `stream` the whole window is returned at once as before.
+    `limit`/`cursor` page through it by (published_timestamp, id), `stream` sends it as NDJSON.
+    `min_relevance` drops stories scored below it for the location, `sort=relevance` ranks
+    the whole window by that score. `language` keeps only stories detected as en, hi or mr.
+    """
     try:
         location_db = await get_location_status(session, request)
-        if not location_db:
-            news_articles = await fetch_news_articles(request)
-            added_location = await add_location_record(session, request)
-            added_articles = await add_stories_to_db(session, news_articles, added_location.id)
-            return {
-                'stories': added_articles,
-                'count': len(added_articles)
-            }
-        if needs_fetching(location_db):
-            news_articles = await fetch_news_articles(request, since_timestamp=location_db.last_fetched_timestamp)
-            await update_location_timestamp(session, location_db.id)
-
-            if news_articles:
-                await add_stories_to_db(session, news_articles, location_db.id)
-        
-        all_articles = await fetch_stories_from_db(session, location_db.id)
+        location_id = await ensure_scope_location(request, location_db)
+
+        if stream:
+            if cursor:
+                # validate up front, once streaming starts an error can no longer become a 400
+                decode_feed_cursor(cursor)
+            return StreamingResponse(stream_stories_ndjson(location_id, cursor, min_relevance, language), media_type="application/x-ndjson")
+
+        if sort == 'latest' and (limit is not None or cursor is not None):
+            if cursor is None and min_relevance is None and language is None:
+                page = await fetch_stories_page_json(session, location_id, limit)
+                if page is not None:
+                    return Response(content=page, media_type="application/json")
+            return await fetch_stories_page(session, location_id, limit or 50, cursor, min_relevance, language)
+
+        if sort == 'latest' and min_relevance is None and language is None:
+            feed = await fetch_stories_json(session, location_id)
+            if feed is not None:
+                return Response(content=feed, media_type="application/json")
+
+        all_articles = await fetch_stories_from_db(session, location_id, min_relevance=min_relevance, sort=sort, language=language)
         return {
                 'stories': all_articles,
                 'count': len(all_articles)
@@ -58,19 +85,36 @@ async def get_news_feed(request: LocationDataSchema, session: Annotated[AsyncSes
             detail="An error occurred while fetching news articles"
         )
         
+@router.post('/all', include_in_schema=False)
+async def get_multi_scope_news_feed(request: MultiScopeFeedSchema, session: Annotated[AsyncSession, Depends(get_session)]):
+    try:
+        return await get_multi_scope_feed(session, request)
+    except ValueError as ve:
+        traceback.print_exc()
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        print(f"Error in get_multi_scope_news_feed: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500, 
+            detail="An error occurred while fetching news articles"
+        )
+
 @router.patch('/select/{id}', include_in_schema=False)
 async def select_story(id, session: Annotated[AsyncSession, Depends(get_session)]):
     ...
 
 @router.post('/generate/{id}', include_in_schema=False)
-async def generate_article(id: str, options: GenerateOptionsSchema, session: Annotated[AsyncSession, Depends(get_session)]):
+async def generate_article(id: str, options: GenerateOptionsSchema, session: Annotated[AsyncSession, Depends(get_session)], bypass_cache: bool = False):
     try:
         print(f"Generate options: {options}")
+        set_llm_caller("stories")
         story = await get_story_by_id(session, id)
         if not story:
             return HTTPException(status_code=404, detail="story not found")
         
-        generated_story = await rewrite_story(options, story)
+        content = await get_story_content(session, id)
+        generated_story = await rewrite_story(options, story, content, bypass_cache)
         if not generated_story:
             return HTTPException(status_code=500, detail="cannot generate a new story at the moment")
         # print(f"Generated story: {generated_story}\nType of generated story: {type(generated_story)}")
@@ -253,9 +297,12 @@ async def initiate_new_story(
 
         - If `force_regenerate=false` (default), return existing questions if available.  
         - If `force_regenerate=true`, regenerate fresh questions and overwrite old ones.  
+        - If `background=true`, the generation is queued and a job is returned with status 202.
+          Poll `GET /jobs/{job_id}`, its `result` holds the questions once it succeeded.
         Questions help structure the answers that will guide article generation.
     """,
     responses={
+        202: {"description": "Generation queued (`background=true`)", "model": GenerationJobSchema},
         404: {
             "description": "User story not found",
             "content": {
@@ -285,8 +332,12 @@ async def initiate_new_story(
 async def get_context_questions(
     session: Session,
     user_story: Annotated[UserStories, Depends(user_story_mode_checker("ai"))],
-    force_regenerate: bool = False
+    request: Request,
+    force_regenerate: bool = False,
+    background: BackgroundQuery = False
 ):
+    if background:
+        return await enqueue_job_response(session, request, "questions", user_story, force_regenerate)
     return await generate_and_store_story_questions(session, user_story, force_regenerate)
 
 
@@ -395,6 +446,7 @@ async def submit_answer(request: AnswerSchema, session: Session, user_story: Ann
         """,
     responses={
         200: {"description": "Successfully generated or retrieved article"},
+        202: {"description": "Generation queued (`background=true`), poll `GET /jobs/{job_id}`", "model": GenerationJobSchema},
         400: {"description": "Invalid story mode"},
         404: {
             "description": "Required data missing (e.g., QnA missing for AI mode)"
@@ -410,12 +462,67 @@ async def submit_answer(request: AnswerSchema, session: Session, user_story: Ann
         },
     },
 )
-async def generate_user_story(session: Session, user_story: UserStoryDep, force_regenerate: bool = False):
+async def generate_user_story(session: Session, user_story: UserStoryDep, request: Request, force_regenerate: bool = False, background: BackgroundQuery = False):
     # if user_story.mode != 'ai':
     #     raise HTTPException(status_code=400, detail="User story is not in AI mode")
+    if background:
+        return await enqueue_job_response(session, request, "article", user_story, force_regenerate)
     return await get_generated_user_story(session, user_story, force_regenerate)
 
 
+async def enqueue_job_response(session: AsyncSession, request: Request, kind: str, user_story: UserStories, force_regenerate: bool) -> JSONResponse:
+    job = await enqueue_generation_job(session, kind, user_story, {"force_regenerate": force_regenerate})
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=GenerationJobSchema.model_validate(job).model_dump(mode="json"),
+        headers={"Location": str(request.url_for("get_job_status", job_id=str(job.id)))}
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=GenerationJobSchema,
+    summary="Status of a queued generation",
+    description="""
+        Poll a job returned by `/user/{id}/questions?background=true` or `/user/{id}/generate?background=true`.
+
+        `status` goes `queued` -> `running` -> `succeeded` or `failed`. A failed attempt that can
+        be retried goes back to `queued`, `error` then holds the last failure. Once `succeeded`,
+        `result` holds what the synchronous endpoint would have returned.
+        """,
+    responses={404: {"description": "Job not found or not created by the current creator"}},
+)
+async def get_job_status(
+    session: Session,
+    curr_creator: Annotated[Users, Depends(role_checker(UserRoles.CREATOR))],
+    job_id: UUID
+):
+    job = await get_generation_job(session, job_id, curr_creator.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@router.get(
+    "/user/{user_story_id}/generate/stream",
+    summary="Generate the final article, streamed as server-sent events",
+    description="""
+        Same as `GET /user/{user_story_id}/generate`, but the article is streamed while it is written
+        instead of returned after 30-60 s of silence.
+
+        Events:
+        - `delta`: `{"field": ..., "text": ...}`, more text of `title`, `english_title`, `snippet` or `full_text`
+        - `field`: `{"field": ..., "value": ...}`, a field is complete (also `category` and `tags`)
+        - `article`: the stored article, same shape as the non-streaming endpoint. Sent last.
+        - `error`: `{"detail": ...}`, generation or storing failed and nothing was saved
+
+        A stored article that needs no regeneration, and manual mode stories, are sent as a single `article` event.
+        """,
+)
+async def stream_user_story(session: Session, user_story: UserStoryDep, force_regenerate: bool = False):
+    return EventSourceResponse(await stream_generated_user_story(session, user_story, force_regenerate))
+
+
 @router.put("/user/generate/{generated_article_id}", response_model=GeneratedStoryResponseSchema)
 async def edit_generated_article(session: Session, curr_creator: Annotated[Users, Depends(role_checker(UserRoles.CREATOR))], generated_article_id: str, payload: EditGeneratedArticleSchema):
     return await edit_generated_article_db(session, curr_creator.id, generated_article_id, payload)
@@ -0,0 +1,241 @@
+import asyncio
+import heapq
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.config.database import engine, async_session
+from src.config.settings import settings
+from src.models import Locations
+from src.stories.service import get_locations_for_refresh, build_location_request, refresh_location_stories_once
+from src.stories.utils import SCOPE_CONFIG
+from src.stories.partitions import run_partition_maintenance
+from src.stories.extraction import run_content_extraction
+from src.stories.llm_cache import purge_expired_llm_responses
+from src.stories.jobs import purge_finished_generation_jobs
+
+# Key for the session-level advisory lock that elects the ingestion leader.
+# Every gunicorn worker starts a scheduler, only the lock holder refreshes.
+INGESTION_LEADER_LOCK_KEY = 72110001
+
+
+def get_next_due_time(location) -> datetime:
+    """Next time a location should be refreshed, based on its refresh interval."""
+    if location.last_fetched_timestamp is None:
+        return datetime.now()
+
+    refresh_interval_mins = location.refresh_interval_mins or SCOPE_CONFIG[location.level]['refresh_interval_mins']
+    return location.last_fetched_timestamp + timedelta(minutes=refresh_interval_mins)
+
+
+class IngestionScheduler:
+    """
+    Refreshes every Locations row in the background when its refresh interval has elapsed,
+    so the feed endpoint only has to read from stories_raw.
+
+    Locations are kept in a min-heap ordered by next due time. The heap is rebuilt from
+    the DB every `resync_interval_secs`, which also picks up locations created by other workers.
+    A location whose refresh failed is retried with exponential backoff, from `retry_backoff_secs`
+    up to `max_retry_backoff_secs`, instead of at every resync.
+    The leader also runs stories_raw partition maintenance and purges expired LLM cache entries
+    and finished generation jobs every `maintenance_interval_mins`.
+    """
+
+    def __init__(self, max_concurrent_fetches: int = 3, resync_interval_secs: int = 60, maintenance_interval_mins: int = 60,
+                 retry_backoff_secs: int = 60, max_retry_backoff_secs: int = 3600):
+        self.max_concurrent_fetches = max_concurrent_fetches
+        self.resync_interval_secs = resync_interval_secs
+        self.maintenance_interval_mins = maintenance_interval_mins
+        self.retry_backoff_secs = retry_backoff_secs
+        self.max_retry_backoff_secs = max_retry_backoff_secs
+
+        self._heap: list[tuple[datetime, str]] = []
+        self._in_flight: set[str] = set()
+        self._failures: dict[str, tuple[int, datetime]] = {}  # location id -> (consecutive failures, retry at)
+        self._leader_conn: AsyncConnection | None = None
+        self._task: asyncio.Task | None = None
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._next_resync = datetime.min
+        self._next_maintenance = datetime.min
+        self._next_extraction = datetime.min
+        self._extraction_task: asyncio.Task | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_conn is not None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self._extraction_task is not None:
+            self._extraction_task.cancel()
+            await asyncio.gather(self._extraction_task, return_exceptions=True)
+            self._extraction_task = None
+
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        await self._release_leadership()
+
+    async def _acquire_leadership(self) -> bool:
+        """Try to take the advisory lock. The connection is held open for as long as we lead."""
+        conn = await engine.connect()
+        try:
+            result = await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": INGESTION_LEADER_LOCK_KEY})
+            acquired = bool(result.scalar())
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+
+        if not acquired:
+            await conn.close()
+            return False
+
+        self._leader_conn = conn
+        self._next_resync = datetime.min
+        print("Ingestion scheduler: acquired leader lock")
+        return True
+
+    async def _check_leadership(self) -> bool:
+        """The lock dies with its connection, so a broken connection means we are no longer leader."""
+        try:
+            await self._leader_conn.execute(text("SELECT 1"))
+            await self._leader_conn.commit()
+            return True
+        except Exception as e:
+            print(f"Ingestion scheduler: lost leader connection: {e}")
+            await self._release_leadership()
+            return False
+
+    async def _release_leadership(self):
+        if self._leader_conn is None:
+            return
+        try:
+            await self._leader_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": INGESTION_LEADER_LOCK_KEY})
+            await self._leader_conn.commit()
+        except Exception:
+            pass
+        finally:
+            try:
+                await self._leader_conn.close()
+            except Exception:
+                pass
+            self._leader_conn = None
+            self._heap = []
+
+    async def _resync(self):
+        async with async_session() as session:
+            locations = await get_locations_for_refresh(session)
+
+        self._heap = [(self._get_due_time(loc), str(loc.id)) for loc in locations if str(loc.id) not in self._in_flight]
+        heapq.heapify(self._heap)
+        self._next_resync = datetime.now() + timedelta(seconds=self.resync_interval_secs)
+
+    async def _run(self):
+        while True:
+            try:
+                if not self.is_leader and not await self._acquire_leadership():
+                    await asyncio.sleep(self.resync_interval_secs)
+                    continue
+
+                now = datetime.now()
+                if now >= self._next_resync:
+                    if not await self._check_leadership():
+                        continue
+                    await self._resync()
+
+                if now >= self._next_maintenance:
+                    self._next_maintenance = now + timedelta(minutes=self.maintenance_interval_mins)
+                    await run_partition_maintenance(settings.STORIES_RAW_PARTITION_DAYS_AHEAD, settings.STORIES_RAW_RETENTION_DAYS)
+                    await purge_expired_llm_responses()
+                    await purge_finished_generation_jobs(settings.GENERATION_JOB_RETENTION_DAYS)
+
+                if settings.CONTENT_EXTRACTION_ENABLED and now >= self._next_extraction and (self._extraction_task is None or self._extraction_task.done()):
+                    self._next_extraction = now + timedelta(seconds=settings.CONTENT_EXTRACTION_INTERVAL_SECS)
+                    # crawling takes a while, keep scheduling refreshes meanwhile
+                    self._extraction_task = asyncio.create_task(run_content_extraction(settings.CONTENT_EXTRACTION_BATCH_SIZE))
+
+                while self._heap and self._heap[0][0] <= now and len(self._in_flight) < self.max_concurrent_fetches:
+                    _, location_id = heapq.heappop(self._heap)
+                    self._in_flight.add(location_id)
+                    task = asyncio.create_task(self._refresh(location_id))
+                    self._refresh_tasks.add(task)
+                    task.add_done_callback(self._refresh_tasks.discard)
+
+                wake_at = self._next_resync
+                if self._heap and len(self._in_flight) < self.max_concurrent_fetches:
+                    wake_at = min(wake_at, self._heap[0][0])
+                await self._sleep_until(wake_at)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ingestion scheduler error: {e}")
+                traceback.print_exc()
+                await asyncio.sleep(self.resync_interval_secs)
+
+    async def _sleep_until(self, wake_at: datetime):
+        """Sleep until `wake_at`, or earlier if a refresh finished and freed a slot."""
+        self._wakeup.clear()
+        timeout = max((wake_at - datetime.now()).total_seconds(), 1)
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _get_due_time(self, location) -> datetime:
+        due_at = get_next_due_time(location)
+        failure = self._failures.get(str(location.id))
+        # last_fetched_timestamp did not move on a failed refresh, the backoff decides
+        return max(due_at, failure[1]) if failure else due_at
+
+    def _record_failure(self, location_id: str):
+        failures = self._failures.get(location_id, (0, None))[0] + 1
+        delay = min(self.retry_backoff_secs * 2 ** (failures - 1), self.max_retry_backoff_secs)
+        retry_at = datetime.now() + timedelta(seconds=delay)
+        self._failures[location_id] = (failures, retry_at)
+        heapq.heappush(self._heap, (retry_at, location_id))
+        print(f"Ingestion scheduler: retrying location {location_id} in {delay}s (failure {failures})")
+
+    async def _refresh(self, location_id: str):
+        try:
+            async with async_session() as session:
+                location = await session.get(Locations, location_id)
+            if location is None:
+                return
+
+            await refresh_location_stories_once(build_location_request(location), location.id)
+            self._failures.pop(location_id, None)
+
+            async with async_session() as session:
+                location = await session.get(Locations, location_id)
+            if location is not None:
+                heapq.heappush(self._heap, (get_next_due_time(location), location_id))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Ingestion scheduler: failed to refresh location {location_id}: {e}")
+            traceback.print_exc()
+            self._record_failure(location_id)
+        finally:
+            self._in_flight.discard(location_id)
+            self._wakeup.set()
+
+
+ingestion_scheduler = IngestionScheduler(
+    max_concurrent_fetches=settings.INGESTION_MAX_CONCURRENT_FETCHES,
+    resync_interval_secs=settings.INGESTION_RESYNC_INTERVAL_SECS,
+    maintenance_interval_mins=settings.PARTITION_MAINTENANCE_INTERVAL_MINS,
+    retry_backoff_secs=settings.INGESTION_RETRY_BACKOFF_SECS,
+    max_retry_backoff_secs=settings.INGESTION_MAX_RETRY_BACKOFF_SECS
+)
@@ -0,0 +1,261 @@
+import asyncio
+import time
+import httpx
+
+from src.config.settings import settings
+from src.utils.cache import CacheBackend, DiskCache, build_cache, make_cache_key
+from src.utils.singleflight import SingleFlight
+
+SERP_SEARCH_URL = "https://serpapi.com/search"
+SERP_ACCOUNT_URL = "https://serpapi.com/account.json"
+
+# substrings of SerpAPI error messages that mean the key cannot be used until its quota resets
+QUOTA_ERROR_MARKERS = ("run out of searches", "invalid api key")
+
+
+class SerpKeysExhaustedError(Exception):
+    pass
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class SerpKey:
+    def __init__(self, name: str, api_key: str, rate: float, burst: int):
+        self.name = name
+        self.api_key = api_key
+        self.bucket = TokenBucket(rate, burst)
+        self.requests = 0
+        self.errors = 0
+        self.quota_errors = 0
+        self.searches_left: int | None = None  # unknown until the account endpoint is read
+        self.cooldown_until = 0.0
+
+    @property
+    def is_available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "key": f"...{self.api_key[-4:]}",
+            "available": self.is_available,
+            "requests": self.requests,
+            "errors": self.errors,
+            "quota_errors": self.quota_errors,
+            "searches_left": self.searches_left,
+            "cooldown_secs": max(round(self.cooldown_until - time.monotonic()), 0),
+            "tokens": round(self.bucket.available(), 2)
+        }
+
+
+class SerpKeyPool:
+    """
+    Spreads SerpAPI searches over every configured key. Each key has its own token bucket,
+    and a key that answers with 429 or a quota error is benched for `cooldown_secs`
+    while the search is retried on the next key.
+
+    A key out of searches is benched for `exhausted_cooldown_secs` rather than for good:
+    quotas renew every month. It comes back earlier if the account endpoint reports
+    searches left, which is read whenever no key is available.
+    """
+
+    def __init__(self, keys: list[tuple[str, str]], rate: float, burst: int, cooldown_secs: int, exhausted_cooldown_secs: int = 21600, budget_refresh_secs: int = 600):
+        seen = set()
+        self.keys: list[SerpKey] = []
+        for name, api_key in keys:
+            if api_key and api_key not in seen:
+                seen.add(api_key)
+                self.keys.append(SerpKey(name, api_key, rate, burst))
+        self.cooldown_secs = cooldown_secs
+        self.exhausted_cooldown_secs = exhausted_cooldown_secs
+        self.budget_refresh_secs = budget_refresh_secs
+        self._budgets_refreshed_at = 0.0
+
+    def _pick_key(self, exclude: set[str]) -> SerpKey | None:
+        candidates = [key for key in self.keys if key.is_available and key.name not in exclude]
+        if not candidates:
+            return None
+        # prefer the key with the most tokens right now, then the one with the most quota left
+        return max(candidates, key=lambda key: (key.bucket.available(), key.searches_left or 0))
+
+    def _bench(self, key: SerpKey, reason: str, cooldown_secs: int | None = None):
+        cooldown_secs = cooldown_secs or self.cooldown_secs
+        key.cooldown_until = time.monotonic() + cooldown_secs
+        print(f"SerpAPI key {key.name} benched for {cooldown_secs}s: {reason}")
+
+    def _exhaust(self, key: SerpKey, reason: str):
+        key.searches_left = 0
+        self._bench(key, reason, self.exhausted_cooldown_secs)
+
+    async def search(self, client: httpx.AsyncClient, params: dict) -> dict:
+        tried: set[str] = set()
+        budgets_refreshed = False
+        while True:
+            key = self._pick_key(tried)
+            if key is None and not budgets_refreshed:
+                # a benched key may have had its quota renewed, throttled by budget_refresh_secs
+                budgets_refreshed = True
+                await self.refresh_budgets(client)
+                key = self._pick_key(tried)
+            if key is None:
+                raise SerpKeysExhaustedError("No SerpAPI key with remaining quota")
+            tried.add(key.name)
+
+            await key.bucket.acquire()
+            key.requests += 1
+            try:
+                response = await client.get(SERP_SEARCH_URL, params={**params, "api_key": key.api_key})
+                data = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                key.errors += 1
+                raise e
+
+            error = str(data.get("error", "")) if isinstance(data, dict) else ""
+            if response.status_code in (401, 429) or any(marker in error.lower() for marker in QUOTA_ERROR_MARKERS):
+                key.quota_errors += 1
+                if "run out of searches" in error.lower():
+                    self._exhaust(key, error)
+                else:
+                    self._bench(key, error or f"HTTP {response.status_code}")
+                continue
+
+            if response.status_code >= 400:
+                key.errors += 1
+                response.raise_for_status()
+
+            if key.searches_left == 0:
+                # the first search after an exhaustion bench went through, the quota was renewed
+                key.searches_left = None
+            elif key.searches_left:
+                key.searches_left -= 1
+                if key.searches_left == 0:
+                    self._exhaust(key, "used its last search")
+            return data
+
+    async def refresh_budgets(self, client: httpx.AsyncClient, force: bool = False):
+        """Read the remaining searches of every key from the SerpAPI account endpoint (free of charge)."""
+        if not force and time.monotonic() - self._budgets_refreshed_at < self.budget_refresh_secs:
+            return
+        self._budgets_refreshed_at = time.monotonic()
+
+        async def refresh(key: SerpKey):
+            try:
+                response = await client.get(SERP_ACCOUNT_URL, params={"api_key": key.api_key})
+                data = response.json()
+                if "total_searches_left" in data:
+                    searches_left = int(data["total_searches_left"])
+                    if searches_left == 0 and key.searches_left != 0:
+                        self._exhaust(key, "account reports no searches left")
+                    elif searches_left > 0 and key.searches_left == 0:
+                        # quota renewed, the bench was only for the exhaustion
+                        key.cooldown_until = 0.0
+                    key.searches_left = searches_left
+            except Exception as e:
+                print(f"Error reading SerpAPI account for key {key.name}: {e}")
+
+        await asyncio.gather(*(refresh(key) for key in self.keys))
+
+    def snapshot(self) -> list[dict]:
+        return [key.snapshot() for key in self.keys]
+
+
+serp_key_pool = SerpKeyPool(
+    keys=[
+        ("EXHAUSTED_SERP_API_KEY2", settings.EXHAUSTED_SERP_API_KEY2),
+        ("SERP_API_KEY", settings.SERP_API_KEY),
+        ("EXHAUSTED_SERP_API_KEY1", settings.EXHAUSTED_SERP_API_KEY1)
+    ],
+    rate=settings.SERP_KEY_REQUESTS_PER_SEC,
+    burst=settings.SERP_KEY_BURST,
+    cooldown_secs=settings.SERP_KEY_COOLDOWN_SECS,
+    exhausted_cooldown_secs=settings.SERP_KEY_EXHAUSTED_COOLDOWN_SECS
+)
+
+
+class SerpResponseCache:
+    """
+    Caches SerpAPI responses by their query params (never the api key) in front of the key pool.
+
+    Modes:
+      live   - serve from the cache while fresh, otherwise search and cache the response
+      record - always search, and also save every response to `recordings`
+      replay - only serve saved recordings, never touch the network. Unrecorded
+               queries return no results, which makes ingestion runs deterministic.
+    """
+
+    def __init__(self, pool: SerpKeyPool, cache: CacheBackend, recordings: CacheBackend, mode: str = "live"):
+        if mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unknown SerpAPI cache mode: {mode}")
+        self.pool = pool
+        self.cache = cache
+        self.recordings = recordings
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._searches = SingleFlight()
+
+    async def search(self, client: httpx.AsyncClient, params: dict, ttl_secs: int | None = None) -> dict:
+        key = make_cache_key("serpapi", {k: v for k, v in params.items() if k not in ("api_key", "no_cache")})
+
+        if self.mode == "replay":
+            data = await self.recordings.get(key)
+            if data is None:
+                self.misses += 1
+                print(f"No SerpAPI recording for {params}")
+                return {"organic_results": []}
+            self.hits += 1
+            return data
+
+        if self.mode == "live":
+            data = await self.cache.get(key)
+            if data is not None:
+                self.hits += 1
+                return data
+
+        self.misses += 1
+        # identical queries from concurrent refreshes share one search
+        return await self._searches.do(key, self._search, key, client, params, ttl_secs)
+
+    async def _search(self, key: str, client: httpx.AsyncClient, params: dict, ttl_secs: int | None) -> dict:
+        data = await self.pool.search(client, params)
+        if self.mode == "record":
+            await self.recordings.set(key, data)
+        await self.cache.set(key, data, ttl_secs)
+        return data
+
+    def snapshot(self) -> dict:
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
+
+
+serp_cache = SerpResponseCache(
+    serp_key_pool,
+    cache=build_cache(settings.SERP_CACHE_BACKEND, directory=settings.SERP_CACHE_DIR),
+    recordings=DiskCache(settings.SERP_RECORDINGS_DIR),
+    mode=settings.SERP_CACHE_MODE
+)
@@ -1,216 +1,57 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import and_, or_, update, select, func
+from sqlalchemy import and_, or_, update, select, func, text, tuple_, exists
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import DatabaseError, IntegrityError
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, aliased
 from datetime import datetime, timedelta, timezone
 import asyncio
-import httpx
+import base64
+import time
+import json
 import traceback
 from openai import OpenAIError
 from fastapi import Path, HTTPException, Depends, status
 from typing import Annotated
 from uuid import UUID
 
-from src.models import Locations, StoriesRaw, UserStories, UserStoriesQuestions, UserStoriesAnswers, UserStoryStatus, UserStoryPublishStatus, GeneratedUserStories, Users
-from src.config.database import get_session
-from src.schemas import LocationDataSchema, AnswerSchema, CreateStorySchema, UserStoryFullResponseSchema, EditGeneratedArticleSchema, CreateStoryResponseSchema, GeneratedStoryResponseSchema
-from src.stories.utils import SCOPE_CONFIG, generate_hash, get_word_length_range, generate_ai_questions,generate_user_story, sluggify, generate_manual_story_metadata
+from src.models import Locations, StoriesRaw, StoriesRawLinkHashes, UserStories, UserStoriesQuestions, UserStoriesAnswers, UserStoryStatus, UserStoryPublishStatus, GeneratedUserStories, Users
+from src.config.database import get_session, async_session, advisory_lock
+from src.config.settings import settings
+from src.schemas import Location, LocationDataSchema, MultiScopeFeedSchema, AnswerSchema, CreateStorySchema, UserStoryFullResponseSchema, EditGeneratedArticleSchema, CreateStoryResponseSchema, GeneratedStoryResponseSchema
+from src.stories.utils import SCOPE_CONFIG, needs_fetching, fetch_news_articles, generate_hash, get_word_length_range, generate_ai_questions,generate_user_story, sluggify, generate_manual_story_metadata, build_user_story_messages, stream_user_story_completion, finalize_generated_article
+from src.stories.dedup import assign_story_clusters
+from src.stories.geo import assign_geo_relevance
+from src.stories.hot_feed import hot_feeds, HotFeedBuffer, HotFeedEntry, get_window_cutoff
+from src.stories.metrics import STORIES_RECEIVED, STORIES_INSERTED, STORIES_DUPLICATE, INSERT_SECONDS
 from src.auth.dependencies import role_checker
 from src.aws.utils import get_full_s3_object_url, get_images_with_urls
 from src.utils.query import get_article_images_json_query, get_profile_image_expression
+from src.utils.singleflight import SingleFlight
+from src.utils.language import detect_language
+from src.utils.links import generate_link_hash
+from src.utils.json_stream import IncrementalJSONObjectParser
+from src.config.llm_scheduler import set_llm_caller
 
 refresh_interval_map = {"city": 60, "state": 40, "country": 30, "world": 15}
 
-async def get_levels_to_fetch(session: AsyncSession, location: LocationDataSchema):
-    query = select(Locations).filter(
-        or_(
-            and_(
-                Locations.city == location.city,
-                Locations.state == location.state,
-                Locations.country == location.country,
-                Locations.level == 'city'
-            ),
-            and_(
-                Locations.state == location.state,
-                Locations.country == location.country,
-                Locations.level == 'state'
-            ),
-            and_(
-                Locations.country == location.country,
-                Locations.level == 'country'
-            ),
-            Locations.level == 'world'
-        )
-    )
-    results = await session.execute(query)
-    locations_db = results.scalars().all()
-    locations_by_level = {loc.level: loc for loc in locations_db}
-
-    locations_to_fetch = []
-
-    for lev in ["city", "state", "country", "world"]:
-        if lev in locations_by_level:
-            loc = locations_by_level[lev]
-            if not await is_location_fresh(loc):
-                locations_to_fetch.append({
-                    "location": loc,
-                    "level": lev,
-                    "exists": True
-                })
-        else:
-            location_mapping = {
-                "city": {
-                    "city": location.city,
-                    "state": location.state,
-                    "country": location.country
-                },
-                "state": {
-                    "state": location.state,
-                    "country": location.country
-                },
-                "country": {
-                    "country": location.country
-                },
-                "world": "world"
-            }
-            
-            locations_to_fetch.append({
-                "level": lev,
-                "exists": False,
-                "location": location_mapping[lev]
-            })
-
-    return locations_to_fetch
-
-    
-async def is_location_fresh(location: Locations):
-    now = datetime.now()
-    # return now - datetime.strptime(location.last_fetched_timestamp, "%Y-%m-%d %H:%M:%S") < timedelta(minutes=location.refresh_interval_mins)
-    return now - location.last_fetched_timestamp < timedelta(minutes=location.refresh_interval_mins)
-
-
-async def fetch_for_locations(session: AsyncSession, locations_to_fetch: list[dict]):
-    # create location records
-    # locations_to_add = [loc for loc in locations_to_fetch if not loc['exists']]
-    locations_to_add = []
-    locations_to_refetch = []
-    for loc in locations_to_fetch:
-        if loc['exists']:
-            locations_to_refetch.append(loc['location'])
-        else:
-            locations_to_add.append(loc)
-
-    added_locations_db = await store_location_records(session, locations_to_add)
-
-    # add the already existing location objects
-    added_locations_db.extend(locations_to_refetch)
-    fetch_tasks = [fetch_and_store_news_stories(loc) for loc in added_locations_db]
-    res = await asyncio.gather(*fetch_tasks)
-
-
-
-
-
-    
-
-async def store_location_records(session: AsyncSession, locations_to_add: list[dict]):
-    
-    max_days_back_map = {"city": 4, "state": 3, "country": 2, "world": 1}
-
-    locations_to_add = [ {"city": loc['location'].get('city'), "state": loc['location'].get('state'), "country": loc['location'].get('country'), "level": loc['level'], "refresh_interval_mins": refresh_interval_map.get(loc['level']), "max_days_back": max_days_back_map.get(loc['level'])} for loc in locations_to_add ]
-
-    query = insert(Locations).values(locations_to_add).returning(Locations.id, Locations.level, Locations.city, Locations.state, Locations.country, Locations.max_days_back, Locations.refresh_interval_mins)
-    try:
-        result = await session.execute(query)
-        await session.commit()
-    except DatabaseError as e:
-        await session.rollback()
-        print(f"Error occurred while storing location records: {e}")
-
-    return result.scalars().all() or locations_to_add
-
-
-# async def fetch_and_store_news_stories(location: Locations):
-#     async with httpx.AsyncClient() as client:
-#         response = await client.get(f"https://serpapi.com/search?engine=bing_news&cc={location.country_code}&qft=%22sortbydate%3D%221%22%22")
-
-def parse_bing_date(date_str: str) -> datetime:
-    """Convert Bing's date string (e.g. '4d', '2h', '30m') into an absolute datetime."""
-    now = datetime.now(timezone.utc)
-    if date_str.endswith("d"):
-        return now - timedelta(days=int(date_str[:-1]))
-    elif date_str.endswith("h"):
-        return now - timedelta(hours=int(date_str[:-1]))
-    elif date_str.endswith("m"):
-        return now - timedelta(minutes=int(date_str[:-1]))
-    return now  # fallback if unknown format
-
-async def fetch_and_store_news_stories(location):
-    news_records = []
-    now = datetime.now(timezone.utc)
-
-    page_size = 10   # number of results per page
-    offset = 0       # pagination offset
-    keep_fetching = True
-
-    async with httpx.AsyncClient() as client:
-        while keep_fetching:
-            response = await client.get(
-                "https://serpapi.com/search",
-                params={
-                    "engine": "bing_news",
-                    "cc": location.country_code,
-                    "qft": '"sortbydate="1""',
-                    "count": page_size,
-                    "first": offset,
-                },
-            )
-            data = response.json()
-            results = data.get("organic_results", [])
-
-            if not results:
-                break  # no more results
-
-            for story in results:
-                story_time = parse_bing_date(story.get("date", "0d"))
-
-                if location.last_fetched_timestamp is None:
-                    # Initial fetch: stop when stories are older than max_days_back
-                    if story_time >= now - timedelta(days=location.max_days_back):
-                        news_records.append(story)
-                    else:
-                        keep_fetching = False
-                        break
-                else:
-                    # Refresh fetch: only include stories newer than last fetch but within refresh interval
-                    refresh_cutoff = location.last_fetched_timestamp + timedelta(
-                        minutes=location.refresh_interval_mins
-                    )
-                    if location.last_fetched_timestamp < story_time <= refresh_cutoff:
-                        news_records.append(story)
-                    elif story_time <= location.last_fetched_timestamp:
-                        keep_fetching = False
-                        break
+LOCATION_STATUS_COLUMNS = (Locations.id, Locations.level, Locations.last_fetched_timestamp, Locations.refresh_interval_mins, Locations.max_days_back)
 
-            offset += page_size  # move to next page
+def get_location_conditions(request: LocationDataSchema) -> tuple:
+    scope = request.scope
+    if scope == 'INTERNATIONAL':
+        return (Locations.level == 'INTERNATIONAL',)
 
-    return news_records
+    location = request.location
+    where_condition = {
+        'CITY': (Locations.city == location.city, Locations.state == location.state, Locations.country_code == request.country_code, Locations.level == request.scope),
+        'STATE': (Locations.city.is_(None) , Locations.state == location.state, Locations.country_code == request.country_code, Locations.level == request.scope),
+        'COUNTRY': (Locations.city.is_(None), Locations.state.is_(None), Locations.country_code == request.country_code, Locations.level == request.scope)
+    }
+    return where_condition.get(scope)
 
 async def get_location_status(session: AsyncSession, request: LocationDataSchema):
     try:
-        columns = (Locations.id, Locations.last_fetched_timestamp, Locations.refresh_interval_mins, Locations.max_days_back)
-        scope = request.scope
-        if scope == 'INTERNATIONAL':
-            query = select(*columns).filter(Locations.level == 'INTERNATIONAL')
-        else:
-            location = request.location
-            where_condition = {
-                'CITY': (Locations.city == location.city, Locations.state == location.state, Locations.country_code == request.country_code, Locations.level == request.scope),
-                'STATE': (Locations.city.is_(None) , Locations.state == location.state, Locations.country_code == request.country_code, Locations.level == request.scope),
-                'COUNTRY': (Locations.city.is_(None), Locations.state.is_(None), Locations.country_code == request.country_code, Locations.level == request.scope)
-            }
-            query = select(*columns).filter(*where_condition.get(scope))
+        query = select(*LOCATION_STATUS_COLUMNS).filter(*get_location_conditions(request))
         result = await session.execute(query)
         return result.first()
     except Exception as e:
@@ -322,43 +163,291 @@ async def update_location_timestamp(session: AsyncSession, location_id: str):
         traceback.print_exc()
         return True
 
-async def add_stories_to_db(session: AsyncSession, news_records: list[dict], location_id: str):
-    if not news_records:
-        return []
+async def get_locations_for_refresh(session: AsyncSession):
+    result = await session.execute(
+        select(Locations.id, Locations.level, Locations.last_fetched_timestamp, Locations.refresh_interval_mins)
+    )
+    return result.all()
+
+def build_location_request(location: Locations) -> LocationDataSchema:
+    """Rebuild the feed request a client would send for a stored location row."""
+    level = location.level
+    if level == 'INTERNATIONAL':
+        return LocationDataSchema(scope=level, query='WORLD')
+
+    query = {'CITY': location.city, 'STATE': location.state, 'COUNTRY': location.country}.get(level)
+    return LocationDataSchema(
+        scope=level,
+        query=query,
+        country_code=location.country_code,
+        location=Location(city=location.city, state=location.state, country=location.country)
+    )
+
+async def refresh_location_stories(session: AsyncSession, request: LocationDataSchema, location_id: str, since_timestamp: datetime | None = None):
+    news_articles = await fetch_news_articles(request, since_timestamp=since_timestamp)
+    await update_location_timestamp(session, location_id)
+
+    if news_articles:
+        await add_stories_to_db(session, news_articles, location_id)
+    return news_articles
+
+location_refreshes = SingleFlight()
+
+def get_location_key(request: LocationDataSchema) -> tuple:
+    return (request.scope, request.query, request.country_code)
+
+async def refresh_location_stories_once(request: LocationDataSchema, location_id: str):
+    """
+    Refresh a location at most once for a burst of identical requests.
+    Callers in this worker share one task, other workers wait on the advisory lock
+    and then skip the fetch because the location is fresh again.
+    """
+    return await location_refreshes.do(get_location_key(request), _refresh_location_locked, request, location_id)
+
+async def _refresh_location_locked(request: LocationDataSchema, location_id: str):
+    async with advisory_lock(f"location:{location_id}"):
+        async with async_session() as session:
+            result = await session.execute(select(Locations.last_fetched_timestamp, Locations.refresh_interval_mins, Locations.level).filter(Locations.id == location_id))
+            location_db = result.first()
+            if not location_db:
+                return []
+            # another worker may have refreshed it while we were waiting for the lock
+            if location_db.last_fetched_timestamp and not needs_fetching(location_db):
+                return []
+            return await refresh_location_stories(session, request, location_id, since_timestamp=location_db.last_fetched_timestamp)
+
+async def bootstrap_location_once(request: LocationDataSchema):
+    """Create a location seen for the first time and do its initial fetch, once across workers."""
+    return await location_refreshes.do(("bootstrap", *get_location_key(request)), _bootstrap_location_locked, request)
+
+async def _bootstrap_location_locked(request: LocationDataSchema):
+    lock_key = "location:" + ":".join(str(part) for part in get_location_key(request))
+    async with advisory_lock(lock_key):
+        async with async_session() as session:
+            location_db = await get_location_status(session, request)
+            if location_db:
+                return location_db.id
+
+            news_articles = await fetch_news_articles(request)
+            added_location = await add_location_record(session, request)
+            if not added_location:
+                raise ValueError(f"could not create location for {request.scope} {request.query}")
+            await add_stories_to_db(session, news_articles, added_location.id)
+            return added_location.id
+
+def build_scope_requests(request: MultiScopeFeedSchema) -> dict[str, LocationDataSchema]:
+    """The per-tab feed request the aggregator UI would send for each scope."""
+    location = request.location
+    queries = {
+        'CITY': location.city if location else None,
+        'STATE': location.state if location else None,
+        'COUNTRY': location.country if location else None,
+    }
+
+    scope_requests = {}
+    for scope in request.scopes:
+        if scope == 'INTERNATIONAL':
+            scope_requests[scope] = LocationDataSchema(scope=scope, query='WORLD')
+        elif queries.get(scope):
+            scope_requests[scope] = LocationDataSchema(
+                scope=scope,
+                query=queries[scope],
+                country_code=request.country_code,
+                location=Location(
+                    city=location.city if scope == 'CITY' else None,
+                    state=location.state if scope in ('CITY', 'STATE') else None,
+                    country=location.country
+                )
+            )
+    return scope_requests
 
+async def get_locations_for_scopes(session: AsyncSession, scope_requests: dict[str, LocationDataSchema]) -> dict:
+    """Look up the Locations row of every scope in a single query."""
+    if not scope_requests:
+        return {}
+
+    query = select(*LOCATION_STATUS_COLUMNS).filter(
+        or_(*(and_(*get_location_conditions(scope_request)) for scope_request in scope_requests.values()))
+    )
+    result = await session.execute(query)
+    return {row.level: row for row in result.all()}
+
+async def ensure_scope_location(scope_request: LocationDataSchema, location_db):
+    if not location_db:
+        return await bootstrap_location_once(scope_request)
+
+    # known locations are kept fresh by the background ingestion scheduler
+    if not settings.INGESTION_SCHEDULER_ENABLED and needs_fetching(location_db):
+        await refresh_location_stories_once(scope_request, location_db.id)
+    return location_db.id
+
+async def get_multi_scope_feed(session: AsyncSession, request: MultiScopeFeedSchema) -> dict:
+    """
+    Feed of every requested scope in one call. New and stale locations are fetched concurrently,
+    a scope that fails comes back empty with an error instead of failing the others.
+    """
+    scope_requests = build_scope_requests(request)
+    locations_by_scope = await get_locations_for_scopes(session, scope_requests)
+
+    location_ids = await asyncio.gather(
+        *(ensure_scope_location(scope_request, locations_by_scope.get(scope)) for scope, scope_request in scope_requests.items()),
+        return_exceptions=True
+    )
+
+    feed = {}
+    for scope, location_id in zip(scope_requests, location_ids):
+        if isinstance(location_id, Exception):
+            print(f"Error resolving {scope} feed: {location_id}")
+            feed[scope] = {'stories': [], 'count': 0, 'error': f"could not load {scope.lower()} stories"}
+            continue
+
+        stories = await fetch_stories_from_db(session, location_id)
+        feed[scope] = {'stories': stories, 'count': len(stories)}
+    return feed
+
+# Batches at least this large are COPYed into a temp table and merged instead of
+# being sent as one multi-row INSERT (which also runs into the bind parameter limit).
+COPY_MERGE_THRESHOLD = 500
+
+STORIES_RAW_INSERT_COLUMNS = ("title", "snippet", "thumbnail", "link", "link_hash", "simhash", "cluster_id", "geo_score", "matched_places", "language", "published_timestamp", "source", "location_id")
+
+async def copy_merge_stories(session: AsyncSession, stories_to_insert: list[dict]):
+    """COPY the batch into a transaction-scoped staging table, then merge only the new links into stories_raw."""
+    await session.execute(text("""
+        CREATE TEMP TABLE stories_raw_staging (
+            title TEXT,
+            snippet TEXT,
+            thumbnail VARCHAR(300),
+            link VARCHAR(500),
+            link_hash VARCHAR(64),
+            simhash BIGINT,
+            cluster_id UUID,
+            geo_score DOUBLE PRECISION,
+            matched_places VARCHAR(100)[],
+            language VARCHAR(5),
+            published_timestamp TIMESTAMP,
+            source VARCHAR(100),
+            location_id UUID
+        ) ON COMMIT DROP
+    """))
+
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        "stories_raw_staging",
+        records=[tuple(story[column] for column in STORIES_RAW_INSERT_COLUMNS) for story in stories_to_insert],
+        columns=STORIES_RAW_INSERT_COLUMNS
+    )
+
+    columns = ", ".join(STORIES_RAW_INSERT_COLUMNS)
+    result = await session.execute(text(f"""
+        WITH claimed AS (
+            INSERT INTO stories_raw_link_hashes (location_id, link_hash, published_timestamp)
+            SELECT location_id, link_hash, published_timestamp FROM stories_raw_staging WHERE link_hash IS NOT NULL
+            ON CONFLICT (location_id, link_hash) DO NOTHING
+            RETURNING location_id, link_hash
+        )
+        INSERT INTO stories_raw ({columns})
+        SELECT {columns} FROM stories_raw_staging
+        WHERE link_hash IS NULL OR (location_id, link_hash) IN (SELECT location_id, link_hash FROM claimed)
+        RETURNING id, title, snippet, link, source, published_timestamp, thumbnail, location_id, cluster_id, language
+    """))
+    return result.fetchall()
+
+def build_story_rows(news_records: list[dict], location_id: str) -> list[dict]:
+    """stories_raw rows for fetched articles, dropping repeated links within the batch."""
     stories_to_insert = []
+    seen_link_hashes = set()
     for article in news_records:
+        link_hash = generate_link_hash(article.get("link"))
+        if link_hash and link_hash in seen_link_hashes:
+            continue
+        seen_link_hashes.add(link_hash)
+
         story_data = {
             "title": article.get("title"),
             "snippet": article.get("snippet"),
             "link": article.get("link"),
+            "link_hash": link_hash,
             "source": article.get("source"),
-            "published_timestamp": article.get("date"),
+            # partition key, cannot be NULL
+            "published_timestamp": article.get("date") or datetime.now(),
             "thumbnail": article.get("thumbnail"),
+            "language": detect_language(article.get("title"), article.get("snippet")),
             "location_id": location_id,
         }
         stories_to_insert.append(story_data)
+    return stories_to_insert
 
+async def add_stories_to_db(session: AsyncSession, news_records: list[dict], location_id: str):
+    """
+    Insert fetched stories, skipping any article whose normalized link is already stored for the location.
+    Returns only the rows that were actually inserted.
+    """
+    if not news_records:
+        return []
+
+    started = time.perf_counter()
+    stories_to_insert = build_story_rows(news_records, location_id)
+    path = "copy" if len(stories_to_insert) >= COPY_MERGE_THRESHOLD else "insert"
+    STORIES_RECEIVED.inc(len(news_records), path=path)
+    STORIES_DUPLICATE.inc(len(news_records) - len(stories_to_insert), path=path, reason="batch")
+    await assign_story_clusters(stories_to_insert)
+    await assign_geo_relevance(session, stories_to_insert, location_id)
+
+    candidates = len(stories_to_insert)
     try:
-        stmt = (
-            insert(StoriesRaw)
-            .values(stories_to_insert)   # ✅ pass list here, not into execute()
-            .returning(
-                StoriesRaw.id,
-                StoriesRaw.title,
-                StoriesRaw.snippet,
-                StoriesRaw.link,
-                StoriesRaw.source,
-                StoriesRaw.published_timestamp,
-                StoriesRaw.thumbnail,
-                StoriesRaw.location_id,
+        if path == "copy":
+            rows = await copy_merge_stories(session, stories_to_insert)
+        else:
+            # claim the link hashes first, only stories whose hash was not stored yet get inserted
+            link_hashes = [
+                {"location_id": story["location_id"], "link_hash": story["link_hash"], "published_timestamp": story["published_timestamp"]}
+                for story in stories_to_insert if story["link_hash"]
+            ]
+            claimed = set()
+            if link_hashes:
+                result = await session.execute(
+                    insert(StoriesRawLinkHashes)
+                    .values(link_hashes)
+                    .on_conflict_do_nothing(index_elements=["location_id", "link_hash"])
+                    # one location per batch, the hash alone identifies the claim
+                    .returning(StoriesRawLinkHashes.link_hash)
+                )
+                claimed = set(result.scalars().all())
+
+            stories_to_insert = [story for story in stories_to_insert if story["link_hash"] is None or story["link_hash"] in claimed]
+            if not stories_to_insert:
+                await session.commit()
+                STORIES_DUPLICATE.inc(candidates, path=path, reason="stored")
+                INSERT_SECONDS.observe(time.perf_counter() - started, path=path)
+                return []
+
+            stmt = (
+                insert(StoriesRaw)
+                .values(stories_to_insert)
+                .returning(
+                    StoriesRaw.id,
+                    StoriesRaw.title,
+                    StoriesRaw.snippet,
+                    StoriesRaw.link,
+                    StoriesRaw.source,
+                    StoriesRaw.published_timestamp,
+                    StoriesRaw.thumbnail,
+                    StoriesRaw.location_id,
+                    StoriesRaw.cluster_id,
+                    StoriesRaw.language,
+                )
             )
-        )
 
-        result = await session.execute(stmt)
-        rows: list[Row] = result.fetchall()
+            result = await session.execute(stmt)
+            rows: list[Row] = result.fetchall()
 
         await session.commit()
+        STORIES_INSERTED.inc(len(rows), path=path)
+        STORIES_DUPLICATE.inc(candidates - len(rows), path=path, reason="stored")
+        INSERT_SECONDS.observe(time.perf_counter() - started, path=path)
+        await publish_hot_feed_rows(session, location_id, rows)
 
         # Sort by timestamp DESC
         sorted_rows = sorted(
@@ -393,23 +482,55 @@ async def add_stories_to_db(session: AsyncSession, news_records: list[dict], loc
 # from sqlalchemy.ext.asyncio import AsyncSession
 # from datetime import datetime, timedelta
 
-async def fetch_stories_from_db(session: AsyncSession, location_id: str):
-    try:
-        result = await session.execute(select(Locations.max_days_back).filter(Locations.id == location_id))
-        max_days_back = result.scalar_one_or_none()
+async def get_feed_window(session: AsyncSession, location_id: str) -> tuple[int | None, datetime]:
+    """The location's max_days_back and the feed cutoff it gives."""
+    result = await session.execute(select(Locations.max_days_back).filter(Locations.id == location_id))
+    max_days_back = result.scalar_one_or_none()
+    return max_days_back, get_window_cutoff(max_days_back)
+
+async def get_feed_cutoff(session: AsyncSession, location_id: str) -> datetime:
+    _, cutoff_datetime = await get_feed_window(session, location_id)
+    return cutoff_datetime
 
-        cutoff_datetime = datetime.now() - timedelta(days=max_days_back+1 if max_days_back is not None else 2)
+async def fetch_stories_from_db(session: AsyncSession, location_id: str, collapse_duplicates: bool = True, min_relevance: float | None = None, sort: str = 'latest', language: str | None = None):
+    """
+    Recent stories for a location, newest first or most relevant first with sort='relevance'.
+    Near-duplicates are collapsed to the newest story of each cluster.
+    """
+    try:
+        cutoff_datetime = await get_feed_cutoff(session, location_id)
 
         stmt = (
             select(StoriesRaw)
             .join(Locations)
             .where(Locations.id == location_id)
             .where(StoriesRaw.published_timestamp >= cutoff_datetime)
-            .order_by(StoriesRaw.published_timestamp.desc())
         )
+        if min_relevance is not None:
+            stmt = stmt.where(StoriesRaw.geo_score >= min_relevance)
+        if language is not None:
+            stmt = stmt.where(StoriesRaw.language == language)
+        if sort == 'relevance' and not collapse_duplicates:
+            stmt = stmt.order_by(StoriesRaw.geo_score.desc().nulls_last(), StoriesRaw.published_timestamp.desc())
+        else:
+            stmt = stmt.order_by(StoriesRaw.published_timestamp.desc())
 
         result = await session.execute(stmt)
         stories = result.scalars().all()
+
+        if collapse_duplicates:
+            seen_clusters = set()
+            representatives = []
+            for story in stories:
+                if story.cluster_id is not None:
+                    if story.cluster_id in seen_clusters:
+                        continue
+                    seen_clusters.add(story.cluster_id)
+                representatives.append(story)
+            stories = representatives
+            if sort == 'relevance':
+                # collapsing needs newest first, the representatives are ranked afterwards
+                stories.sort(key=lambda story: -story.geo_score if story.geo_score is not None else 1)
         
         return [{
             "id": story.id,
@@ -418,7 +539,8 @@ async def fetch_stories_from_db(session: AsyncSession, location_id: str):
             "link": story.link, 
             "source": story.source, 
             "date": str(story.published_timestamp.replace(microsecond=0)), 
-            "thumbnail": story.thumbnail
+            "thumbnail": story.thumbnail,
+            "language": story.language
         } for story in stories]
 
     except Exception as e:
@@ -426,7 +548,179 @@ async def fetch_stories_from_db(session: AsyncSession, location_id: str):
         traceback.print_exc()
         return []
 
-        
+
+def encode_feed_cursor(published_timestamp: datetime, story_id) -> str:
+    payload = json.dumps([published_timestamp.isoformat(), str(story_id)])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_feed_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        published_timestamp, story_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(published_timestamp), UUID(story_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def build_feed_query(location_id: str, cutoff_datetime: datetime, after: tuple[datetime, UUID] | None = None, collapse_duplicates: bool = True, min_relevance: float | None = None, language: str | None = None):
+    """
+    Stories of a location newer than the cutoff, ordered by (published_timestamp, id) DESC so
+    the order is total and a page can resume right after the last row of the previous one.
+    """
+    stmt = (
+        select(
+            StoriesRaw.id,
+            StoriesRaw.title,
+            StoriesRaw.snippet,
+            StoriesRaw.link,
+            StoriesRaw.source,
+            StoriesRaw.published_timestamp,
+            StoriesRaw.thumbnail,
+            StoriesRaw.cluster_id,
+            StoriesRaw.language
+        )
+        .where(StoriesRaw.location_id == location_id)
+        .where(StoriesRaw.published_timestamp >= cutoff_datetime)
+        .order_by(StoriesRaw.published_timestamp.desc(), StoriesRaw.id.desc())
+    )
+
+    if after is not None:
+        stmt = stmt.where(tuple_(StoriesRaw.published_timestamp, StoriesRaw.id) < tuple_(*after))
+
+    if min_relevance is not None:
+        stmt = stmt.where(StoriesRaw.geo_score >= min_relevance)
+
+    if language is not None:
+        stmt = stmt.where(StoriesRaw.language == language)
+
+    if collapse_duplicates:
+        # the newest story of a cluster represents it, so a page never needs to know about earlier pages
+        newer = aliased(StoriesRaw)
+        newer_conditions = [
+            newer.cluster_id == StoriesRaw.cluster_id,
+            newer.location_id == StoriesRaw.location_id,
+            newer.published_timestamp >= cutoff_datetime,
+            tuple_(newer.published_timestamp, newer.id) > tuple_(StoriesRaw.published_timestamp, StoriesRaw.id)
+        ]
+        if language is not None:
+            # a newer copy in another language is not in this feed, it cannot represent the cluster
+            newer_conditions.append(newer.language == StoriesRaw.language)
+        if min_relevance is not None:
+            # nor is a newer copy below the relevance threshold
+            newer_conditions.append(newer.geo_score >= min_relevance)
+        stmt = stmt.where(or_(StoriesRaw.cluster_id.is_(None), ~exists().where(*newer_conditions)))
+
+    return stmt
+
+def feed_row_to_dict(row) -> dict:
+    return {
+        "id": str(row.id),
+        "title": row.title,
+        "snippet": row.snippet,
+        "link": row.link,
+        "source": row.source,
+        "date": str(row.published_timestamp.replace(microsecond=0)),
+        "thumbnail": row.thumbnail,
+        "language": row.language
+    }
+
+def encode_hot_feed_entry(row) -> HotFeedEntry:
+    return HotFeedEntry(
+        published_timestamp=row.published_timestamp,
+        id=row.id,
+        cluster_id=row.cluster_id,
+        encoded=json.dumps(feed_row_to_dict(row), ensure_ascii=False).encode("utf-8")
+    )
+
+async def publish_hot_feed_rows(session: AsyncSession, location_id: str, rows):
+    """Push newly inserted stories into this worker's hot feed and tell the other workers to drop theirs."""
+    if not rows or not settings.HOT_FEED_ENABLED:
+        return
+    hot_feeds.add(location_id, [encode_hot_feed_entry(row) for row in rows])
+    try:
+        await hot_feeds.notify(session, location_id)
+    except Exception as e:
+        print(f"Error notifying hot feed invalidation for {location_id}: {e}")
+
+async def get_hot_feed(session: AsyncSession, location_id: str) -> HotFeedBuffer | None:
+    if not settings.HOT_FEED_ENABLED:
+        return None
+
+    buffer = hot_feeds.get(location_id)
+    if buffer is not None:
+        return buffer
+
+    generation = hot_feeds.get_generation(location_id)
+    # the buffer keeps max_days_back to slide its cutoff forward as it ages
+    max_days_back, cutoff_datetime = await get_feed_window(session, location_id)
+
+    # one extra row tells whether the whole window fits in the buffer
+    result = await session.execute(build_feed_query(location_id, cutoff_datetime).limit(hot_feeds.size + 1))
+    entries = [encode_hot_feed_entry(row) for row in result.all()]
+    return hot_feeds.set(location_id, entries, max_days_back, complete=len(entries) <= hot_feeds.size, generation=generation)
+
+async def fetch_stories_json(session: AsyncSession, location_id: str) -> bytes | None:
+    """The whole feed as pre-encoded JSON from the hot feed, or None when it does not fit in the buffer."""
+    buffer = await get_hot_feed(session, location_id)
+    if buffer is None or not buffer.complete:
+        return None
+
+    entries = buffer.get_entries()
+    return b'{"stories":[' + b",".join(entry.encoded for entry in entries) + b'],"count":' + str(len(entries)).encode() + b"}"
+
+async def fetch_stories_page_json(session: AsyncSession, location_id: str, limit: int) -> bytes | None:
+    """First page of the feed from the hot feed, or None when the buffer cannot answer it."""
+    buffer = await get_hot_feed(session, location_id)
+    if buffer is None:
+        return None
+
+    entries = buffer.get_entries()
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_feed_cursor(entries[-1].published_timestamp, entries[-1].id)
+    elif buffer.complete:
+        next_cursor = None
+    else:
+        return None
+
+    return (
+        b'{"stories":[' + b",".join(entry.encoded for entry in entries) + b'],"count":' + str(len(entries)).encode()
+        + b',"next_cursor":' + json.dumps(next_cursor).encode() + b"}"
+    )
+
+async def fetch_stories_page(session: AsyncSession, location_id: str, limit: int, cursor: str | None = None, min_relevance: float | None = None, language: str | None = None):
+    after = decode_feed_cursor(cursor) if cursor else None
+    cutoff_datetime = await get_feed_cutoff(session, location_id)
+
+    # one extra row tells whether there is a next page
+    result = await session.execute(build_feed_query(location_id, cutoff_datetime, after, min_relevance=min_relevance, language=language).limit(limit + 1))
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_feed_cursor(rows[-1].published_timestamp, rows[-1].id)
+
+    stories = [feed_row_to_dict(row) for row in rows]
+    return {
+        'stories': stories,
+        'count': len(stories),
+        'next_cursor': next_cursor
+    }
+
+FEED_STREAM_BATCH_SIZE = 200
+
+async def stream_stories_ndjson(location_id: str, cursor: str | None = None, min_relevance: float | None = None, language: str | None = None):
+    """
+    Yield the feed as newline delimited JSON, straight from a server-side cursor.
+    Uses its own session because the response body is sent after the request's session is closed.
+    """
+    after = decode_feed_cursor(cursor) if cursor else None
+    async with async_session() as session:
+        cutoff_datetime = await get_feed_cutoff(session, location_id)
+        stmt = build_feed_query(location_id, cutoff_datetime, after, min_relevance=min_relevance, language=language).execution_options(yield_per=FEED_STREAM_BATCH_SIZE)
+        result = await session.stream(stmt)
+        async for row in result:
+            yield json.dumps(feed_row_to_dict(row), ensure_ascii=False) + "\n"
+
 async def get_story_by_id(session: AsyncSession, story_id: str):
     try:
         result = await session.execute(select(StoriesRaw.id, StoriesRaw.title, StoriesRaw.snippet, StoriesRaw.link).filter(StoriesRaw.id == story_id))
@@ -650,6 +944,8 @@ async def get_user_story_or_404(session: Annotated[AsyncSession, Depends(get_ses
             detail=f"story {user_story.id} does not belong to the creator {curr_creator.id}"
         ) 
 
+    # async, so the caller is still set in the endpoint: LLM calls for this story queue as its creator
+    set_llm_caller("stories", curr_creator.id)
     return user_story
     
 async def get_user_story_questions_db(session: AsyncSession, user_story_id: str):
@@ -675,7 +971,7 @@ async def generate_and_store_story_questions(session: AsyncSession, user_story:
         return existing_questions
 
     try:
-        questions = await generate_ai_questions(user_story)
+        questions = await generate_ai_questions(user_story, bypass_cache=force_regenerate)
         if not questions:
             raise HTTPException(status_code=500, detail="Error while parsing questions or no questions returned")
     except OpenAIError as e:
@@ -925,7 +1221,7 @@ async def get_generated_user_story(
         title = existing_article.title
         full_text = existing_article.full_text
         
-        generated = await generate_manual_story_metadata(full_text, title)
+        generated = await generate_manual_story_metadata(full_text, title, bypass_cache=force_regenerate)
         
         # print(f"Generated manual story: {generated}")
     else:
@@ -948,6 +1244,82 @@ async def get_generated_user_story(
 
     # return {"msg": "hello"}
 
+# string fields forwarded to the client as they are written, the rest arrive whole
+STREAMED_ARTICLE_FIELDS = ("title", "english_title", "snippet", "full_text")
+
+def sse_event(event: str, data) -> dict:
+    return {"event": event, "data": json.dumps(data, ensure_ascii=False, default=str)}
+
+async def stream_generated_user_story(session: AsyncSession, user_story: UserStories, force_regenerate: bool = False):
+    """
+    Streaming variant of get_generated_user_story for AI mode. Validates up front, so errors are
+    still plain HTTP errors, then returns an async generator of SSE events:
+      delta   - {"field", "text"}: more text of title, english_title, snippet or full_text
+      field   - {"field", "value"}: a field of the article is complete. A story that already has
+                a title keeps it: its `title` field is sent first and no title is streamed.
+      article - the stored article, once the completion ended and was saved
+      error   - {"detail"}: generation or storing failed, nothing was saved
+    A stored article that needs no regeneration, and manual mode, are sent as a single `article` event.
+    """
+    user_story_id = user_story.id
+    creator_id = user_story.author_id
+
+    existing_article = await get_generated_story_db(session, user_story_id)
+    if user_story.mode != 'ai' or (existing_article and user_story.status == UserStoryStatus.GENERATED and not force_regenerate):
+        article = await get_generated_user_story(session, user_story, force_regenerate)
+        payload = GeneratedStoryResponseSchema.model_validate(article).model_dump(mode="json")
+
+        async def stored_events():
+            yield sse_event("article", payload)
+        return stored_events()
+
+    qna = await get_qna_by_user_story_id(session, user_story_id)
+    if not qna:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No QnA found for this story",
+        )
+    messages = build_user_story_messages(user_story, qna)
+    existing_title = user_story.title
+
+    async def events():
+        parser = IncrementalJSONObjectParser()
+        if existing_title:
+            yield sse_event("field", {"field": "title", "value": existing_title})
+        try:
+            async for delta in stream_user_story_completion(messages):
+                for event in parser.feed(delta):
+                    if existing_title and event.key == "title":
+                        # replaced by the existing title in finalize_generated_article
+                        continue
+                    if event.kind == "delta":
+                        if event.key in STREAMED_ARTICLE_FIELDS:
+                            yield sse_event("delta", {"field": event.key, "text": event.value})
+                    else:
+                        yield sse_event("field", {"field": event.key, "value": event.value})
+            if not parser.complete:
+                raise ValueError("the completion ended before the article JSON was complete")
+            generated = finalize_generated_article(parser.fields, existing_title)
+        except Exception as e:
+            print(f"Error streaming generated article for {user_story_id}: {e}")
+            traceback.print_exc()
+            yield sse_event("error", {"detail": "Error while generating article or JSON parsing"})
+            return
+
+        try:
+            # the request's session is closed by the time the response body is streamed
+            async with async_session() as stream_session:
+                article = await store_generated_article(stream_session, generated, user_story_id, creator_id)
+                payload = GeneratedStoryResponseSchema.model_validate(article).model_dump(mode="json")
+        except Exception as e:
+            print(f"Error while storing streamed article for {user_story_id}: {e}")
+            traceback.print_exc()
+            yield sse_event("error", {"detail": "Error while storing generated article in DB"})
+            return
+        yield sse_event("article", payload)
+
+    return events()
+
 from src.schemas import UploadedImageKeys
 
 async def update_user_story_status(session: AsyncSession, generated_article: GeneratedUserStories, request: UploadedImageKeys | None=None):
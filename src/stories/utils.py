@@ -2,16 +2,22 @@ from datetime import datetime, timedelta
 from typing import Optional, Annotated, Literal
 from fastapi import Query, HTTPException
 import re
-import feedparser
 import urllib.parse
 import httpx
 from datetime import datetime
-from openai import AsyncOpenAI, OpenAIError
+from openai import OpenAIError
 import json
 import asyncio
+import time
 import unicodedata
 
 from src.config.settings import settings
+from src.config.http_client import http_clients
+from src.config.llm_gateway import llm_gateway
+from src.stories.feeds import feed_poller, feed_source_registry
+from src.stories.serp import serp_cache, SerpKeysExhaustedError
+from src.stories.llm_cache import llm_cache
+from src.stories.metrics import FETCH_SECONDS, FETCH_ERRORS, PARSE_SECONDS, ITEMS_FETCHED, ITEMS_NEW, REFRESH_SECONDS, REFRESH_PAGES
 from src.schemas import LocationDataSchema, GenerateOptionsSchema, ReqSchema
 from src.models import UserStories
 
@@ -55,56 +61,13 @@ SCOPE_CONFIG = {
     
 #     return None
 
-RSS_FEEDS_SOURCES = [
-    {
-        "name": "Live Hindustan - Nagpur",
-        "url": "https://api.livehindustan.com/feeds/rss/maharashtra/nagpur/rssfeed.xml",
-        "category": "general"
-    },
-    {
-        "name": "Times of India - Nagpur",
-        "url": "https://timesofindia.indiatimes.com/rssfeeds/442002.cms",
-        "category": "general"
-    },
-    {
-        "name": "NagpurVocals Local News",
-        "url": "https://www.nagpurvocals.com/rss/local",
-        "category": "general"
-    },
-    {
-        "name": "Indian Express - Nagpur",
-        "url": "https://indianexpress.com/section/cities/nagpur/feed/",
-        "category": "general"
-    },
-    {
-        "name": "Lokmat Times - Nagpur",
-        "url": "https://lokmat.news18.com/commonfeeds/v1/lok/rss/maharashtra/nagpur.xml",
-        "category": "general"
-    }
-]
-
 async def get_news(feed_source: dict):
-    async with httpx.AsyncClient() as client:
-        to_fetch = feed_source['url']
-        response = await client.get(to_fetch)
-        response.raise_for_status()
-
-        feed = feedparser.parse(response.text)
-
-        if response.status_code == 200:
-            # return [ { "title": entry.get('title'), "summary": entry.get('summary', ''), "link": entry.get('link'), "published": entry.get('published') } for entry in feed.entries ]
-            return {
-                "feed": [ { "title": entry.get('title'), "summary": entry.get('summary', ''), "link": entry.get('link'), "published": entry.get('published') } for entry in feed.entries[:7] ],
-                # "feed": feed.entries[:5],
-                "source": feed_source['name'],
-                "category": feed_source['category']
-            }
-        else:
-            return {"error": "Failed to fetch feed"}
+    return await feed_poller.get_feed(feed_source)
         
 
-async def get_all_news():
-    tasks = [get_news(source) for source in RSS_FEEDS_SOURCES]
+async def get_all_news(city: str | None = None, category: str | None = None):
+    sources = await feed_source_registry.get_sources(city=city, category=category)
+    tasks = [get_news(source) for source in sources]
     return await asyncio.gather(*tasks)
 
 from datetime import datetime, timedelta
@@ -158,7 +121,9 @@ def needs_fetching(location_db):
     try:
         now = datetime.now()
         time_since_last_fetch = now - location_db.last_fetched_timestamp
-        return time_since_last_fetch.total_seconds()/60 > location_db.refresh_interval_mins
+        # refresh_interval_mins is nullable, fall back to the scope's interval like the scheduler
+        refresh_interval_mins = location_db.refresh_interval_mins or SCOPE_CONFIG[location_db.level]['refresh_interval_mins']
+        return time_since_last_fetch.total_seconds()/60 > refresh_interval_mins
     except Exception as e:
         print(e)
         return None
@@ -244,13 +209,30 @@ def is_news_story_fresh(story, cutoff_datetime: datetime) -> bool:
 
 #     return news_records
 
-async def fetch_news_articles(request: LocationDataSchema, since_timestamp: datetime | None = None):
-    keyword = urllib.parse.quote(f"{request.query} news")
-    keep_fetching = True
-    base_url = f"https://serpapi.com/search?engine=bing_news&qft=sortbydate%3D%221%22&api_key={settings.EXHAUSTED_SERP_API_KEY2}&q={keyword}&no_cache=true"
+SERP_PAGE_SIZE = 10
+
+async def fetch_serp_page(client: httpx.AsyncClient, params: dict, offset: int, ttl_secs: int | None = None, scope: str = "unknown") -> list[dict]:
+    started = time.perf_counter()
+    try:
+        data = await serp_cache.search(client, {**params, "count": SERP_PAGE_SIZE, "first": offset}, ttl_secs)
+    except Exception:
+        FETCH_ERRORS.inc(source="serpapi", feed=scope)
+        raise
+    FETCH_SECONDS.observe(time.perf_counter() - started, source="serpapi", feed=scope)
+    return data.get("organic_results", [])
+
+async def fetch_news_articles(request: LocationDataSchema, since_timestamp: datetime | None = None, client: httpx.AsyncClient | None = None):
+    """
+    Page through Bing News results newest first until a story older than the cutoff shows up.
+
+    Pages are fetched speculatively in a sliding window of up to `SERP_PAGE_WINDOW` concurrent
+    requests but consumed strictly in order, so results stay sorted. Once a page crosses the
+    cutoff, requests for the pages after it are cancelled. Incremental refreshes (with
+    `since_timestamp`) start with a window of one page and double it while pages stay fresh,
+    so a refresh that only needs the first page does not pay for speculative ones.
+    """
+    params = {"engine": "bing_news", "qft": 'sortbydate="1"', "q": f"{request.query} news", "no_cache": "true"}
 
-    page_size = 10
-    offset = 0
     news_records = []
     seen_links = set()  # track unique links
 
@@ -258,9 +240,10 @@ async def fetch_news_articles(request: LocationDataSchema, since_timestamp: date
     scope = request.scope
 
     if (scope == 'CITY' or scope == 'STATE'):
-        api_url = f"{base_url}&cc={country_code}"
-    else:
-        api_url = base_url
+        params["cc"] = country_code
+
+    # cached pages expire well before the location's next scheduled refresh
+    cache_ttl_secs = SCOPE_CONFIG[scope]['refresh_interval_mins'] * 60 // 2
 
     # Calculate cutoff time based on scope if since_timestamp is None
     if since_timestamp is None:
@@ -269,20 +252,43 @@ async def fetch_news_articles(request: LocationDataSchema, since_timestamp: date
     else:
         cutoff_datetime = since_timestamp
 
-    async with httpx.AsyncClient() as client:
+    max_window = max(settings.SERP_PAGE_WINDOW, 1)
+    max_offset = settings.SERP_MAX_PAGES * SERP_PAGE_SIZE
+    window = 1 if since_timestamp is not None else max_window
+    next_offset = 0
+    pages = 0
+    refresh_started = time.perf_counter()
+    pending: dict[int, asyncio.Task] = {}
+
+    client = client or http_clients.get("serpapi")
+    try:
+        keep_fetching = True
         while keep_fetching:
-            response = await client.get(f"{api_url}&count={page_size}&first={offset}")
-            # print(f"{api_url}&count={page_size}&first={offset}")
-            data = response.json()
-            results = data.get("organic_results", [])
+            while len(pending) < window and next_offset < max_offset:
+                pending[next_offset] = asyncio.create_task(fetch_serp_page(client, params, next_offset, cache_ttl_secs, scope))
+                next_offset += SERP_PAGE_SIZE
+
+            if not pending:
+                break
+
+            # always consume the lowest outstanding page so results stay ordered
+            try:
+                results = await pending.pop(min(pending))
+            except SerpKeysExhaustedError as e:
+                # keep whatever was fetched so far, the next refresh picks up the rest
+                print(f"Stopping SerpAPI pagination for {request.query}: {e}")
+                break
+            pages += 1
             if not results:
                 break  # no more results
+            ITEMS_FETCHED.inc(len(results), source="serpapi", feed=scope)
 
+            parse_started = time.perf_counter()
+            fresh_count = 0
             for story in results:
-                _ = is_news_story_fresh(story, cutoff_datetime)
-                print(_)
-                is_fresh, published_timestamp = _
+                is_fresh, published_timestamp = is_news_story_fresh(story, cutoff_datetime)
                 if is_fresh:
+                    fresh_count += 1
                     story['date'] = published_timestamp
                     link = story.get("link")
                     if link and link not in seen_links:
@@ -291,23 +297,41 @@ async def fetch_news_articles(request: LocationDataSchema, since_timestamp: date
                 else:
                     keep_fetching = False
                     break
+            PARSE_SECONDS.observe(time.perf_counter() - parse_started, source="serpapi", feed=scope)
+            ITEMS_NEW.inc(fresh_count, source="serpapi", feed=scope)
 
-            offset += page_size
+            window = min(window * 2, max_window)
+    finally:
+        for task in pending.values():
+            task.cancel()
+        await asyncio.gather(*pending.values(), return_exceptions=True)
+
+    REFRESH_SECONDS.observe(time.perf_counter() - refresh_started, scope=scope)
+    REFRESH_PAGES.observe(pages, scope=scope)
     return news_records
 
 
-openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+MAX_REWRITE_CONTENT_CHARS = 6000
+
+# Bump a prompt's version whenever its template changes, so cached responses to the old prompt stop matching.
+REWRITE_PROMPT_VERSION = 1
+QUESTIONS_PROMPT_VERSION = 1
+METADATA_PROMPT_VERSION = 1
 
-async def rewrite_story(options: GenerateOptionsSchema, story) -> dict:
+async def rewrite_story(options: GenerateOptionsSchema, story, content: str | None = None, bypass_cache: bool = False) -> dict:
     """
-    Rewrite a story (title + snippet) using OpenAI API.
+    Rewrite a story (title + snippet, plus the extracted article text when available) using OpenAI API.
     Output: {"title": "...", "snippet": "..."} where snippet is HTML formatted.
+    Responses are cached by their inputs, `bypass_cache` forces a fresh rewrite.
     """
 
     if not story or not story.title or not story.snippet:
         return {"title": "", "snippet": ""}
 
+    model = "gpt-4o-mini"
     words = get_word_length_range(options.word_length)
+    content = content[:MAX_REWRITE_CONTENT_CHARS] if content else None
+    article_text = f"Original Article Text: {content}" if content else ""
 
     prompt = f"""
         You are an AI editorial assistant. Rewrite the following news article into a new version.
@@ -322,6 +346,7 @@ async def rewrite_story(options: GenerateOptionsSchema, story) -> dict:
 
         Original Title: {story.title}
         Original Snippet: {story.snippet}
+        {article_text}
 
         Return ONLY valid JSON in this format:
         {{
@@ -330,19 +355,20 @@ async def rewrite_story(options: GenerateOptionsSchema, story) -> dict:
         }}
             """
 
-    try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+    async def generate():
+        response = await llm_gateway.chat_completion(
+            model=model,
             messages=[
                 {"role": "system", "content": "You are a professional news editor."},
                 {"role": "user", "content": prompt},
             ],
             response_format={"type": "json_object"}
         )
+        return json.loads(response.choices[0].message.content)
 
-        content = response.choices[0].message.content
-        return json.loads(content)
-
+    inputs = {"options": options.model_dump(mode="json"), "title": story.title, "snippet": story.snippet, "content": content}
+    try:
+        return await llm_cache.get_or_generate("rewrite", model, REWRITE_PROMPT_VERSION, inputs, generate, bypass=bypass_cache)
     except Exception as e:
         print("Rewrite error:", e)
         return None
@@ -365,7 +391,7 @@ async def get_prompt_response(request: ReqSchema) -> str:
             Follow proper journalistic structure and include a clear headline and well-organized body text.
             If any information seems incomplete, acknowledge it as 'details awaited' instead of making assumptions.
             """
-        response = await openai_client.chat.completions.create(
+        response = await llm_gateway.chat_completion(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": request.sys_prompt},
@@ -386,8 +412,11 @@ def generate_hash(context: str) -> str:
     return hashlib.sha256(context.strip().lower().encode("utf-8")).hexdigest()
 
 
-async def generate_ai_questions(user_story_db: UserStories) -> list[dict]:
-    """Generate 5W1H+Sources questions in JSON format using GPT."""
+async def generate_ai_questions(user_story_db: UserStories, bypass_cache: bool = False) -> list[dict]:
+    """
+    Generate 5W1H+Sources questions in JSON format using GPT.
+    Responses are cached by the story's inputs, `bypass_cache` forces fresh questions.
+    """
 
     title = user_story_db.title
     context = user_story_db.context
@@ -471,9 +500,11 @@ async def generate_ai_questions(user_story_db: UserStories) -> list[dict]:
 
 
     
-    try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+    model = "gpt-4o-mini"
+
+    async def generate():
+        response = await llm_gateway.chat_completion(
+            model=model,
             temperature=0.4,
             response_format={"type": "json_object"},
             messages=[
@@ -485,10 +516,22 @@ async def generate_ai_questions(user_story_db: UserStories) -> list[dict]:
 
         data = json.loads(raw_output)
         return data.get("questions", [])
+
+    inputs = {
+        "title": title,
+        "context": context,
+        "tone": tone,
+        "style": style,
+        "language": language,
+        "word_length": word_length,
+        "word_length_range": str(word_length_range) if word_length_range is not None else None
+    }
+    try:
+        return await llm_cache.get_or_generate("questions", model, QUESTIONS_PROMPT_VERSION, inputs, generate, bypass=bypass_cache)
     except json.JSONDecodeError:
         return []
     
-async def generate_user_story(user_story: UserStories, qna: list[dict]) -> dict:
+def build_user_story_prompt(user_story: UserStories, qna: list[dict]) -> str:
     existing_title = user_story.title
     # del qna['question_id']
     # del qna['answer_id']
@@ -538,15 +581,27 @@ async def generate_user_story(user_story: UserStories, qna: list[dict]) -> dict:
         - For non-English names/places, provide both original and English transliteration in tags.
         - Ensure journalistic clarity, avoid repetition, and follow the given tone, style, and word length.
     """
+    return PROMPT
+
+def build_user_story_messages(user_story: UserStories, qna: list[dict]) -> list[dict]:
+    return [
+        {"role": "system", "content": "You are a professional AI news article writer."},
+        {"role": "user", "content": build_user_story_prompt(user_story, qna)}
+    ]
+
+def finalize_generated_article(article: dict, existing_title: str | None) -> dict:
+    # article['category'] = article.get('category', '').strip().lower().replace(' ', '-')
+    article['category'] = [category.lower().replace(' ', '-') for category in article['category']]
+    if existing_title:
+        article['title'] = existing_title
+    return article
 
+async def generate_user_story(user_story: UserStories, qna: list[dict]) -> dict:
     try:
         # print(PROMPT)
-        response = await openai_client.chat.completions.create(
+        response = await llm_gateway.chat_completion(
             model="gpt-4o-mini",  # or your preferred model
-            messages=[
-                {"role": "system", "content": "You are a professional AI news article writer."},
-                {"role": "user", "content": PROMPT}
-            ],
+            messages=build_user_story_messages(user_story, qna),
             temperature=0.5
         )
 
@@ -556,8 +611,6 @@ async def generate_user_story(user_story: UserStories, qna: list[dict]) -> dict:
         # Try parsing JSON output from the model
         try:
             article = json.loads(raw_content)
-            # article['category'] = article.get('category', '').strip().lower().replace(' ', '-')
-            article['category'] = [category.lower().replace(' ', '-') for category in article['category']]
         except json.JSONDecodeError:
             print("AI returned invalid JSON. Wrapping in fallback format.")
             # article = {
@@ -566,9 +619,7 @@ async def generate_user_story(user_story: UserStories, qna: list[dict]) -> dict:
             #     "full_text": f"<p>{raw_content}</p>"
             # }
             return None
-        if existing_title:
-            article['title'] = existing_title
-        return article
+        return finalize_generated_article(article, user_story.title)
 
     except Exception as e:
         print(f"Error generating user story: {e}")
@@ -579,7 +630,21 @@ async def generate_user_story(user_story: UserStories, qna: list[dict]) -> dict:
         # }
         return None
     
-async def generate_manual_story_metadata(full_text: str, title: str | None = None) -> dict:
+async def stream_user_story_completion(messages: list[dict]):
+    """Yield the text deltas of the article completion as OpenAI streams them."""
+    stream = llm_gateway.chat_completion_stream(
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0.5,
+        response_format={"type": "json_object"}
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+async def generate_manual_story_metadata(full_text: str, title: str | None = None, bypass_cache: bool = False) -> dict:
+    """Categories, tags, titles and snippet for a manually written article. Cached by its text and title."""
+    model = "gpt-4o-mini"
     try:
         PROMPT = f"""
             You are an AI news metadata generator. Your job is to analyze the article body provided below
@@ -631,17 +696,21 @@ async def generate_manual_story_metadata(full_text: str, title: str | None = Non
             \"\"\"{full_text}\"\"\"
         """
 
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",  # or your preferred model
-            messages=[
-                {"role": "system", "content": "You are a professional news article writer."},
-                {"role": "user", "content": PROMPT}
-            ],
-            temperature=0.5
-        )
-
-        raw_content = response.choices[0].message.content.strip()
-        return json.loads(raw_content)
+        async def generate():
+            response = await llm_gateway.chat_completion(
+                model=model,
+                messages=[
+                    {"role": "system", "content": "You are a professional news article writer."},
+                    {"role": "user", "content": PROMPT}
+                ],
+                temperature=0.5
+            )
+
+            raw_content = response.choices[0].message.content.strip()
+            return json.loads(raw_content)
+
+        inputs = {"full_text": full_text, "title": title}
+        return await llm_cache.get_or_generate("metadata", model, METADATA_PROMPT_VERSION, inputs, generate, bypass=bypass_cache)
     except Exception as e:
         print(f"Error generating user story: {e}")
 
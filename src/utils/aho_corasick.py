@@ -0,0 +1,68 @@
+from collections import deque
+from typing import Hashable
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of any of the added patterns
+    in one pass over the text, however many patterns there are.
+
+    Add all patterns, call `build()` once, then `search()` as often as needed.
+    """
+
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._own_outputs: list[list[tuple[int, Hashable]]] = [[]]
+        self._outputs: list[list[tuple[int, Hashable]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value: Hashable):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._own_outputs.append([])
+            state = next_state
+        self._own_outputs[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth first, so every state knows its longest proper suffix state."""
+        self._outputs = [list(outputs) for outputs in self._own_outputs]
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        self._built = True
+
+    def search(self, text: str) -> list[tuple[int, int, Hashable]]:
+        """All matches as (start, end, value), end exclusive."""
+        if not self._built:
+            self.build()
+
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._outputs[state]:
+                matches.append((index - length + 1, index + 1, value))
+        return matches
@@ -0,0 +1,89 @@
+import re
+from html.parser import HTMLParser
+
+# text inside these never belongs to the article body
+SKIPPED_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "figure", "svg", "iframe", "button"}
+BLOCK_TAGS = {"p", "h2", "h3", "li", "blockquote"}
+CONTAINER_TAGS = {"article", "main", "section", "div"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+MIN_BLOCK_CHARS = 40
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class _ArticleParser(HTMLParser):
+    """
+    Collects paragraph-like blocks together with the container they were found in.
+    The container holding the most paragraph text is taken to be the article body.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: list[str] = []
+        self.container_ids: list[int] = [0]
+        self.next_container_id = 1
+        self.skip_depth = 0
+        self.block: list[str] | None = None
+        self.blocks: list[tuple[int, str]] = []
+        self.container_text: dict[int, int] = {}
+        self.article_containers: set[int] = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        self.stack.append(tag)
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in CONTAINER_TAGS:
+            self.container_ids.append(self.next_container_id)
+            if tag in ("article", "main"):
+                self.article_containers.add(self.next_container_id)
+            self.next_container_id += 1
+        elif tag in BLOCK_TAGS and self.skip_depth == 0 and self.block is None:
+            self.block = []
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        # close everything left open inside `tag`, HTML in the wild is rarely balanced
+        while self.stack:
+            open_tag = self.stack.pop()
+            if open_tag in SKIPPED_TAGS:
+                self.skip_depth -= 1
+            elif open_tag in CONTAINER_TAGS and len(self.container_ids) > 1:
+                self.container_ids.pop()
+            elif open_tag in BLOCK_TAGS and self.block is not None:
+                self._flush_block()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.block is not None and self.skip_depth == 0:
+            self.block.append(data)
+
+    def _flush_block(self):
+        text = WHITESPACE_PATTERN.sub(" ", "".join(self.block)).strip()
+        self.block = None
+        if len(text) < MIN_BLOCK_CHARS:
+            return
+        container_id = self.container_ids[-1]
+        self.blocks.append((container_id, text))
+        self.container_text[container_id] = self.container_text.get(container_id, 0) + len(text)
+
+
+def extract_article_text(content: bytes, encoding: str | None = None, max_chars: int = 20000) -> str:
+    """
+    Main text of an article page, one paragraph per line.
+    Kept free of app imports so it can run in a worker process without loading settings.
+    """
+    html = content.decode(encoding or "utf-8", errors="replace")
+    parser = _ArticleParser()
+    parser.feed(html)
+    parser.close()
+
+    if not parser.blocks:
+        return ""
+
+    # prefer an <article>/<main> container when it holds a fair share of the text
+    best = max(parser.container_text, key=lambda cid: parser.container_text[cid] * (2 if cid in parser.article_containers else 1))
+    text = "\n".join(block for container_id, block in parser.blocks if container_id == best)
+    return text[:max_chars]
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(namespace: str, params: dict) -> str:
+    """Stable key for a dict of request params, independent of their order."""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class CacheBackend:
+    async def get(self, key: str):
+        raise NotImplementedError
+
+    async def set(self, key: str, value, ttl_secs: int | None = None):
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    async def get(self, key: str):
+        return None
+
+    async def set(self, key: str, value, ttl_secs: int | None = None):
+        pass
+
+
+class LRUCache(CacheBackend):
+    """Per-process cache holding at most `max_entries` values. A `ttl_secs` of None never expires."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float | None, object]] = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value, ttl_secs: int | None = None):
+        expires_at = time.time() + ttl_secs if ttl_secs is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class DiskCache(CacheBackend):
+    """
+    One JSON file per key under `directory`, so every worker on the host shares it.
+    Values must be JSON serializable.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json")
+
+    def _read(self, key: str):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if entry.get("expires_at") is not None and entry["expires_at"] <= time.time():
+            return None
+        return entry.get("value")
+
+    def _write(self, key: str, value, ttl_secs: int | None):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "key": key,
+                "expires_at": time.time() + ttl_secs if ttl_secs is not None else None,
+                "value": value
+            }, f, ensure_ascii=False)
+        # atomic, so a concurrent reader never sees a half written file
+        os.replace(tmp_path, path)
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value, ttl_secs: int | None = None):
+        await asyncio.to_thread(self._write, key, value, ttl_secs)
+
+
+def build_cache(backend: str, directory: str | None = None, max_entries: int = 1024) -> CacheBackend:
+    if backend == "memory":
+        return LRUCache(max_entries)
+    if backend == "disk":
+        return DiskCache(directory)
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,17 @@
+import feedparser
+
+
+def parse_feed_entries(content: bytes, max_entries: int = 7) -> dict:
+    """
+    Parse raw RSS/Atom bytes into plain dicts.
+    Kept free of app imports so it can run in a worker process without loading settings.
+    """
+    feed = feedparser.parse(content)
+    ttl = feed.feed.get('ttl')
+    return {
+        "entries": [
+            {"title": entry.get('title'), "summary": entry.get('summary', ''), "link": entry.get('link'), "published": entry.get('published')}
+            for entry in feed.entries[:max_entries]
+        ],
+        "ttl_mins": int(ttl) if ttl and str(ttl).isdigit() else None
+    }
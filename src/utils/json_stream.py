@@ -0,0 +1,168 @@
+import json
+from dataclasses import dataclass
+
+WHITESPACE = " \t\r\n"
+
+
+@dataclass
+class JSONStreamEvent:
+    kind: str  # "delta": more text of a string field, "field": a field's value is complete
+    key: str
+    value: object
+
+
+class IncrementalJSONObjectParser:
+    """
+    Parses a JSON object that arrives in arbitrary chunks, such as a streamed LLM completion.
+
+    `feed()` returns the events the chunk completed: decoded text of top-level string values
+    as it arrives ("delta"), and each top-level field once its value is complete ("field").
+    Anything before the opening brace (a ```json fence, say) and after the closing one is ignored.
+    """
+
+    def __init__(self):
+        self.fields: dict = {}
+        self.complete = False
+        self._state = "start"
+        self._key_raw: list[str] = []
+        self._key: str | None = None
+        self._value_raw: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode_digits = 0
+        self._high_surrogate = False
+        self._decoded_upto = 0  # value chars already emitted as deltas, for string values
+        self._safe_end = 0  # value chars that end on a complete character
+
+    def feed(self, chunk: str) -> list[JSONStreamEvent]:
+        events = []
+        for char in chunk:
+            self._consume(char, events)
+        if self._state == "value" and self._is_string_value():
+            self._emit_delta(events)
+        return events
+
+    def _is_string_value(self) -> bool:
+        return bool(self._value_raw) and self._value_raw[0] == '"'
+
+    def _consume(self, char: str, events: list):
+        state = self._state
+        if state == "start":
+            if char == "{":
+                self._state = "key_or_end"
+        elif state in ("key_or_end", "key"):
+            if char == '"':
+                self._state = "key_string"
+                self._key_raw = ['"']
+                self._escape = False
+            elif char == "}" and state == "key_or_end":
+                self._finish()
+            elif char not in WHITESPACE:
+                raise ValueError(f"expected a key, got {char!r}")
+        elif state == "key_string":
+            self._key_raw.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._key = json.loads("".join(self._key_raw))
+                self._state = "colon"
+        elif state == "colon":
+            if char == ":":
+                self._state = "value_start"
+            elif char not in WHITESPACE:
+                raise ValueError(f"expected ':', got {char!r}")
+        elif state == "value_start":
+            if char in WHITESPACE:
+                return
+            self._start_value(char)
+        elif state == "value":
+            self._consume_value(char, events)
+        elif state == "after_value":
+            if char == ",":
+                self._state = "key"
+            elif char == "}":
+                self._finish()
+            elif char not in WHITESPACE:
+                raise ValueError(f"expected ',' or '}}', got {char!r}")
+
+    def _start_value(self, char: str):
+        self._state = "value"
+        self._value_raw = [char]
+        self._depth = 1 if char in "[{" else 0
+        self._in_string = char == '"'
+        self._escape = False
+        self._unicode_digits = 0
+        self._high_surrogate = False
+        self._decoded_upto = 1
+        self._safe_end = 1
+
+    def _consume_value(self, char: str, events: list):
+        raw = self._value_raw
+        if self._in_string:
+            raw.append(char)
+            if self._unicode_digits:
+                self._unicode_digits -= 1
+                if self._unicode_digits == 0:
+                    code = int("".join(raw[-4:]), 16)
+                    # half a surrogate pair cannot be decoded on its own, wait for the other half
+                    self._high_surrogate = 0xD800 <= code <= 0xDBFF
+                    if not self._high_surrogate:
+                        self._safe_end = len(raw)
+            elif self._escape:
+                self._escape = False
+                if char == "u":
+                    self._unicode_digits = 4
+                else:
+                    self._safe_end = len(raw)
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._safe_end = len(raw) - 1
+                    self._emit_delta(events)
+                    self._complete_value(events)
+            else:
+                self._safe_end = len(raw)
+            return
+
+        if self._depth == 0:
+            # a number, true, false or null ends at the first delimiter
+            if char in ",}" or char in WHITESPACE:
+                self._complete_value(events)
+                self._state = "after_value"
+                self._consume(char, events)
+                return
+            raw.append(char)
+            return
+
+        raw.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}":
+            self._depth -= 1
+            if self._depth == 0:
+                self._complete_value(events)
+
+    def _emit_delta(self, events: list):
+        if self._safe_end <= self._decoded_upto:
+            return
+        segment = "".join(self._value_raw[self._decoded_upto:self._safe_end])
+        self._decoded_upto = self._safe_end
+        events.append(JSONStreamEvent("delta", self._key, json.loads(f'"{segment}"')))
+
+    def _complete_value(self, events: list):
+        value = json.loads("".join(self._value_raw))
+        self.fields[self._key] = value
+        events.append(JSONStreamEvent("field", self._key, value))
+        self._value_raw = []
+        self._state = "after_value"
+
+    def _finish(self):
+        self.complete = True
+        self._state = "done"
@@ -0,0 +1,30 @@
+import hashlib
+import urllib.parse
+
+# Free of app imports, migrations use it without loading settings or clients.
+
+TRACKING_QUERY_PARAMS = {"fbclid", "gclid", "ocid", "cmpid", "ref", "ref_src", "mc_cid", "mc_eid", "cvid", "ei"}
+
+def normalize_link(link: str) -> str:
+    """
+    Normalize an article URL so the same story linked from different pages/feeds compares equal.
+    Lowercases scheme and host, drops 'www.', fragments, tracking params and trailing slashes,
+    and sorts the remaining query params.
+    """
+    parts = urllib.parse.urlsplit(link.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    query = [
+        (key, value)
+        for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_QUERY_PARAMS
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urllib.parse.urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme.lower(), host, path, urllib.parse.urlencode(sorted(query)), ""))
+
+def generate_link_hash(link: str | None) -> str | None:
+    if not link:
+        return None
+    return hashlib.sha256(normalize_link(link).encode("utf-8")).hexdigest()
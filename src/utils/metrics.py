@@ -0,0 +1,305 @@
+import asyncio
+import json
+import math
+import os
+import time
+import traceback
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> dict:
+        return {"type": self.type, "help": self.documentation, "labelnames": list(self.labelnames), "samples": [[list(key), value] for key, value in self._values.items()]}
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("counters only go up")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down. Summed across workers like the rest, e.g. queue depths."""
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def remove(self, **labels):
+        """Drop a label set that no longer exists, e.g. the queue of a creator who went idle."""
+        self._values.pop(self._key(labels), None)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        # [per bucket counts (not cumulative), sum, count]
+        state = self._values.get(key)
+        if state is None:
+            state = [[0] * len(self.buckets), 0.0, 0]
+            self._values[key] = state
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][index] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict:
+        # copies of the bucket counts, the snapshot is written from another thread
+        samples = [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._values.items()]
+        return {**super().snapshot(), "samples": samples, "buckets": list(self.buckets)}
+
+
+def merge_snapshots(snapshots: list[dict]) -> dict:
+    """Sum the samples of the same metric and labels across processes."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labelvalues, value in metric["samples"]:
+                key = tuple(labelvalues)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif metric["type"] == "histogram":
+                    target["samples"][key] = [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2]]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+
+def render_prometheus(merged: dict) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {_escape_help(metric['help'])}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for key, value in sorted(metric["samples"].items()):
+            labels = dict(zip(metric["labelnames"], key))
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+
+            bucket_counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(metric["buckets"], bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _server_generation() -> str:
+    """
+    Identifies the running server: the gunicorn master, or the shell that started a single
+    uvicorn process. Its start time is added where /proc has it, so a parent pid reused
+    after a restart starts a new generation as well.
+    """
+    ppid = os.getppid()
+    try:
+        with open(f"/proc/{ppid}/stat", encoding="utf-8") as f:
+            # field 22, counted after the command name which may itself contain spaces
+            start_ticks = f.read().rsplit(")", 1)[1].split()[19]
+        return f"{ppid}.{start_ticks}"
+    except (OSError, IndexError):
+        return str(ppid)
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms, exposed in the Prometheus text format.
+
+    Every gunicorn worker keeps its own values, so a scrape that lands on one worker would only
+    see its share. Each worker therefore writes a snapshot to `directory` every `flush_interval_secs`
+    and the scrape sums the snapshots of all workers of the running server, including ones that
+    have since exited so counters never go backwards. Gauges of a worker that exited or stopped
+    refreshing its snapshot are left out, an exited worker has no queue. Snapshots of earlier
+    server runs are deleted once their worker is gone. Without a directory only the current
+    process is reported.
+
+    Snapshot files are named by server generation, pid and start time of the worker, so a
+    restarted server or a reused pid never picks up another process's totals.
+    """
+
+    def __init__(self, directory: str | None = None, flush_interval_secs: int = 15):
+        self.directory = directory
+        self.flush_interval_secs = flush_interval_secs
+        self._metrics: dict[str, Metric] = {}
+        self._task: asyncio.Task | None = None
+        self._path_pid: int | None = None
+        self._path = ""
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _snapshot_path(self) -> str:
+        # worked out in the worker, the registry may have been created before the fork
+        if self._path_pid != os.getpid():
+            self._path_pid = os.getpid()
+            self._path = os.path.join(self.directory, f"metrics-{_server_generation()}-{os.getpid()}-{time.time_ns()}.json")
+        return self._path
+
+    def flush(self, snapshot: dict | None = None):
+        """Write this process's snapshot. Safe to run in a thread if `snapshot` was taken on the event loop."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._snapshot_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot if snapshot is not None else self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def collect(self, snapshot: dict | None = None) -> dict:
+        """Merged samples of all workers. Pass a `snapshot` taken on the event loop when running in a thread."""
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        if not self.directory:
+            return merge_snapshots([snapshot])
+
+        self.flush(snapshot)
+        own_path = self._snapshot_path()
+        generation = _server_generation()
+        stale_before = time.time() - 3 * self.flush_interval_secs
+        snapshots = [snapshot]
+        for entry in os.scandir(self.directory):
+            if entry.path == own_path or not (entry.name.startswith("metrics-") and entry.name.endswith(".json")):
+                continue
+            try:
+                try:
+                    file_generation, pid, _ = entry.name[len("metrics-"):-len(".json")].rsplit("-", 2)
+                    alive = _process_alive(int(pid))
+                except ValueError:
+                    # named by pid only, written before snapshots were keyed by generation
+                    os.remove(entry.path)
+                    continue
+                if file_generation != generation:
+                    # left behind by an earlier run of the server
+                    if not alive:
+                        os.remove(entry.path)
+                    continue
+
+                with open(entry.path, encoding="utf-8") as f:
+                    worker_snapshot = json.load(f)
+                if not alive or entry.stat().st_mtime < stale_before:
+                    worker_snapshot = {name: metric for name, metric in worker_snapshot.items() if metric["type"] != "gauge"}
+                snapshots.append(worker_snapshot)
+            except (OSError, ValueError) as e:
+                print(f"Error reading metrics snapshot {entry.path}: {e}")
+        return merge_snapshots(snapshots)
+
+    def render(self) -> str:
+        return render_prometheus(self.collect())
+
+    async def render_async(self) -> str:
+        """`render` with the file IO in a thread. Only the snapshot is taken on the event loop."""
+        snapshot = self.snapshot()
+        return await asyncio.to_thread(lambda: render_prometheus(self.collect(snapshot)))
+
+    async def start(self):
+        if self.directory and self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"Error writing metrics snapshot: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_secs)
+            try:
+                await asyncio.to_thread(self.flush, self.snapshot())
+            except Exception as e:
+                print(f"Error writing metrics snapshot: {e}")
+                traceback.print_exc()
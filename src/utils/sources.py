@@ -0,0 +1,32 @@
+RSS_FEEDS_SOURCES = [
+    {
+        "name": "Live Hindustan - Nagpur",
+        "url": "https://api.livehindustan.com/feeds/rss/maharashtra/nagpur/rssfeed.xml",
+        "category": "general",
+        "city": "NAGPUR"
+    },
+    {
+        "name": "Times of India - Nagpur",
+        "url": "https://timesofindia.indiatimes.com/rssfeeds/442002.cms",
+        "category": "general",
+        "city": "NAGPUR"
+    },
+    {
+        "name": "NagpurVocals Local News",
+        "url": "https://www.nagpurvocals.com/rss/local",
+        "category": "general",
+        "city": "NAGPUR"
+    },
+    {
+        "name": "Indian Express - Nagpur",
+        "url": "https://indianexpress.com/section/cities/nagpur/feed/",
+        "category": "general",
+        "city": "NAGPUR"
+    },
+    {
+        "name": "Lokmat Times - Nagpur",
+        "url": "https://lokmat.news18.com/commonfeeds/v1/lok/rss/maharashtra/nagpur.xml",
+        "category": "general",
+        "city": "NAGPUR"
+    }
+]
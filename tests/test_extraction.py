@@ -0,0 +1,84 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+
+from src.stories.extraction import ContentExtractor
+from src.utils.article_extractor import extract_article_text
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+with open(os.path.join(FIXTURES_DIR, "article.html"), "rb") as f:
+    ARTICLE_HTML = f.read()
+
+
+def make_story(link: str):
+    return SimpleNamespace(id=link, link=link, published_timestamp=datetime.now())
+
+
+def make_extractor(**kwargs) -> ContentExtractor:
+    extractor = ContentExtractor(**kwargs)
+    # parse in the default thread pool, a spawned process pool is slow to start in tests
+    extractor._get_executor = lambda: None
+    return extractor
+
+
+def test_extract_article_text_strips_boilerplate():
+    text = extract_article_text(ARTICLE_HTML, "utf-8")
+
+    assert text.splitlines() == [
+        "The Pune metro will run trains until 11 pm on both corridors from Monday, the operator said on Friday.",
+        "Officials said ridership after 9 pm had doubled since the Swargate extension opened in March this year.",
+        "Frequency on the extended hours will be one train every fifteen minutes, according to the new timetable.",
+    ]
+    for boilerplate in ("dataLayer", "City news", "Trending", "Commuters", "Also read", "Copyright"):
+        assert boilerplate not in text
+
+
+def test_extract_many_respects_per_host_limit():
+    in_flight = defaultdict(int)
+    peak = defaultdict(int)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if request.url.path == "/robots.txt":
+            return httpx.Response(404)
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        await asyncio.sleep(0.02)
+        in_flight[host] -= 1
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=ARTICLE_HTML)
+
+    async def scenario():
+        extractor = make_extractor(max_concurrency=10, per_host_concurrency=2)
+        stories = [make_story(f"https://busy.example.com/news/{i}") for i in range(6)]
+        stories += [make_story(f"https://quiet.example.com/news/{i}") for i in range(2)]
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await extractor.extract_many(stories, client=client)
+
+    results = asyncio.run(scenario())
+
+    assert [result.status for result in results] == ["extracted"] * 8
+    assert peak["busy.example.com"] == 2
+    assert peak["quiet.example.com"] == 2
+
+
+def test_extract_honours_robots_txt():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/robots.txt":
+            return httpx.Response(200, text="User-agent: *\nDisallow: /premium/\n")
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=ARTICLE_HTML)
+
+    async def scenario():
+        extractor = make_extractor()
+        stories = [make_story("https://paywall.example.com/premium/1"), make_story("https://paywall.example.com/free/1")]
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await extractor.extract_many(stories, client=client)
+
+    blocked, extracted = asyncio.run(scenario())
+
+    assert blocked.status == "blocked"
+    assert extracted.status == "extracted"
@@ -0,0 +1,88 @@
+import asyncio
+
+from src.config.llm_scheduler import FairShareScheduler, LLMCaller
+
+
+def test_cancel_during_release_does_not_leak_slot():
+    async def scenario():
+        scheduler = FairShareScheduler(max_concurrency=1, tokens_per_minute=10**9)
+        waiting = []
+
+        async def holder():
+            async with scheduler.admit(LLMCaller("stories", "a"), 1):
+                await asyncio.sleep(0.01)
+                # the waiter's client disconnects in the same tick as this call finishes
+                waiting[0].cancel()
+            return "response"
+
+        async def waiter():
+            async with scheduler.admit(LLMCaller("stories", "b"), 1):
+                return "response"
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(waiter()))
+        results = await asyncio.gather(first, waiting[0], return_exceptions=True)
+
+        assert results[0] == "response"
+        assert isinstance(results[1], asyncio.CancelledError)
+        assert scheduler._in_flight == 0
+        # the slot is free again for the next caller
+        assert await asyncio.wait_for(waiter(), timeout=1) == "response"
+
+    asyncio.run(scenario())
+
+
+def test_light_creator_is_not_starved_by_backlog():
+    async def scenario():
+        scheduler = FairShareScheduler(max_concurrency=1, tokens_per_minute=10**9)
+        order = []
+
+        async def call(creator, n):
+            async with scheduler.admit(LLMCaller("stories", creator), 100):
+                order.append((creator, n))
+                await asyncio.sleep(0)
+
+        tasks = [asyncio.create_task(call("busy", n)) for n in range(6)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("light", 0)))
+        await asyncio.gather(*tasks)
+
+        assert order.index(("light", 0)) <= 2
+
+    asyncio.run(scenario())
+
+
+def test_idle_slot_reflects_admitted_calls():
+    async def scenario():
+        scheduler = FairShareScheduler(max_concurrency=1, tokens_per_minute=10**9)
+        assert scheduler.has_idle_slot()
+        async with scheduler.admit(LLMCaller("stories", "a"), 1):
+            assert not scheduler.has_idle_slot()
+        assert scheduler.has_idle_slot()
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_reports_backlog_per_creator():
+    async def scenario():
+        scheduler = FairShareScheduler(max_concurrency=1, tokens_per_minute=10**9)
+        release = asyncio.Event()
+
+        async def call(creator):
+            async with scheduler.admit(LLMCaller("stories", creator), 10):
+                await release.wait()
+
+        tasks = [asyncio.create_task(call(creator)) for creator in ("a", "b", "b", "c")]
+        await asyncio.sleep(0)
+        snapshot = scheduler.snapshot(top=1)
+        release.set()
+        await asyncio.gather(*tasks)
+        return snapshot
+
+    snapshot = asyncio.run(scenario())
+
+    assert snapshot["in_flight"] == 1
+    [tenant] = snapshot["tenants"]
+    assert tenant["backlog"] == 3
+    assert [(creator["creator"], creator["backlog"]) for creator in tenant["creators"]] == [("b", 2)]
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from src.utils.metrics import MetricsRegistry, _server_generation
+
+
+def exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def write_snapshot(directory, generation, pid, requests, queued):
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc(requests)
+    registry.gauge("queue_depth", "Queued").set(queued)
+    path = os.path.join(directory, f"metrics-{generation}-{pid}-1.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(registry.snapshot(), f)
+    return path
+
+
+def build_registry(directory):
+    registry = MetricsRegistry(directory=str(directory))
+    registry.counter("requests_total", "Requests").inc(1)
+    registry.gauge("queue_depth", "Queued").set(2)
+    return registry
+
+
+def test_exited_worker_keeps_counters_but_not_gauges(tmp_path):
+    write_snapshot(tmp_path, _server_generation(), exited_pid(), requests=5, queued=7)
+    merged = build_registry(tmp_path).collect()
+
+    assert merged["requests_total"]["samples"][()] == 6
+    assert merged["queue_depth"]["samples"][()] == 2
+
+
+def test_snapshots_of_an_earlier_server_are_deleted(tmp_path):
+    stale = write_snapshot(tmp_path, "1.1", exited_pid(), requests=100, queued=7)
+    legacy = tmp_path / "metrics-12345.json"
+    legacy.write_text("{}")
+    merged = build_registry(tmp_path).collect()
+
+    assert merged["requests_total"]["samples"][()] == 1
+    assert not os.path.exists(stale)
+    assert not legacy.exists()
+
+
+def test_render_async_matches_render(tmp_path):
+    registry = build_registry(tmp_path)
+    registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1)).observe(0.5)
+
+    rendered = asyncio.run(registry.render_async())
+    assert 'latency_seconds_bucket{le="1"} 1' in rendered
+    assert rendered == registry.render()